@@ -0,0 +1,3 @@
+"""
+Offline benchmarks - measure solver latency and round trips against local mock Cloudflare challenge pages
+"""
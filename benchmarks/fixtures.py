@@ -0,0 +1,164 @@
+"""
+Local HTML fixtures that copy the structure the solver expects from Cloudflare challenge pages:
+closed shadow roots, challenge iframes under /cdn-cgi/challenge-platform/, a delayed checkbox and a success div
+"""
+import json
+
+BENCH_ORIGIN = 'https://bench.local'
+CHALLENGE_ORIGIN = 'https://challenges.cloudflare.com'
+CHALLENGE_FRAME_PATH = '/cdn-cgi/challenge-platform/h/b/turnstile/if/ov2/av0/rcv/bench'
+TURNSTILE_SCRIPT_PATH = '/turnstile/v0/api.js'
+
+# shared page script: fills the DOM with `filler` plain nodes (every `host_every`-th one a closed shadow host,
+# or `host_count` hosts spread over the fillers) and attaches the challenge iframe inside a closed shadow root
+# of `mount`
+_PAGE_SCRIPT = """
+const options = %(options)s;
+
+function fill(parent, count) {
+    const hostEvery = options.hostCount ? Math.max(Math.floor(count / options.hostCount), 1) : options.hostEvery;
+    let hosts = 0;
+    for (let i = 0; i < count; i++) {
+        const el = document.createElement('div');
+        el.className = 'filler';
+        el.textContent = 'filler ' + i;
+        if (hostEvery && i %% hostEvery === 0 && (!options.hostCount || hosts < options.hostCount)) {
+            el.attachShadow({mode: 'closed'}).innerHTML = '<span>shadow ' + i + '</span>';
+            hosts++;
+        }
+        parent.appendChild(el);
+    }
+}
+
+function mountChallenge(mount) {
+    const host = document.createElement('div');
+    mount.appendChild(host);
+    const root = host.attachShadow({mode: 'closed'});
+    const iframe = document.createElement('iframe');
+    iframe.src = options.frameUrl;
+    iframe.style.width = '300px';
+    iframe.style.height = '65px';
+    iframe.style.border = '0';
+    root.appendChild(iframe);
+}
+
+window.addEventListener('message', (event) => {
+    if (event.data !== 'bench-solved') return;
+
+    // challenge solved: drop every challenge indicator like a real redirect would
+    for (const el of document.querySelectorAll('[data-challenge]')) el.remove();
+    document.getElementById('content').hidden = false;
+});
+
+fill(document.getElementById('filler'), options.domSize);
+mountChallenge(document.getElementById('mount'));
+"""
+
+
+def _page(body: str, options: dict) -> str:
+    return f"""<!DOCTYPE html>
+<html>
+<head><title>Bench</title></head>
+<body>
+{body}
+<div id="filler"></div>
+<div id="content" hidden>Protected content</div>
+<script>{_PAGE_SCRIPT % {'options': json.dumps(options)}}</script>
+</body>
+</html>
+"""
+
+
+def _frame_url(checkbox_delay_ms: int, verify_delay_ms: int) -> str:
+    return f'{CHALLENGE_ORIGIN}{CHALLENGE_FRAME_PATH}?checkbox={checkbox_delay_ms}&verify={verify_delay_ms}'
+
+
+def interstitial_page(
+        dom_size: int = 100,
+        host_every: int = 0,
+        checkbox_delay_ms: int = 500,
+        verify_delay_ms: int = 300,
+        host_count: int = 0
+) -> str:
+    """
+    Mock interstitial challenge page
+
+    :param dom_size: Number of filler elements in the document
+    :param host_every: Make every n-th filler element a closed shadow host (0 to disable)
+    :param checkbox_delay_ms: Delay before the checkbox appears in the challenge frame
+    :param verify_delay_ms: Delay between the click and the success div in the challenge frame
+    :param host_count: Spread exactly this many closed shadow hosts over the filler elements instead of host_every
+    :return: HTML source
+    """
+
+    body = f"""
+<script data-challenge src="{CHALLENGE_ORIGIN}/cdn-cgi/challenge-platform/h/b/orchestrate/chl_page/v1"></script>
+<input data-challenge type="hidden" name="cf-turnstile-response">
+<div id="mount" data-challenge></div>
+"""
+    return _page(body, {'domSize': dom_size, 'hostEvery': host_every, 'hostCount': host_count,
+                        'frameUrl': _frame_url(checkbox_delay_ms, verify_delay_ms)})
+
+
+def turnstile_page(
+        dom_size: int = 100,
+        host_every: int = 0,
+        checkbox_delay_ms: int = 500,
+        verify_delay_ms: int = 300,
+        host_count: int = 0
+) -> str:
+    """
+    Mock page with an embedded turnstile widget inside `.turnstile_container`
+
+    :param dom_size: Number of filler elements in the document
+    :param host_every: Make every n-th filler element a closed shadow host (0 to disable)
+    :param checkbox_delay_ms: Delay before the checkbox appears in the challenge frame
+    :param verify_delay_ms: Delay between the click and the success div in the challenge frame
+    :param host_count: Spread exactly this many closed shadow hosts over the filler elements instead of host_every
+    :return: HTML source
+    """
+
+    body = f"""
+<script src="{CHALLENGE_ORIGIN}{TURNSTILE_SCRIPT_PATH}"></script>
+<form>
+    <div class="turnstile_container">
+        <div id="mount"></div>
+        <input type="hidden" name="cf-turnstile-response">
+    </div>
+</form>
+"""
+    return _page(body, {'domSize': dom_size, 'hostEvery': host_every, 'hostCount': host_count,
+                        'frameUrl': _frame_url(checkbox_delay_ms, verify_delay_ms)})
+
+
+def challenge_frame(checkbox_delay_ms: int = 500, verify_delay_ms: int = 300) -> str:
+    """
+    Mock challenge iframe: a closed shadow root that shows the checkbox after a delay
+    and replaces it with the success div once clicked
+
+    :param checkbox_delay_ms: Delay before the checkbox appears
+    :param verify_delay_ms: Delay between the click and the success div
+    :return: HTML source
+    """
+
+    return f"""<!DOCTYPE html>
+<html>
+<body style="margin: 0">
+<div id="widget"></div>
+<script>
+const root = document.getElementById('widget').attachShadow({{mode: 'closed'}});
+root.innerHTML = '<div id="verifying">Verifying...</div>';
+
+setTimeout(() => {{
+    root.innerHTML = '<label><input type="checkbox"><span>Verify you are human</span></label>';
+    root.querySelector('input').addEventListener('click', () => {{
+        setTimeout(() => {{
+            root.innerHTML = '<div id="success">Success!</div>';
+            parent.postMessage('bench-solved', '*');
+        }}, {verify_delay_ms});
+    }});
+}}, {checkbox_delay_ms});
+</script>
+</body>
+</html>
+"""
@@ -0,0 +1,188 @@
+"""
+Benchmark harness - serves the local fixtures through request interception (no network access needed)
+and reports latency percentiles and protocol round trips
+"""
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+from urllib.parse import parse_qs, urlparse
+
+from playwright.async_api import BrowserContext, Route
+
+from benchmarks.fixtures import (
+    BENCH_ORIGIN,
+    CHALLENGE_ORIGIN,
+    challenge_frame,
+    interstitial_page,
+    turnstile_page,
+)
+from camoufox_captcha.common.metrics import SolveMetrics
+
+T = TypeVar('T')
+
+# options required by the solver when creating the Camoufox instance
+CAMOUFOX_OPTIONS = {
+    'headless': True,
+    'humanize': False,
+    'i_know_what_im_doing': True,
+    'config': {'forceScopeAccess': True},
+    'disable_coop': True,
+}
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """
+    Nearest-rank percentile
+
+    :param values: Sample values
+    :param q: Percentile in the 0-100 range
+    :return: Percentile value (nan for an empty sample)
+    """
+
+    if not values:
+        return math.nan
+
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+@dataclass
+class BenchmarkStats:
+    """
+    Samples collected for one benchmark case
+
+    :param name: Benchmark name
+    :param params: Parameters of the case (e.g. DOM size)
+    :param durations: Duration of each run in seconds
+    :param round_trips: Protocol round trips of each run
+    :param failures: Number of runs that did not succeed
+    """
+
+    name: str
+    params: Dict[str, object]
+    durations: List[float] = field(default_factory=list)
+    round_trips: List[int] = field(default_factory=list)
+    failures: int = 0
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            'name': self.name,
+            **self.params,
+            'runs': len(self.durations),
+            'failures': self.failures,
+            'p50_ms': percentile(self.durations, 50) * 1000,
+            'p90_ms': percentile(self.durations, 90) * 1000,
+            'p99_ms': percentile(self.durations, 99) * 1000,
+            'round_trips': sum(self.round_trips) / len(self.round_trips) if self.round_trips else math.nan,
+        }
+
+
+async def measure(
+        stats: BenchmarkStats,
+        setup: Callable[[], Awaitable[T]],
+        run: Callable[[T], Awaitable[object]],
+        runs: int,
+        teardown: Optional[Callable[[T], Awaitable[None]]] = None
+) -> BenchmarkStats:
+    """
+    Run a benchmark case several times, collecting durations and round trips (setup and teardown are not measured)
+
+    :param stats: BenchmarkStats to collect into
+    :param setup: Coroutine function preparing the state of a run (e.g. opening the fixture page)
+    :param run: Coroutine function running the case once, a falsy result counts as a failure
+    :param runs: Number of runs
+    :param teardown: Coroutine function cleaning up the state of a run
+    :return: The same BenchmarkStats
+    """
+
+    for _ in range(runs):
+        state = await setup()
+        try:
+            metrics = SolveMetrics()
+            with metrics.activate():
+                started = time.perf_counter()
+                result = await run(state)
+                duration = time.perf_counter() - started
+        finally:
+            if teardown:
+                await teardown(state)
+
+        stats.durations.append(duration)
+        # SolveResult counts its own round trips in a nested collector
+        stats.round_trips.append(getattr(result, 'round_trips', metrics.round_trips))
+        if not result:
+            stats.failures += 1
+
+    return stats
+
+
+async def install_fixtures(context: BrowserContext) -> None:
+    """
+    Serve the fixtures for every request to the bench origin and the mocked Cloudflare challenge origin
+
+    Pages accept query parameters: `dom` (filler elements), `hosts` (every n-th filler is a shadow host),
+    `host_count` (fixed number of shadow hosts), `checkbox` and `verify` (delays in ms of the challenge frame)
+
+    :param context: BrowserContext to install the routes into
+    """
+
+    async def handle(route: Route) -> None:
+        url = urlparse(route.request.url)
+        query = {key: int(values[0]) for key, values in parse_qs(url.query).items()}
+
+        page_args = (query.get('dom', 100), query.get('hosts', 0), query.get('checkbox', 500), query.get('verify', 300),
+                     query.get('host_count', 0))
+
+        if url.path.startswith('/interstitial'):
+            # served like a real challenge document, so response-based detection can be measured too
+            return await route.fulfill(status=403, content_type='text/html', body=interstitial_page(*page_args),
+                                       headers={'cf-mitigated': 'challenge', 'server': 'cloudflare'})
+        elif url.path.startswith('/turnstile'):
+            body = turnstile_page(*page_args)
+        elif url.path.startswith('/cdn-cgi/challenge-platform/h/b/turnstile'):
+            body = challenge_frame(query.get('checkbox', 500), query.get('verify', 300))
+        else:
+            # challenge and turnstile scripts only need to exist
+            return await route.fulfill(status=200, content_type='application/javascript', body='')
+
+        await route.fulfill(status=200, content_type='text/html', body=body)
+
+    await context.route(f'{BENCH_ORIGIN}/**', handle)
+    await context.route(f'{CHALLENGE_ORIGIN}/**', handle)
+
+
+def page_url(
+        kind: str,
+        dom_size: int,
+        host_every: int = 0,
+        checkbox_delay_ms: int = 500,
+        verify_delay_ms: int = 300,
+        host_count: int = 0
+) -> str:
+    """
+    :param kind: "interstitial" or "turnstile"
+    :return: URL of the fixture page served by install_fixtures
+    """
+
+    return (f'{BENCH_ORIGIN}/{kind}?dom={dom_size}&hosts={host_every}'
+            f'&checkbox={checkbox_delay_ms}&verify={verify_delay_ms}&host_count={host_count}')
+
+
+def format_table(rows: List[Dict[str, object]], columns: Tuple[str, ...]) -> str:
+    """
+    Format summaries as a plain text table
+
+    :param rows: Benchmark summaries
+    :param columns: Columns to include
+    :return: Table text
+    """
+
+    def cell(value: object) -> str:
+        return f'{value:.1f}' if isinstance(value, float) else str(value)
+
+    table = [list(columns)] + [[cell(row.get(column, '')) for column in columns] for row in rows]
+    widths = [max(len(line[i]) for line in table) for i in range(len(columns))]
+
+    return '\n'.join('  '.join(value.ljust(width) for value, width in zip(line, widths)) for line in table)
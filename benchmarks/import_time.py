@@ -0,0 +1,85 @@
+"""
+Measure the import time of the package in fresh interpreters (no browser needed)
+
+Every run imports the package once in a new interpreter, so the durations include the first (cold) import
+of everything it loads
+
+Usage:
+    python -m benchmarks.import_time --runs 20 --modules camoufox_captcha camoufox_captcha.pool
+"""
+import argparse
+import json
+import subprocess
+import sys
+from typing import Dict, List
+
+from benchmarks.harness import format_table, percentile
+
+COLUMNS = ('module', 'runs', 'p50_ms', 'p90_ms', 'min_ms', 'loaded_modules')
+
+# prints the import duration of the module and the number of modules it loaded
+IMPORT_SCRIPT = """
+import importlib, sys, time
+loaded = len(sys.modules)
+started = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(time.perf_counter() - started, len(sys.modules) - loaded)
+"""
+
+
+def import_module(module: str) -> List[float]:
+    """
+    Import a module in a fresh interpreter
+
+    :param module: Name of the module
+    :return: Import duration in seconds and the number of modules loaded by the import
+    """
+
+    output = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT, module], capture_output=True, text=True,
+                            check=True).stdout.split()
+    return [float(value) for value in output]
+
+
+def measure_import(module: str, runs: int) -> Dict[str, object]:
+    """
+    Import a module in several fresh interpreters
+
+    :param module: Name of the module
+    :param runs: Number of interpreters
+    :return: Summary with duration percentiles and the number of loaded modules
+    """
+
+    durations = []
+    loaded = 0
+    for _ in range(runs):
+        duration, loaded = import_module(module)
+        durations.append(duration)
+
+    return {
+        'module': module,
+        'runs': runs,
+        'p50_ms': percentile(durations, 50) * 1000,
+        'p90_ms': percentile(durations, 90) * 1000,
+        'min_ms': min(durations) * 1000,
+        'loaded_modules': int(loaded),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='fresh interpreters per module')
+    parser.add_argument('--modules', nargs='+', default=['camoufox_captcha', 'camoufox_captcha.cloudflare',
+                                                         'camoufox_captcha.pool'], help='modules to import')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args()
+
+    results = [measure_import(module, args.runs) for module in args.modules]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(format_table(results, COLUMNS))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Compare retry policies on simulated checkbox-ready delay distributions (no browser needed)
+
+Every simulated page starts waiting at the same moment (the worst case of many pages retrying in lockstep)
+and checks for the checkbox on the retry policy's schedule until it is ready or the attempts run out
+
+Usage:
+    python -m benchmarks.retry_simulation --pages 1000 --base-delay 1 --attempts 10
+"""
+import argparse
+import json
+import math
+import random
+from collections import Counter
+from typing import Callable, Dict, List, Sequence
+
+from benchmarks.harness import format_table, percentile
+from camoufox_captcha.common.retry import RetryPolicy
+
+COLUMNS = ('policy', 'distribution', 'pages', 'failures', 'p50_late_ms', 'p90_late_ms', 'p99_late_ms',
+           'checks_per_page', 'peak_retries')
+
+# width of the time buckets the load (retries started at the same time) is counted in
+LOAD_BUCKET = 0.1
+
+
+def ready_time_distributions(rng: random.Random) -> Dict[str, Callable[[], float]]:
+    """
+    Samplers of the time in seconds until the checkbox is ready
+
+    :param rng: Seeded random generator
+    :return: Sampler for every distribution name
+    """
+
+    return {
+        'lognormal': lambda: rng.lognormvariate(math.log(1.5), 0.8),
+        'uniform': lambda: rng.uniform(0, 5),
+        # most challenges are quick, some take much longer
+        'bimodal': lambda: rng.uniform(0.2, 1) if rng.random() < 0.8 else rng.uniform(6, 10),
+    }
+
+
+def retry_policies(rng: random.Random) -> Dict[str, RetryPolicy]:
+    """
+    Policies compared by default
+
+    :param rng: Seeded random generator used for the jitter
+    :return: RetryPolicy for every policy name
+    """
+
+    return {
+        'constant': RetryPolicy(),
+        'constant_jitter': RetryPolicy(jitter=0.5, rng=rng.random),
+        'exponential': RetryPolicy(factor=2, max_delay=8),
+        'exponential_jitter': RetryPolicy(factor=2, max_delay=8, jitter=0.5, rng=rng.random),
+    }
+
+
+def simulate(
+        policy: RetryPolicy,
+        base_delay: float,
+        attempts: int,
+        ready_times: Sequence[float]
+) -> Dict[str, object]:
+    """
+    Simulate pages polling for the checkbox on the policy's schedule
+
+    :param policy: RetryPolicy scheduling the delays between checks
+    :param base_delay: Base delay of the policy in seconds
+    :param attempts: Maximum number of checks per page
+    :param ready_times: Time in seconds until the checkbox is ready, one per page
+    :return: Summary with failures, lateness percentiles (time between the checkbox getting ready and the check
+             that found it), checks per page and the peak number of retries started in one LOAD_BUCKET
+             (the first checks of all pages coincide by construction and are not counted as load)
+    """
+
+    lateness: List[float] = []
+    load: Counter = Counter()
+    checks = 0
+    failures = 0
+
+    for ready_time in ready_times:
+        elapsed = 0.0
+        for attempt in range(attempts):
+            checks += 1
+            if attempt > 0:
+                load[int(elapsed / LOAD_BUCKET)] += 1
+
+            if elapsed >= ready_time:
+                lateness.append(elapsed - ready_time)
+                break
+
+            elapsed += policy.delay(base_delay, attempt)
+        else:
+            failures += 1
+
+    return {
+        'pages': len(ready_times),
+        'failures': failures,
+        'p50_late_ms': percentile(lateness, 50) * 1000,
+        'p90_late_ms': percentile(lateness, 90) * 1000,
+        'p99_late_ms': percentile(lateness, 99) * 1000,
+        'checks_per_page': checks / len(ready_times) if ready_times else math.nan,
+        'peak_retries': max(load.values(), default=0),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=1000, help='simulated pages per case')
+    parser.add_argument('--base-delay', type=float, default=1, help='base delay of the policies in seconds')
+    parser.add_argument('--attempts', type=int, default=10, help='maximum checks per page')
+    parser.add_argument('--seed', type=int, default=1, help='seed of the random generator')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = []
+    for distribution, sample in ready_time_distributions(rng).items():
+        ready_times = [sample() for _ in range(args.pages)]
+        for name, policy in retry_policies(rng).items():
+            results.append({'policy': name, 'distribution': distribution,
+                            **simulate(policy, args.base_delay, args.attempts, ready_times)})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(format_table(results, COLUMNS))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""
+Run the offline benchmarks against the local mock Cloudflare challenge pages
+
+Usage:
+    python -m benchmarks.run --runs 20 --dom-sizes 100 1000 10000
+"""
+import argparse
+import asyncio
+import json
+from typing import List, Optional, Tuple
+
+from camoufox import AsyncCamoufox
+from playwright.async_api import BrowserContext, Frame, Page
+
+from benchmarks.harness import (
+    CAMOUFOX_OPTIONS,
+    BenchmarkStats,
+    format_table,
+    install_fixtures,
+    measure,
+    page_url,
+)
+from camoufox_captcha import solve_captcha, goto_and_solve
+from camoufox_captcha.cloudflare.solve_by_click import find_cloudflare_iframes
+from camoufox_captcha.cloudflare.utils.dom_helpers import get_ready_checkbox
+from camoufox_captcha.common.shadow_root import search_shadow_root_elements, search_shadow_root_iframes, \
+    TraversalOptions
+
+CF_IFRAME_FILTER = 'https://challenges.cloudflare.com/cdn-cgi/challenge-platform/'
+
+COLUMNS = ('name', 'dom_size', 'runs', 'failures', 'p50_ms', 'p90_ms', 'p99_ms', 'round_trips')
+
+
+async def bench_search_shadow_root_elements(
+        context: BrowserContext,
+        dom_size: int,
+        host_every: int,
+        runs: int,
+        scoped: bool = False,
+        host_count: int = 0
+) -> BenchmarkStats:
+    async def setup() -> Tuple[Page, Optional[TraversalOptions]]:
+        page = await context.new_page()
+        await page.goto(page_url('interstitial', dom_size, host_every, host_count=host_count), wait_until='load')
+
+        traversal = None
+        if scoped:
+            # scope the traversal to the challenge mount, as solve_captcha does for turnstile containers
+            traversal = TraversalOptions(root=await page.query_selector('#mount'))
+        return page, traversal
+
+    async def run(state: Tuple[Page, Optional[TraversalOptions]]) -> bool:
+        page, traversal = state
+        return bool(await search_shadow_root_elements(page, 'iframe', traversal))
+
+    name = 'search_shadow_root_elements'
+    if scoped:
+        name += '[scoped]'
+    if host_count:
+        # the host count stays fixed while dom_size grows, so the timings show the cost of the node count
+        name += f'[{host_count}_hosts]'
+    stats = BenchmarkStats(name, {'dom_size': dom_size})
+    return await measure(stats, setup, run, runs, teardown=lambda state: state[0].close())
+
+
+async def bench_find_cloudflare_iframes(
+        context: BrowserContext,
+        dom_size: int,
+        discovery: str,
+        runs: int
+) -> BenchmarkStats:
+    async def setup() -> Page:
+        page = await context.new_page()
+        await page.goto(page_url('interstitial', dom_size), wait_until='load')
+        return page
+
+    async def run(page: Page) -> bool:
+        return bool(await find_cloudflare_iframes(page, discovery))
+
+    stats = BenchmarkStats(f'find_cloudflare_iframes[{discovery}]', {'dom_size': dom_size})
+    return await measure(stats, setup, run, runs, teardown=lambda page: page.close())
+
+
+async def bench_get_ready_checkbox(
+        context: BrowserContext,
+        dom_size: int,
+        checkbox_delay_ms: int,
+        wait_mode: str,
+        runs: int
+) -> BenchmarkStats:
+    async def setup() -> Tuple[Page, List[Frame]]:
+        page = await context.new_page()
+        await page.goto(page_url('interstitial', dom_size, checkbox_delay_ms=checkbox_delay_ms), wait_until='load')
+        return page, await search_shadow_root_iframes(page, CF_IFRAME_FILTER)
+
+    async def run(state: Tuple[Page, List[Frame]]) -> bool:
+        return bool(await get_ready_checkbox(state[1], delay=1, attempts=10, wait_mode=wait_mode))
+
+    stats = BenchmarkStats(f'get_ready_checkbox[{wait_mode}]', {'dom_size': dom_size})
+    return await measure(stats, setup, run, runs, teardown=lambda state: state[0].close())
+
+
+async def bench_solve_captcha(
+        context: BrowserContext,
+        challenge_type: str,
+        dom_size: int,
+        checkbox_delay_ms: int,
+        runs: int
+) -> BenchmarkStats:
+    async def setup() -> Page:
+        page = await context.new_page()
+        await page.goto(page_url(challenge_type, dom_size, checkbox_delay_ms=checkbox_delay_ms), wait_until='load')
+        return page
+
+    async def run(page: Page):
+        queryable = page
+        if challenge_type == 'turnstile':
+            queryable = await page.wait_for_selector('.turnstile_container')
+
+        return await solve_captcha(queryable, captcha_type='cloudflare', challenge_type=challenge_type,
+                                   solve_attempts=1, wait_checkbox_delay=1, wait_checkbox_attempts=10,
+                                   solve_click_delay=5, return_result=True)
+
+    stats = BenchmarkStats(f'solve_captcha[{challenge_type}]', {'dom_size': dom_size})
+    return await measure(stats, setup, run, runs, teardown=lambda page: page.close())
+
+
+async def bench_goto_and_solve(
+        context: BrowserContext,
+        dom_size: int,
+        checkbox_delay_ms: int,
+        runs: int
+) -> BenchmarkStats:
+    async def setup() -> Page:
+        return await context.new_page()
+
+    async def run(page: Page):
+        # navigation is included, the challenge is detected from the document response
+        return await goto_and_solve(page, page_url('interstitial', dom_size, checkbox_delay_ms=checkbox_delay_ms),
+                                    solve_attempts=1, wait_checkbox_delay=1, wait_checkbox_attempts=10,
+                                    solve_click_delay=5, return_result=True)
+
+    stats = BenchmarkStats('goto_and_solve[interstitial]', {'dom_size': dom_size})
+    return await measure(stats, setup, run, runs, teardown=lambda page: page.close())
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='runs per benchmark case')
+    parser.add_argument('--dom-sizes', type=int, nargs='+', default=[100, 1000, 10000],
+                        help='numbers of filler elements in the fixture pages')
+    parser.add_argument('--host-every', type=int, default=50,
+                        help='make every n-th filler element a closed shadow host (0 to disable)')
+    parser.add_argument('--host-count', type=int, default=20,
+                        help='fixed number of shadow hosts for the traversal case that only grows the node count '
+                             '(0 to disable)')
+    parser.add_argument('--checkbox-delay', type=int, default=500, help='delay in ms before the checkbox appears')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args()
+
+    results = []
+    async with AsyncCamoufox(**CAMOUFOX_OPTIONS) as browser:
+        context = await browser.new_context()
+        await install_fixtures(context)
+
+        for dom_size in args.dom_sizes:
+            for scoped in (False, True):
+                results.append(await bench_search_shadow_root_elements(context, dom_size, args.host_every, args.runs,
+                                                                       scoped))
+            if args.host_count:
+                results.append(await bench_search_shadow_root_elements(context, dom_size, 0, args.runs,
+                                                                       host_count=args.host_count))
+            for discovery in ('frame_tree', 'dom'):
+                results.append(await bench_find_cloudflare_iframes(context, dom_size, discovery, args.runs))
+            for wait_mode in ('poll', 'observe'):
+                results.append(await bench_get_ready_checkbox(context, dom_size, args.checkbox_delay, wait_mode,
+                                                              args.runs))
+            for challenge_type in ('interstitial', 'turnstile'):
+                results.append(await bench_solve_captcha(context, challenge_type, dom_size, args.checkbox_delay,
+                                                         args.runs))
+            results.append(await bench_goto_and_solve(context, dom_size, args.checkbox_delay, args.runs))
+
+        await context.close()
+
+    summaries = [stats.summary() for stats in results]
+    if args.json:
+        print(json.dumps(summaries, indent=2))
+    else:
+        print(format_table(summaries, COLUMNS))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
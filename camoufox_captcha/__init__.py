@@ -1,39 +1,95 @@
 """
 Camoufox Captcha - Automatically solve captcha using Camoufox
 """
+from __future__ import annotations
+
+import importlib
 import logging
-from typing import Union, Literal, Optional
+from typing import TYPE_CHECKING, Any, Union, Literal, Optional
+
+if TYPE_CHECKING:
+    from playwright.async_api import Page, Frame, ElementHandle
 
-from playwright.async_api import Page, Frame, ElementHandle
+    from .cloudflare import solve_cloudflare_by_click, solve_cloudflare_widgets, goto_and_solve, ChallengeWatcher
+    from .common.metrics import SolveResult, SolveHooks, WidgetResult
+    from .common.retry import RetryPolicy
+    from .common.selector_engine import register_shadow_selector_engine, shadow_selector, SHADOW_SELECTOR_ENGINE
+    from .pool import SolverPool, PoolResult, solve_captcha_many
+    from .page_pool import PagePool, PagePoolStats, CAMOUFOX_LAUNCH_OPTIONS
+    from .registry import registry, register_solver, SolverRegistry, SolverEntry
 
-from .cloudflare import solve_cloudflare_by_click
+__version__ = "0.1.3"
 
 logging.getLogger("camoufox_captcha").addHandler(logging.NullHandler())
 
+# public names loaded on first access, so importing the package doesn't load Playwright and the solvers
+_LAZY_ATTRIBUTES = {
+    'solve_cloudflare_by_click': '.cloudflare',
+    'solve_cloudflare_widgets': '.cloudflare',
+    'goto_and_solve': '.cloudflare',
+    'ChallengeWatcher': '.cloudflare',
+    'SolveResult': '.common.metrics',
+    'SolveHooks': '.common.metrics',
+    'WidgetResult': '.common.metrics',
+    'RetryPolicy': '.common.retry',
+    'register_shadow_selector_engine': '.common.selector_engine',
+    'shadow_selector': '.common.selector_engine',
+    'SHADOW_SELECTOR_ENGINE': '.common.selector_engine',
+    'SolverPool': '.pool',
+    'PoolResult': '.pool',
+    'solve_captcha_many': '.pool',
+    'PagePool': '.page_pool',
+    'PagePoolStats': '.page_pool',
+    'CAMOUFOX_LAUNCH_OPTIONS': '.page_pool',
+    'registry': '.registry',
+    'register_solver': '.registry',
+    'SolverRegistry': '.registry',
+    'SolverEntry': '.registry',
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value  # later accesses skip __getattr__
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
 
 async def solve_captcha(
         queryable: Union[Page, Frame, ElementHandle],
-        captcha_type: Literal["cloudflare"] = "cloudflare",
-        challenge_type: Literal["interstitial", "turnstile"] = "interstitial",
+        captcha_type: Literal["cloudflare", "auto"] = "cloudflare",
+        challenge_type: Literal["interstitial", "turnstile", "auto"] = "interstitial",
         method: Optional[str] = None,
+        timeout: Optional[float] = None,
         **kwargs
-) -> bool:
+) -> Union[bool, SolveResult]:
     """
     Universal captcha solving function
 
     This function provides a unified interface for solving different types of captcha
     Currently supports Cloudflare challenges, with more providers planned for future releases
+    (solvers are looked up in the registry, see register_solver)
 
     Args:
         queryable: Page, Frame or ElementHandle containing the captcha
         captcha_type: Type of captcha provider ("cloudflare", future: "hcaptcha", "recaptcha", etc.)
+                      or "auto" to detect it with the probes of all registered solvers in a single evaluation
         challenge_type: Type of challenge specific to the captcha provider:
-                       - For "cloudflare": "interstitial" or "turnstile" (defaults to "interstitial")
+                       - For "cloudflare": "interstitial", "turnstile" or "auto" to detect it from the page
+                         (defaults to "interstitial")
         method: Solving method (defaults to the best available method for the captcha type)
+        timeout: Optional overall time budget in seconds, the solve gives up cleanly once it is used up
         **kwargs: Additional parameters passed to the specific solver function
         
     Returns:
         bool: True if captcha was successfully solved, False otherwise
+              (SolveResult if return_result=True is passed to the solver)
         
     Example:
         ```python
@@ -56,34 +112,12 @@ async def solve_captcha(
         ```
     """
 
-    if captcha_type == "cloudflare":
-        challenge_type: Literal["interstitial", "turnstile"]
-
-        if not challenge_type:
-            challenge_type = "interstitial"
-
-        if challenge_type not in ("turnstile", "interstitial"):
-            raise ValueError(
-                f"Unsupported Cloudflare challenge type: '{challenge_type}'. "
-                f"Supported types are: 'interstitial' or 'turnstile'"
-            )
-
-        if method in (None, 'click'):
-            return await solve_cloudflare_by_click(
-                queryable,
-                challenge_type=challenge_type,
-                **kwargs
-            )
-
-        raise ValueError(
-            f"Unsupported method '{method}' for Cloudflare captcha. "
-            f"Currently only 'click' method is supported."
-        )
+    from .registry import registry
 
-    raise ValueError(
-        f"Unsupported captcha type: '{captcha_type}'. "
-        f"Currently only 'cloudflare' is supported."
-    )
+    return await registry.solve(queryable, captcha_type, challenge_type, method, timeout=timeout, **kwargs)
 
 
-__all__ = ['solve_captcha', 'solve_cloudflare_by_click']
+__all__ = ['solve_captcha', 'solve_cloudflare_by_click', 'solve_cloudflare_widgets', 'solve_captcha_many', 'SolverPool',
+           'PoolResult', 'SolveResult', 'SolveHooks', 'WidgetResult', 'goto_and_solve', 'ChallengeWatcher', 'registry',
+           'register_solver', 'SolverRegistry', 'SolverEntry', 'RetryPolicy', 'PagePool', 'PagePoolStats',
+           'CAMOUFOX_LAUNCH_OPTIONS', 'register_shadow_selector_engine', 'shadow_selector', 'SHADOW_SELECTOR_ENGINE']
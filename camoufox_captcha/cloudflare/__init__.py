@@ -1,7 +1,33 @@
 """
 Cloudflare Solving - Automatically solve Cloudflare turnstile and interstitial challenges
 """
+import importlib
+from typing import TYPE_CHECKING, Any
 
-from .solve_by_click import solve_cloudflare_by_click
+if TYPE_CHECKING:
+    from .solve_by_click import solve_cloudflare_by_click, solve_cloudflare_widgets
+    from .navigation import goto_and_solve, ChallengeWatcher
 
-__all__ = ['solve_cloudflare_by_click']
+# loaded on first access, see camoufox_captcha.__getattr__
+_LAZY_ATTRIBUTES = {
+    'solve_cloudflare_by_click': '.solve_by_click',
+    'solve_cloudflare_widgets': '.solve_by_click',
+    'goto_and_solve': '.navigation',
+    'ChallengeWatcher': '.navigation',
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+
+__all__ = ['solve_cloudflare_by_click', 'solve_cloudflare_widgets', 'goto_and_solve', 'ChallengeWatcher']
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+from typing import Optional, Union
+
+from playwright.async_api import Page, Response
+
+from camoufox_captcha.cloudflare.solve_by_click import CF_IFRAME_SRC_FILTER, solve_cloudflare_by_click
+from camoufox_captcha.cloudflare.utils.detection import is_cloudflare_challenge_response
+from camoufox_captcha.common.deadline import Deadline
+from camoufox_captcha.common.handles import dispose_handles
+from camoufox_captcha.common.metrics import SolveHooks, SolveMetrics, SolveResult
+from camoufox_captcha.common.shadow_root import wait_for_shadow_root_element
+
+logger = logging.getLogger("camoufox_captcha.cloudflare")
+
+# selector of the Cloudflare challenge iframe (inside a closed shadow root of the challenge page)
+CF_CHALLENGE_IFRAME_SELECTOR = f'iframe[src^="{CF_IFRAME_SRC_FILTER}"]'
+
+
+def _no_challenge_result(return_result: bool = False, hooks: Optional[SolveHooks] = None) -> Union[bool, SolveResult]:
+    """
+    Result of a navigation whose document response wasn't a challenge (nothing was probed or solved)
+    """
+
+    result = SolveMetrics(hooks).finish(True, 'no_challenge')
+    return result if return_result else result.success
+
+
+async def wait_for_challenge_iframe(page: Page, timeout: float) -> bool:
+    """
+    Wait until the Cloudflare challenge iframe is attached to the challenge page
+
+    :param page: Page showing the challenge
+    :param timeout: Maximum time to wait in seconds
+    :return: True if the iframe appeared, False otherwise
+    """
+
+    try:
+        iframe_element = await wait_for_shadow_root_element(page, CF_CHALLENGE_IFRAME_SELECTOR, timeout,
+                                                            visible=False)
+    except Exception as e:
+        logger.error(f'Error while waiting for Cloudflare iframe: {e}')
+        return False
+
+    if not iframe_element:
+        return False
+
+    await dispose_handles([iframe_element])
+    return True
+
+
+async def solve_challenge_response(
+        page: Page,
+        iframe_timeout: float = 10,
+        timeout: Optional[float] = None,
+        **kwargs
+) -> Union[bool, SolveResult]:
+    """
+    Solve an interstitial challenge already detected from the document response, as soon as its iframe is
+    attached instead of after a fixed delay
+
+    :param page: Page showing the challenge
+    :param iframe_timeout: Maximum time to wait for the challenge iframe in seconds
+    :param timeout: Optional overall time budget in seconds (includes the iframe wait)
+    :param kwargs: Additional parameters passed to solve_cloudflare_by_click
+    :return: True if solved, False otherwise (SolveResult if return_result is set)
+    """
+
+    deadline = Deadline(timeout)
+    if not await wait_for_challenge_iframe(page, deadline.clamp(iframe_timeout)):
+        logger.warning('Cloudflare iframe not attached in time, solving anyway')
+
+    return await solve_cloudflare_by_click(page, challenge_type='interstitial', timeout=deadline.remaining, **kwargs)
+
+
+async def goto_and_solve(
+        page: Page,
+        url: str,
+        wait_until: str = 'domcontentloaded',
+        goto_timeout: Optional[float] = None,
+        **kwargs
+) -> Union[bool, SolveResult]:
+    """
+    Navigate to the url and solve the Cloudflare interstitial challenge if the document response is one
+
+    The challenge is detected from the status and headers of the document response, so pages without a challenge
+    return right after navigation without any DOM probing and challenge pages start solving without a fixed delay
+
+    Example:
+        ```python
+        success = await goto_and_solve(page, 'https://example-with-cloudflare.com',
+                                       expected_content_selector='#content')
+        ```
+
+    :param page: Page to navigate
+    :param url: URL to navigate to
+    :param wait_until: When to consider the navigation finished (see Page.goto)
+    :param goto_timeout: Optional navigation timeout in seconds (Playwright's default if not set)
+    :param kwargs: Additional parameters passed to solve_cloudflare_by_click (and iframe_timeout)
+    :return: True if solved or no challenge was served, False otherwise (SolveResult if return_result is set)
+    """
+
+    goto_kwargs = {'wait_until': wait_until}
+    if goto_timeout is not None:
+        goto_kwargs['timeout'] = goto_timeout * 1000
+
+    response = await page.goto(url, **goto_kwargs)
+    if response is None or not is_cloudflare_challenge_response(response):
+        logger.info('No Cloudflare challenge in the document response')
+        return _no_challenge_result(kwargs.get('return_result', False), kwargs.get('hooks'))
+
+    logger.info('Cloudflare challenge detected from the document response')
+    return await solve_challenge_response(page, **kwargs)
+
+
+class ChallengeWatcher:
+    """
+    Page listener that detects Cloudflare interstitial challenges from main document responses
+    and starts solving them right away
+
+    Example:
+        ```python
+        async with ChallengeWatcher(page, expected_content_selector='#content') as watcher:
+            await page.goto('https://example-with-cloudflare.com')
+            success = await watcher.wait()
+        ```
+
+    :param page: Page to watch
+    :param solve_kwargs: Parameters passed to solve_cloudflare_by_click (and iframe_timeout, timeout)
+    """
+
+    def __init__(self, page: Page, **solve_kwargs):
+        self.page = page
+        self.solve_kwargs = solve_kwargs
+        self.challenge_detected = False
+        self._task: Optional[asyncio.Future] = None
+
+    def _on_response(self, response: Response) -> None:
+        try:
+            if response.frame != self.page.main_frame or not response.request.is_navigation_request():
+                return
+            if not is_cloudflare_challenge_response(response):
+                return
+        except Exception as e:
+            logger.error(f'Error inspecting document response: {e}')
+            return
+
+        self.challenge_detected = True
+
+        # challenge pages reload into another challenge response while being solved
+        if self._task and not self._task.done():
+            return
+
+        logger.info('Cloudflare challenge detected from the document response')
+        self._task = asyncio.ensure_future(solve_challenge_response(self.page, **self.solve_kwargs))
+
+    def start(self) -> 'ChallengeWatcher':
+        """
+        Start listening to the page responses
+        """
+
+        self.page.on('response', self._on_response)
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop listening and cancel a solve that is still running
+        """
+
+        self.page.remove_listener('response', self._on_response)
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+    async def wait(self) -> Union[bool, SolveResult]:
+        """
+        Wait for the solve started by the last challenge response
+
+        :return: Result of the solve, success if no challenge was detected
+                 (SolveResult if return_result is set)
+        """
+
+        if self._task is None:
+            return _no_challenge_result(self.solve_kwargs.get('return_result', False), self.solve_kwargs.get('hooks'))
+
+        return await self._task
+
+    async def __aenter__(self) -> 'ChallengeWatcher':
+        return self.start()
+
+    async def __aexit__(self, *args) -> None:
+        self.stop()
@@ -1,111 +1,698 @@
 import asyncio
 import logging
-from typing import Optional, Union, Literal
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Union, Literal, Tuple, List
 
 from playwright.async_api import Page, ElementHandle, Frame
 
-from camoufox_captcha.cloudflare.utils.detection import detect_cloudflare_challenge
+from camoufox_captcha.cloudflare.utils.detection import probe_cloudflare_challenge, locate_turnstile_container
 from camoufox_captcha.cloudflare.utils.dom_helpers import get_ready_checkbox
+from camoufox_captcha.common.deadline import Deadline
 from camoufox_captcha.common.detection import detect_expected_content
-from camoufox_captcha.common.shadow_root import search_shadow_root_iframes, search_shadow_root_elements
+from camoufox_captcha.common.frames import search_frame_tree
+from camoufox_captcha.common.geometry import take_geometry
+from camoufox_captcha.common.handles import HandleScope
+from camoufox_captcha.common.metrics import SolveHooks, SolveMetrics, SolveResult, WidgetResult, record_round_trips
+from camoufox_captcha.common.retry import RetryPolicy, DEFAULT_RETRY_POLICY
+from camoufox_captcha.common.selector_engine import shadow_selector
+from camoufox_captcha.common.shadow_root import search_shadow_root_iframes, search_shadow_root_elements, \
+    TraversalOptions
+from camoufox_captcha.common.tasks import first_ready
 
 logger = logging.getLogger("camoufox_captcha.cloudflare")
 
+# src of the Cloudflare challenge iframes
+CF_IFRAME_SRC_FILTER = 'https://challenges.cloudflare.com/cdn-cgi/challenge-platform/'
+
+# backoff bounds (in seconds) between success checks after the checkbox click
+VERIFY_INITIAL_DELAY = 0.25
+VERIFY_MAX_DELAY = 1
+
+
+@dataclass
+class SolveCheckpoint:
+    """
+    Progress of the previous solve attempt, a retry resumes from it while the Cloudflare iframes stay attached
+
+    :param challenge_type: Detected type of the challenge
+    :param iframes: Cloudflare iframes found for the challenge
+    :param iframe: Iframe the checkbox was found in
+    :param checkbox: Last checkbox handle (reused while it's still visible)
+    :param clicked: The checkbox was clicked but success wasn't verified
+    """
+
+    challenge_type: Optional[str] = None
+    iframes: List[Frame] = field(default_factory=list)
+    iframe: Optional[Frame] = None
+    checkbox: Optional[ElementHandle] = None
+    clicked: bool = False
+
+    def is_valid(self) -> bool:
+        """
+        :return: True if the iframes of the challenge are still attached (checked without round trips)
+        """
+
+        return bool(self.iframes) and not any(iframe.is_detached() for iframe in self.iframes)
+
+
+async def _checkbox_still_ready(checkbox: ElementHandle) -> bool:
+    """
+    Check that a previously found checkbox is still attached and visible
+    """
+
+    try:
+        record_round_trips()
+        return await checkbox.is_visible()
+    except Exception as e:
+        logger.debug(f'Previous checkbox is gone: {e}')
+        return False
+
+
+async def click_checkbox(
+        checkbox: ElementHandle,
+        attempts: int,
+        delay: float,
+        deadline: Deadline,
+        retry_policy: RetryPolicy
+) -> bool:
+    """
+    Click the checkbox, retrying failed clicks. A fresh geometry probed by get_ready_checkbox (poll mode) that
+    found the checkbox visible, enabled and not obscured lets the first click skip Playwright's actionability checks
+
+    :param checkbox: Checkbox input
+    :param attempts: Maximum number of attempts to click the checkbox
+    :param delay: Base delay between attempts in seconds
+    :param deadline: Deadline the delays are clamped to
+    :param retry_policy: RetryPolicy applied to the delay
+    :return: True if clicked, False otherwise
+    """
+
+    # geometry probed when the checkbox was found, only trusted for the first click
+    geometry = take_geometry(checkbox)
+
+    for attempt in range(attempts):
+        if attempt > 0 and delay:
+            await asyncio.sleep(deadline.clamp(retry_policy.delay(delay, attempt - 1)))
+
+        try:
+            record_round_trips()
+            if attempt == 0 and geometry and geometry.clickable:
+                # the probe already checked what the actionability checks would wait for
+                await checkbox.click(position=geometry.center, force=True)
+            else:
+                await checkbox.click()
+            logger.info('Checkbox clicked successfully')
+
+            return True
+        except Exception as e:
+            logger.error(f'Error clicking checkbox ({attempt + 1}/{attempts} attempt): {e}')
+
+    logger.error(f'Failed to click checkbox after maximum attempts')
+    return False
+
+
+async def find_cloudflare_iframes(
+        queryable: Union[Page, Frame, ElementHandle],
+        discovery: Literal["auto", "frame_tree", "dom"] = "auto"
+) -> List[Frame]:
+    """
+    Find Cloudflare challenge iframes, for an ElementHandle (e.g. turnstile container) the search is rooted
+    at the element first and falls back to the whole document if nothing is found there
+
+    :param queryable: Page, Frame, ElementHandle
+    :param discovery: "frame_tree" to match the frame URLs Playwright already knows (no round trips for a Page
+                      or Frame), "dom" to search the iframe elements in the shadow DOM, "auto" for the frame tree
+                      with the DOM search as a fallback (e.g. for iframes whose document isn't committed yet)
+    :return: List of Cloudflare iframes
+    """
+
+    if discovery not in ('auto', 'frame_tree', 'dom'):
+        raise ValueError(f"Unsupported iframe discovery: '{discovery}'. Supported are: 'auto', 'frame_tree', 'dom'")
+
+    if discovery != 'dom':
+        cf_iframes = []
+        if isinstance(queryable, ElementHandle):
+            cf_iframes = await search_frame_tree(queryable, CF_IFRAME_SRC_FILTER, root=queryable)
+        if not cf_iframes:
+            cf_iframes = await search_frame_tree(queryable, CF_IFRAME_SRC_FILTER)
+        if cf_iframes or discovery == 'frame_tree':
+            return cf_iframes
+
+    if isinstance(queryable, ElementHandle):
+        cf_iframes = await search_shadow_root_iframes(queryable, CF_IFRAME_SRC_FILTER,
+                                                      TraversalOptions(root=queryable))
+        if cf_iframes:
+            return cf_iframes
+
+    return await search_shadow_root_iframes(queryable, CF_IFRAME_SRC_FILTER)
+
+
+async def check_solved(
+        queryable: Union[Page, Frame, ElementHandle],
+        iframe: Frame,
+        challenge_type: Literal["interstitial", "turnstile"],
+        expected_content_selector: Optional[str] = None
+) -> Optional[str]:
+    """
+    Check once whether the Cloudflare challenge is solved
+
+    :param queryable: Page, Frame, ElementHandle
+    :param iframe: Cloudflare iframe the checkbox was clicked in
+    :param challenge_type: Type of Cloudflare challenge: "interstitial" or "turnstile"
+    :param expected_content_selector: Optional CSS selector to verify page content is accessible after solving
+    :return: Branch that detected success ("turnstile_success", "challenge_gone" or "expected_content"),
+             None if not solved
+    """
+
+    if challenge_type == "turnstile":
+        # for turnstile, check for success element in the cf's iframe or expected content is present
+        success_elements = await search_shadow_root_elements(iframe, 'div[id="success"]')
+        if success_elements:
+            return 'turnstile_success'
+
+        if await detect_expected_content(queryable, expected_content_selector):
+            return 'expected_content'
+
+        return None
+
+    # for interstitial, check if challenge is gone or expected content is present (single probe).
+    # turnstile indicators are checked because challenge-platform scripts may stay on the solved page
+    probe = await probe_cloudflare_challenge(queryable, expected_content_selector)
+    if not probe.turnstile:
+        return 'challenge_gone'
+
+    if probe.expected_content:
+        return 'expected_content'
+
+    return None
+
+
+async def wait_for_solved(
+        queryable: Union[Page, Frame, ElementHandle],
+        iframe: Frame,
+        challenge_type: Literal["interstitial", "turnstile"],
+        expected_content_selector: Optional[str] = None,
+        timeout: float = 6,
+        wait_mode: Literal["poll", "observe", "locator"] = "poll"
+) -> Optional[str]:
+    """
+    Wait until the Cloudflare challenge is solved, checking with a short backoff
+    (VERIFY_INITIAL_DELAY doubling up to VERIFY_MAX_DELAY) and returning as soon as success is detected
+
+    :param queryable: Page, Frame, ElementHandle
+    :param iframe: Cloudflare iframe the checkbox was clicked in
+    :param challenge_type: Type of Cloudflare challenge: "interstitial" or "turnstile"
+    :param expected_content_selector: Optional CSS selector to verify page content is accessible after solving
+    :param timeout: Upper bound in seconds to wait for Cloudflare to process the click
+    :param wait_mode: "locator" to also wait for the turnstile success element with a Playwright locator,
+                      resolving as soon as it is attached instead of on the next check
+    :return: Branch that detected success (see check_solved), None if not solved within the timeout
+    """
+
+    if challenge_type == 'turnstile' and wait_mode == 'locator':
+        return await first_ready([_locate_turnstile_success(iframe, timeout),
+                                  _poll_solved(queryable, iframe, challenge_type, expected_content_selector, timeout)])
+
+    return await _poll_solved(queryable, iframe, challenge_type, expected_content_selector, timeout)
+
+
+async def _locate_turnstile_success(iframe: Frame, timeout: float) -> Optional[str]:
+    locator = iframe.locator(shadow_selector('div[id="success"]')).first
+
+    try:
+        record_round_trips()
+        await locator.wait_for(state='attached', timeout=max(timeout * 1000, 1))
+    except Exception as e:
+        logger.debug(f'Turnstile success element not located: {e}')
+        return None
+
+    return 'turnstile_success'
+
+
+async def _poll_solved(
+        queryable: Union[Page, Frame, ElementHandle],
+        iframe: Frame,
+        challenge_type: Literal["interstitial", "turnstile"],
+        expected_content_selector: Optional[str],
+        timeout: float
+) -> Optional[str]:
+    waited = 0
+    delay = VERIFY_INITIAL_DELAY
+
+    while True:
+        delay = max(min(delay, timeout - waited), 0)
+        await asyncio.sleep(delay)
+        waited += delay
+
+        try:
+            solved_by = await check_solved(queryable, iframe, challenge_type, expected_content_selector)
+            if solved_by:
+                return solved_by
+        except Exception as e:
+            # the interstitial may be navigating away right now, check again on the next round
+            logger.debug(f'Error while verifying Cloudflare challenge: {e}')
+
+        if waited >= timeout:
+            return None
+
+        delay = min(delay * 2, VERIFY_MAX_DELAY)
+
 
 async def solve_cloudflare_by_click(
         queryable: Union[Page, Frame, ElementHandle],
-        challenge_type: Literal["interstitial", "turnstile"] = "interstitial",
+        challenge_type: Literal["interstitial", "turnstile", "auto"] = "interstitial",
         expected_content_selector: Optional[str] = None,
         solve_attempts: int = 3,
         solve_click_delay: int = 6,
         wait_checkbox_attempts: int = 10,
         wait_checkbox_delay: int = 6,
         checkbox_click_attempts: int = 3,
-        attempt_delay: int = 5
-) -> bool:
+        attempt_delay: int = 5,
+        wait_checkbox_mode: Literal["poll", "observe", "locator"] = "poll",
+        return_result: bool = False,
+        hooks: Optional[SolveHooks] = None,
+        timeout: Optional[float] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        checkbox_click_delay: float = 0,
+        iframe_discovery: Literal["auto", "frame_tree", "dom"] = "auto"
+) -> Union[bool, SolveResult]:
     """
     Solve Cloudflare challenge by searching for & clicking the checkbox input
 
     :param queryable: Page, Frame, ElementHandle
-    :param challenge_type: Type of Cloudflare challenge: "interstitial" or "turnstile"
+    :param challenge_type: Type of Cloudflare challenge: "interstitial", "turnstile" or "auto" to classify the page
+                           with the detection probe (turnstile widgets are then located on the page automatically)
     :param expected_content_selector: Optional CSS selector to verify page content is accessible after solving
     :param solve_attempts: Maximum number of attempts to solve the Cloudflare challenge
-    :param solve_click_delay: Delay after clicking the checkbox to allow Cloudflare to process the click
+    :param solve_click_delay: Maximum delay after clicking the checkbox to allow Cloudflare to process the click
+                              (success is checked with a short backoff and returned as soon as it is detected)
     :param wait_checkbox_attempts: Maximum number of attempts to find the checkbox and wait for it to be ready
     :param wait_checkbox_delay: Delay between wait_checkbox_attempts in seconds to find the checkbox and wait for it to be ready
     :param checkbox_click_attempts: Maximum number of attempts to click the checkbox
     :param attempt_delay: Delay between solve attempts in seconds
-    :return: True if solved, False otherwise
+    :param wait_checkbox_mode: "poll" to search for the checkbox every wait_checkbox_delay seconds, "observe" to
+                               wait for it with in-page observers or "locator" to wait with Playwright locators
+                               through the shadow selector engine, which also waits for the turnstile success element
+                               (register_shadow_selector_engine first, falls back to "observe" otherwise)
+                               (wait_checkbox_attempts * wait_checkbox_delay is then the overall timeout)
+    :param return_result: Return a SolveResult with per-phase durations, attempts, the deciding branch
+                          and round trips instead of a bool
+    :param hooks: Optional SolveHooks notified about every phase and the final SolveResult
+    :param timeout: Optional overall time budget in seconds, every inner wait shrinks to fit the remaining budget
+                    and the solve gives up with a "timed_out" result once it is used up
+    :param retry_policy: Optional RetryPolicy (backoff, jitter, cap) applied to the delays between solve attempts,
+                         checkbox searches and checkbox clicks, with attempt_delay, wait_checkbox_delay and
+                         checkbox_click_delay as their base delays (constant delays by default)
+    :param checkbox_click_delay: Delay between checkbox_click_attempts in seconds
+    :param iframe_discovery: How Cloudflare iframes are found: "frame_tree" (frame URLs known to Playwright),
+                             "dom" (shadow DOM search) or "auto" (frame tree, DOM search as a fallback)
+    :return: True if solved, False otherwise (SolveResult if return_result is set)
     """
 
     logger.info(f'Starting Cloudflare {challenge_type} challenge solving by click...')
 
-    for attempt in range(solve_attempts):
-        if attempt > 0:
-            await asyncio.sleep(attempt_delay)
+    deadline = Deadline(timeout)
+    metrics = SolveMetrics(hooks)
+    with metrics.activate():
+        try:
+            # inner waits fit the budget on their own, the hard cap only cuts off calls that hang
+            success, decided_by = await asyncio.wait_for(_solve_cloudflare_by_click(
+                queryable, metrics, deadline, challenge_type, expected_content_selector, solve_attempts,
+                solve_click_delay, wait_checkbox_attempts, wait_checkbox_delay, checkbox_click_attempts,
+                attempt_delay, wait_checkbox_mode, retry_policy or DEFAULT_RETRY_POLICY, checkbox_click_delay,
+                iframe_discovery
+            ), timeout=deadline.remaining)
+        except asyncio.TimeoutError:
+            success, decided_by = False, 'timed_out'
 
-            logger.warning(f'Retrying to solve ({attempt + 1}/{solve_attempts})...')
+    if decided_by == 'timed_out':
+        logger.error(f'Time budget of {timeout}s used up, giving up')
 
-        # 1. check if Cloudflare challenge is present
-        cloudflare_detected = await detect_cloudflare_challenge(queryable, challenge_type)
-        expected_content_detected = await detect_expected_content(queryable, expected_content_selector)
-        if not cloudflare_detected or expected_content_detected:
-            logger.info('No Cloudflare challenge detected')
-            return True
+    result = metrics.finish(success, decided_by)
+    return result if return_result else result.success
 
-        # 2. find Cloudflare iframes
-        cf_iframes = await search_shadow_root_iframes(
-            queryable, 'https://challenges.cloudflare.com/cdn-cgi/challenge-platform/'
-        )
-        if not cf_iframes:
-            logger.error(f'Cloudflare iframes not found')
-            continue
-
-        # 3. in all found iframes, search for the valid checkbox input and wait until it's ready to be clicked
-        checkbox_data = await get_ready_checkbox(cf_iframes,
-                                                 delay=wait_checkbox_delay,
-                                                 attempts=wait_checkbox_attempts)
-        if not checkbox_data:
-            logger.error(f'Cloudflare checkbox not found or not ready')
-            continue
-        iframe, checkbox = checkbox_data
-
-        logger.info('Found checkbox in Cloudflare iframe')
-
-        # 4. click the checkbox
-        for checkbox_click_attempt in range(checkbox_click_attempts):
-            try:
-                await checkbox.click()
-                logger.info('Checkbox clicked successfully')
-
-                break
-            except Exception as e:
-                logger.error(
-                    f'Error clicking checkbox ({checkbox_click_attempt + 1}/{checkbox_click_attempts} attempt): {e}')
-        else:
-            logger.error(
-                f'Failed to click checkbox after maximum attempts')
-            continue
-
-        # wait for Cloudflare to process the click
-        await asyncio.sleep(solve_click_delay)
-
-        # 5. verify success
-        if challenge_type == "turnstile":
-            # for turnstile, check for success element in the cf's iframe or expected content is present
-            success_elements = await search_shadow_root_elements(iframe, 'div[id="success"]')
-            challenge_solved = bool(success_elements)
-        else:
-            # for interstitial, check if challenge is gone or expected content is present
-            cloudflare_detected = await detect_cloudflare_challenge(queryable)
-            challenge_solved = not cloudflare_detected
-
-        expected_content_detected = await detect_expected_content(queryable, expected_content_selector)
-        if challenge_solved or expected_content_detected:
-            logger.info('Solved successfully')
-            return True
 
-        logger.warning('Failed to solve Cloudflare challenge')
+async def _solve_cloudflare_by_click(
+        queryable: Union[Page, Frame, ElementHandle],
+        metrics: SolveMetrics,
+        deadline: Deadline,
+        challenge_type: Literal["interstitial", "turnstile", "auto"],
+        expected_content_selector: Optional[str],
+        solve_attempts: int,
+        solve_click_delay: int,
+        wait_checkbox_attempts: int,
+        wait_checkbox_delay: int,
+        checkbox_click_attempts: int,
+        attempt_delay: int,
+        wait_checkbox_mode: Literal["poll", "observe", "locator"],
+        retry_policy: RetryPolicy,
+        checkbox_click_delay: float,
+        iframe_discovery: Literal["auto", "frame_tree", "dom"]
+) -> Tuple[bool, str]:
+    """
+    Solving loop of solve_cloudflare_by_click, see its docstring for the parameters
+
+    :return: (True if solved, branch that decided the outcome)
+    """
+
+    checkpoint = SolveCheckpoint()
+
+    # turnstile containers and checkboxes are disposed once the solve is over
+    async with HandleScope() as scope:
+        for attempt in range(solve_attempts):
+            if attempt > 0:
+                with metrics.phase('retry_delay'):
+                    await asyncio.sleep(deadline.clamp(retry_policy.delay(attempt_delay, attempt - 1)))
+
+                if deadline.expired:
+                    return False, 'timed_out'
+
+                logger.warning(f'Retrying to solve ({attempt + 1}/{solve_attempts})...')
+
+            metrics.attempts += 1
+
+            # the page may have changed during the retry delay, so detection runs on every attempt
+            # and a valid checkpoint only skips the iframe search (and the checkbox wait)
+            resumed = checkpoint.is_valid()
+            if not resumed:
+                checkpoint = SolveCheckpoint()
+
+            # 1. check if Cloudflare challenge is present (and which one in auto mode)
+            with metrics.phase('detection'):
+                probe = await probe_cloudflare_challenge(queryable, expected_content_selector)
+            if probe.expected_content:
+                logger.info('Expected content detected')
+                return True, 'expected_content'
+
+            if resumed:
+                attempt_type = checkpoint.challenge_type
+            else:
+                attempt_type = probe.classify() if challenge_type == 'auto' else challenge_type
+            if not attempt_type or not probe.detected(attempt_type):
+                logger.info('No Cloudflare challenge detected')
+                return True, 'no_challenge'
+
+            if resumed:
+                # the challenge iframes are still attached: skip the iframe search
+                logger.info('Cloudflare iframes still attached, resuming the previous attempt')
+
+                if checkpoint.clicked and attempt_type == 'turnstile':
+                    # the previous click may have been verified during the retry delay
+                    # (expected content was already checked by the probe)
+                    with metrics.phase('verification'):
+                        try:
+                            solved_by = await check_solved(queryable, checkpoint.iframe, attempt_type)
+                        except Exception as e:
+                            logger.debug(f'Error while verifying Cloudflare challenge: {e}')
+                            solved_by = None
+                    if solved_by:
+                        logger.info('Solved successfully')
+                        return True, solved_by
+            else:
+                checkpoint.challenge_type = metrics.challenge_type = attempt_type
+
+                # the widget's container scopes the iframe search when the caller didn't pass it
+                search_root = queryable
+                if challenge_type == 'auto':
+                    logger.info(f'Detected Cloudflare {attempt_type} challenge')
+
+                    if attempt_type == 'turnstile' and not isinstance(queryable, ElementHandle):
+                        with metrics.phase('detection'):
+                            search_root = scope.track(await locate_turnstile_container(queryable)) or queryable
+
+                # 2. find Cloudflare iframes
+                with metrics.phase('iframe_search'):
+                    checkpoint.iframes = await find_cloudflare_iframes(search_root, iframe_discovery)
+                if not checkpoint.iframes:
+                    logger.error(f'Cloudflare iframes not found')
+                    continue
+
+            # 3. in all found iframes, search for the valid checkbox input and wait until it's ready to be clicked
+            with metrics.phase('checkbox_wait'):
+                if not checkpoint.checkbox or not await _checkbox_still_ready(checkpoint.checkbox):
+                    checkbox_data = await get_ready_checkbox(checkpoint.iframes,
+                                                             delay=wait_checkbox_delay,
+                                                             attempts=wait_checkbox_attempts,
+                                                             wait_mode=wait_checkbox_mode,
+                                                             deadline=deadline,
+                                                             retry_policy=retry_policy)
+                    if not checkbox_data:
+                        logger.error(f'Cloudflare checkbox not found or not ready')
+                        continue
+
+                    checkpoint.iframe, checkpoint.checkbox = checkbox_data
+                    scope.track(checkpoint.checkbox)
+
+                    logger.info('Found checkbox in Cloudflare iframe')
+
+            iframe, checkbox = checkpoint.iframe, checkpoint.checkbox
+
+            # 4. click the checkbox
+            with metrics.phase('click'):
+                if not await click_checkbox(checkbox, checkbox_click_attempts, checkbox_click_delay, deadline,
+                                            retry_policy):
+                    continue
+
+            checkpoint.clicked = True
+
+            # 5. wait for Cloudflare to process the click and verify success
+            with metrics.phase('verification'):
+                solved_by = await wait_for_solved(queryable, iframe, checkpoint.challenge_type,
+                                                  expected_content_selector,
+                                                  timeout=deadline.clamp(solve_click_delay),
+                                                  wait_mode=wait_checkbox_mode)
+            if solved_by:
+                logger.info('Solved successfully')
+                return True, solved_by
+
+            logger.warning('Failed to solve Cloudflare challenge')
+
+            if deadline.expired:
+                return False, 'timed_out'
+
+    if deadline.expired:
+        return False, 'timed_out'
 
     logger.error('Max solving attempts reached, giving up')
-    return False
+    return False, 'max_attempts'
+
+
+async def solve_cloudflare_widgets(
+        queryable: Union[Page, Frame, ElementHandle],
+        challenge_type: Literal["turnstile"] = "turnstile",
+        expected_content_selector: Optional[str] = None,
+        solve_attempts: int = 3,
+        solve_click_delay: int = 6,
+        wait_checkbox_attempts: int = 10,
+        wait_checkbox_delay: int = 6,
+        checkbox_click_attempts: int = 3,
+        attempt_delay: int = 5,
+        wait_checkbox_mode: Literal["poll", "observe", "locator"] = "poll",
+        return_result: bool = False,
+        hooks: Optional[SolveHooks] = None,
+        timeout: Optional[float] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        checkbox_click_delay: float = 0,
+        iframe_discovery: Literal["auto", "frame_tree", "dom"] = "auto"
+) -> Union[bool, SolveResult]:
+    """
+    Solve every Cloudflare turnstile widget of the page at once: the challenge iframes are discovered once
+    and each widget's checkbox wait, click and verification run concurrently, so N widgets take about
+    the time of the slowest one instead of N solves
+
+    :param queryable: Page, Frame, ElementHandle (e.g. a form holding several widgets)
+    :param challenge_type: Only "turnstile" (interstitial pages hold a single widget)
+    :param expected_content_selector: Optional CSS selector of content shown once the page is passed, it solves
+                                      the page before the widgets are clicked and any widget whose verification
+                                      sees it
+    :param solve_attempts: Maximum number of attempts to solve each widget
+    :param solve_click_delay: Maximum delay after clicking a checkbox to allow Cloudflare to process the click
+    :param wait_checkbox_attempts: Maximum number of attempts to find a widget's checkbox and wait for it to be ready
+    :param wait_checkbox_delay: Delay between wait_checkbox_attempts in seconds
+    :param checkbox_click_attempts: Maximum number of attempts to click a checkbox
+    :param attempt_delay: Delay between the solve attempts of a widget in seconds
+    :param wait_checkbox_mode: "poll", "observe" or "locator", see solve_cloudflare_by_click
+    :param return_result: Return a SolveResult with the per-widget outcomes in SolveResult.widgets instead of a bool
+    :param hooks: Optional SolveHooks notified about every phase and the final SolveResult
+                  (phase durations are summed up over the widgets)
+    :param timeout: Optional overall time budget in seconds shared by all widgets
+    :param retry_policy: Optional RetryPolicy applied to the delays between attempts, checkbox searches and clicks
+    :param checkbox_click_delay: Delay between checkbox_click_attempts in seconds
+    :param iframe_discovery: How Cloudflare iframes are found: "frame_tree", "dom" or "auto"
+    :return: True if every widget was solved (or no widget is present), False otherwise
+             (SolveResult if return_result is set)
+    """
+
+    if challenge_type != 'turnstile':
+        raise ValueError(f"Unsupported challenge type for multi-widget solving: '{challenge_type}'. "
+                         f"Supported is: 'turnstile'")
+
+    logger.info('Starting Cloudflare turnstile multi-widget solving by click...')
+
+    deadline = Deadline(timeout)
+    metrics = SolveMetrics(hooks)
+    metrics.challenge_type = challenge_type
+    with metrics.activate():
+        try:
+            success, decided_by = await asyncio.wait_for(_solve_cloudflare_widgets(
+                queryable, metrics, deadline, expected_content_selector, solve_attempts, solve_click_delay, wait_checkbox_attempts,
+                wait_checkbox_delay, checkbox_click_attempts, attempt_delay, wait_checkbox_mode,
+                retry_policy or DEFAULT_RETRY_POLICY, checkbox_click_delay, iframe_discovery
+            ), timeout=deadline.remaining)
+        except asyncio.TimeoutError:
+            success, decided_by = False, 'timed_out'
+
+    if decided_by == 'timed_out':
+        logger.error(f'Time budget of {timeout}s used up, giving up')
+
+    result = metrics.finish(success, decided_by)
+    return result if return_result else result.success
+
+
+async def _solve_cloudflare_widgets(
+        queryable: Union[Page, Frame, ElementHandle],
+        metrics: SolveMetrics,
+        deadline: Deadline,
+        expected_content_selector: Optional[str],
+        solve_attempts: int,
+        solve_click_delay: int,
+        wait_checkbox_attempts: int,
+        wait_checkbox_delay: int,
+        checkbox_click_attempts: int,
+        attempt_delay: int,
+        wait_checkbox_mode: Literal["poll", "observe", "locator"],
+        retry_policy: RetryPolicy,
+        checkbox_click_delay: float,
+        iframe_discovery: Literal["auto", "frame_tree", "dom"]
+) -> Tuple[bool, str]:
+    """
+    Discovery and concurrent widget stage of solve_cloudflare_widgets, see its docstring for the parameters
+
+    :return: (True if every widget was solved, branch that decided the outcome)
+    """
+
+    # 1. check if any turnstile widget is present
+    with metrics.phase('detection'):
+        probe = await probe_cloudflare_challenge(queryable, expected_content_selector)
+    if probe.expected_content:
+        logger.info('Expected content detected')
+        return True, 'expected_content'
+
+    if not probe.turnstile:
+        logger.info('No Cloudflare challenge detected')
+        return True, 'no_challenge'
+
+    # 2. find the iframes of all widgets once
+    with metrics.phase('iframe_search'):
+        iframes = await find_cloudflare_iframes(queryable, iframe_discovery)
+    if not iframes:
+        logger.error(f'Cloudflare iframes not found')
+        return False, 'iframes_not_found'
+
+    logger.info(f'Found {len(iframes)} Cloudflare widget iframes')
+
+    # widgets are decided in place, so their outcomes survive the time budget cutting the stage off
+    metrics.widgets = [WidgetResult(index=index, iframe=iframe, decided_by='timed_out')
+                       for index, iframe in enumerate(iframes)]
+
+    # 3. solve the widgets concurrently, checkboxes are disposed once all of them are over
+    started = time.perf_counter()
+    async with HandleScope() as scope:
+        await asyncio.gather(*(
+            _solve_widget(queryable, widget, started, metrics, scope, deadline, expected_content_selector,
+                          solve_attempts, solve_click_delay,
+                          wait_checkbox_attempts, wait_checkbox_delay, checkbox_click_attempts, attempt_delay,
+                          wait_checkbox_mode, retry_policy, checkbox_click_delay)
+            for widget in metrics.widgets
+        ))
+
+    solved = sum(widget.success for widget in metrics.widgets)
+    if solved == len(metrics.widgets):
+        logger.info('All widgets solved successfully')
+        return True, 'all_widgets_solved'
+
+    logger.error(f'Solved {solved} of {len(metrics.widgets)} widgets')
+    if deadline.expired:
+        return False, 'timed_out'
+
+    return False, 'widgets_failed'
+
+
+async def _solve_widget(
+        queryable: Union[Page, Frame, ElementHandle],
+        widget: WidgetResult,
+        started: float,
+        metrics: SolveMetrics,
+        scope: HandleScope,
+        deadline: Deadline,
+        expected_content_selector: Optional[str],
+        solve_attempts: int,
+        solve_click_delay: int,
+        wait_checkbox_attempts: int,
+        wait_checkbox_delay: int,
+        checkbox_click_attempts: int,
+        attempt_delay: int,
+        wait_checkbox_mode: Literal["poll", "observe", "locator"],
+        retry_policy: RetryPolicy,
+        checkbox_click_delay: float
+) -> None:
+    """
+    Wait for, click and verify the checkbox of a single widget, recording the outcome in the WidgetResult
+    """
+
+    try:
+        for attempt in range(solve_attempts):
+            if attempt > 0:
+                with metrics.phase('retry_delay'):
+                    await asyncio.sleep(deadline.clamp(retry_policy.delay(attempt_delay, attempt - 1)))
+
+                if deadline.expired:
+                    widget.decided_by = 'timed_out'
+                    return
+
+            widget.attempts += 1
+            metrics.attempts = max(metrics.attempts, widget.attempts)
+
+            with metrics.phase('checkbox_wait'):
+                checkbox_data = await get_ready_checkbox([widget.iframe],
+                                                         delay=wait_checkbox_delay,
+                                                         attempts=wait_checkbox_attempts,
+                                                         wait_mode=wait_checkbox_mode,
+                                                         deadline=deadline,
+                                                         retry_policy=retry_policy)
+            if not checkbox_data:
+                logger.error(f'Cloudflare checkbox of widget {widget.index} not found or not ready')
+                widget.decided_by = 'checkbox_not_found'
+                continue
+
+            checkbox = scope.track(checkbox_data[1])
+
+            with metrics.phase('click'):
+                if not await click_checkbox(checkbox, checkbox_click_attempts, checkbox_click_delay, deadline,
+                                            retry_policy):
+                    widget.decided_by = 'click_failed'
+                    continue
+
+            # the widget's own iframe holds its success element
+            with metrics.phase('verification'):
+                solved_by = await wait_for_solved(queryable, widget.iframe, 'turnstile', expected_content_selector,
+                                                  timeout=deadline.clamp(solve_click_delay),
+                                                  wait_mode=wait_checkbox_mode)
+            if solved_by:
+                logger.info(f'Widget {widget.index} solved successfully')
+                widget.success, widget.decided_by = True, solved_by
+                return
+
+            logger.warning(f'Failed to solve widget {widget.index}')
+            widget.decided_by = 'max_attempts'
+
+            if deadline.expired:
+                widget.decided_by = 'timed_out'
+                return
+    except Exception as e:
+        # one broken widget (e.g. its iframe got detached) must not fail the others
+        logger.error(f'Error solving widget {widget.index}: {e}')
+        widget.decided_by = 'error'
+    finally:
+        widget.duration = time.perf_counter() - started
@@ -1,17 +1,14 @@
-from typing import Literal, Union
+from dataclasses import dataclass
+from typing import Literal, Optional, Union
 
-from playwright.async_api import ElementHandle, Frame, Page
+from playwright.async_api import ElementHandle, Frame, Page, Response
 
-# selectors for detecting Cloudflare interstitial challenge (page)
-CF_INTERSTITIAL_INDICATORS_SELECTORS = [
-    'script[src*="/cdn-cgi/challenge-platform/"]',
-]
-
-# selectors for detecting Cloudflare turnstile challenge (small embedded captcha)
-CF_TURNSTILE_INDICATORS_SELECTORS = [
-    'input[name="cf-turnstile-response"]',
-    'script[src*="challenges.cloudflare.com/turnstile/v0"]',
-]
+from camoufox_captcha.cloudflare.utils.selectors import CF_INTERSTITIAL_INDICATORS_SELECTORS, \
+    CF_TURNSTILE_RESPONSE_SELECTOR, CF_TURNSTILE_INDICATORS_SELECTORS, CF_TURNSTILE_CONTAINER_SELECTORS
+from camoufox_captcha.common.detection import detect_expected_content, OPEN_SHADOW_MATCHER_JS
+from camoufox_captcha.common.evaluate import evaluate_in_scope, evaluate_handle_in_scope
+from camoufox_captcha.common.handles import dispose_handles
+from camoufox_captcha.common.metrics import record_round_trips
 
 
 async def detect_cloudflare_challenge(
@@ -28,9 +25,154 @@ async def detect_cloudflare_challenge(
 
     selectors = CF_TURNSTILE_INDICATORS_SELECTORS if challenge_type == 'turnstile' else CF_INTERSTITIAL_INDICATORS_SELECTORS
     for selector in selectors:
+        record_round_trips()
         element = await queryable.query_selector(selector)
         if not element:
             continue
         return True
 
     return False
+
+
+@dataclass
+class ChallengeProbe:
+    """
+    Result of a single batched Cloudflare detection probe
+
+    :param interstitial: True if any of CF_INTERSTITIAL_INDICATORS_SELECTORS matched
+    :param turnstile: True if any of CF_TURNSTILE_INDICATORS_SELECTORS matched
+    :param expected_content: True if the expected content selector matched
+    """
+
+    interstitial: bool
+    turnstile: bool
+    expected_content: bool
+
+    def detected(self, challenge_type: Literal['turnstile', 'interstitial'] = 'turnstile') -> bool:
+        """
+        :param challenge_type: Type of challenge to check ('turnstile' or 'interstitial')
+        :return: True if the challenge of the given type was detected
+        """
+
+        return self.turnstile if challenge_type == 'turnstile' else self.interstitial
+
+    def classify(self) -> Optional[Literal['interstitial', 'turnstile']]:
+        """
+        Classify the challenge, interstitial pages embed turnstile indicators too, so they take precedence
+
+        :return: "interstitial", "turnstile" or None if no challenge was detected
+        """
+
+        if self.interstitial:
+            return 'interstitial'
+        if self.turnstile:
+            return 'turnstile'
+        return None
+
+
+async def probe_cloudflare_challenge(
+        queryable: Union[Page, Frame, ElementHandle],
+        expected_content_selector: Optional[str] = None
+) -> ChallengeProbe:
+    """
+    Check all interstitial and turnstile indicator selectors and the expected content selector in one evaluation
+
+    :param queryable: Page, Frame, ElementHandle
+    :param expected_content_selector: Optional CSS selector for the expected content
+    :return: ChallengeProbe with the detection results
+    """
+
+    # script to match every indicator group in the scope of the queryable object at once
+    # (open shadow roots included, as query_selector would)
+    js = """
+    (root, {interstitial, turnstile, expected}) => {
+        const matcher = (%s)(root);
+        const matches = (selectors) => selectors.some(matcher);
+
+        let expectedContent = false;
+        if (expected) {
+            try {
+                expectedContent = matcher(expected);
+            } catch (e) {
+                expectedContent = null;  // not a CSS selector (e.g. Playwright "text=" selector)
+            }
+        }
+
+        return {interstitial: matches(interstitial), turnstile: matches(turnstile), expectedContent};
+    }
+    """ % OPEN_SHADOW_MATCHER_JS
+
+    result = await evaluate_in_scope(queryable, js, {
+        'interstitial': CF_INTERSTITIAL_INDICATORS_SELECTORS,
+        'turnstile': CF_TURNSTILE_INDICATORS_SELECTORS,
+        'expected': expected_content_selector,
+    })
+
+    expected_content = result['expectedContent']
+    if expected_content is None:
+        # fall back to Playwright's selector engine for selectors the page can't handle
+        expected_content = await detect_expected_content(queryable, expected_content_selector)
+
+    return ChallengeProbe(
+        interstitial=result['interstitial'],
+        turnstile=result['turnstile'],
+        expected_content=expected_content
+    )
+
+
+async def locate_turnstile_container(queryable: Union[Page, Frame, ElementHandle]) -> Optional[ElementHandle]:
+    """
+    Locate the element the turnstile widget is rendered into
+
+    :param queryable: Page, Frame, ElementHandle
+    :return: ElementHandle of the turnstile container or None if no widget was found
+    """
+
+    # script to walk up from the widget's response input to its container
+    js = """
+    (root, {response, containers}) => {
+        const input = root.querySelector(response);
+        if (!input) return null;
+
+        for (const selector of containers) {
+            const container = input.closest(selector);
+            if (container) return container;
+        }
+        return input.parentElement;
+    }
+    """
+
+    handle = await evaluate_handle_in_scope(queryable, js, {
+        'response': CF_TURNSTILE_RESPONSE_SELECTOR,
+        'containers': CF_TURNSTILE_CONTAINER_SELECTORS,
+    })
+
+    container = handle.as_element()
+    if not container:
+        await dispose_handles([handle])
+
+    return container
+
+
+# statuses of the main document served with a Cloudflare challenge
+CF_CHALLENGE_STATUSES = (403, 503)
+
+
+def is_cloudflare_challenge_response(response: Response) -> bool:
+    """
+    Detect a Cloudflare interstitial challenge from the status and headers of a document response,
+    before anything is rendered
+
+    Cloudflare marks challenge responses with the "cf-mitigated: challenge" header, older challenge pages
+    are recognized by a 403/503 status served by Cloudflare
+
+    :param response: Response of the main document
+    :return: True if the response is a Cloudflare challenge, False otherwise
+    """
+
+    # response.headers is populated from the already received response, reading it costs no round trip
+    headers = response.headers
+    if headers.get('cf-mitigated', '').lower() == 'challenge':
+        return True
+
+    return response.status in CF_CHALLENGE_STATUSES and headers.get('server', '').lower() == 'cloudflare'
@@ -1,10 +1,17 @@
 import asyncio
 import logging
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Literal
 
-from playwright.async_api import Frame, ElementHandle
+from playwright.async_api import Frame, ElementHandle, TimeoutError as PlaywrightTimeoutError
 
-from camoufox_captcha.common.shadow_root import search_shadow_root_elements
+from camoufox_captcha.common.deadline import Deadline
+from camoufox_captcha.common.geometry import probe_elements, remember_geometry
+from camoufox_captcha.common.handles import dispose_handles
+from camoufox_captcha.common.metrics import record_round_trips
+from camoufox_captcha.common.retry import RetryPolicy, DEFAULT_RETRY_POLICY
+from camoufox_captcha.common.selector_engine import shadow_selector
+from camoufox_captcha.common.shadow_root import search_shadow_root_elements, wait_for_shadow_root_element
+from camoufox_captcha.common.tasks import first_ready
 
 logger = logging.getLogger("camoufox_captcha.cloudflare")
 
@@ -12,15 +19,24 @@ logger = logging.getLogger("camoufox_captcha.cloudflare")
 async def get_ready_checkbox(
         iframes: List[Frame],
         delay: int,
-        attempts: int
+        attempts: int,
+        wait_mode: Literal["poll", "observe", "locator"] = "poll",
+        deadline: Optional[Deadline] = None,
+        retry_policy: Optional[RetryPolicy] = None
 ) -> Optional[Tuple[Frame, ElementHandle]]:
     """
     Accepts a list of Cloudflare iframes, sorts out detached ones, collects checkboxes from the remaining iframes,
     and waits until at least one checkbox is found and ready to be clicked (visible)
 
     :param iframes: Cloudflare iframes
-    :param delay: Delay in seconds between attempts to find the checkbox
+    :param delay: Delay in seconds between attempts to find the checkbox (base delay of the retry policy)
     :param attempts: Maximum number of attempts to find the checkbox
+    :param wait_mode: "poll" to search every `delay` seconds, "observe" to wait for the checkbox with in-page
+                      observers or "locator" to wait with Playwright locators through the shadow selector engine
+                      (see register_shadow_selector_engine), both resolving as soon as it is visible
+                      (the sum of the `attempts` delays is then the overall timeout)
+    :param deadline: Optional overall time budget, waits shrink to fit it and the search stops once it is used up
+    :param retry_policy: Optional RetryPolicy scheduling the delays between attempts (constant `delay` by default)
     :return: [checkboxes Frame, checkboxes ElementHandle] if checkbox is found and ready, None otherwise
     """
 
@@ -28,39 +44,167 @@ async def get_ready_checkbox(
     if attempts <= 0:
         attempts = 1
 
-    for attempt in range(attempts):
-        try:
-            checkboxes = []
+    deadline = deadline or Deadline()
+    retry_policy = retry_policy or DEFAULT_RETRY_POLICY
 
-            # search for checkboxes in each iframe
-            for iframe in iframes:
-                try:
-                    if iframe.is_detached():  # skip detached iframes
-                        continue
-
-                    iframe_checkboxes = await search_shadow_root_elements(iframe, 'input[type="checkbox"]')
+    if wait_mode == "locator":
+        timeout = deadline.clamp(retry_policy.total(delay, attempts))
+        try:
+            return await locate_ready_checkbox(iframes, timeout=timeout)
+        except Exception as e:
+            # the shadow selector engine isn't registered for this browser
+            logger.warning(f'Locator wait unavailable, observing instead: {e}')
+            return await observe_ready_checkbox(iframes, timeout=deadline.clamp(timeout))
 
-                    # add found checkboxes to the list with their parent iframe
-                    checkboxes += [(iframe, iframe_checkbox) for iframe_checkbox in iframe_checkboxes]
-                except Exception as e:
-                    logger.error(f'Error searching for checkboxes in iframe: {e}')
+    if wait_mode == "observe":
+        return await observe_ready_checkbox(iframes, timeout=deadline.clamp(retry_policy.total(delay, attempts)))
 
-            logger.info(f'Found {len(checkboxes)} checkboxes in {len(iframes)} Cloudflare iframes')
+    for attempt in range(attempts):
+        if attempt > 0 and deadline.expired:
+            logger.error('Time budget used up while waiting for Cloudflare checkbox input')
+            return None
 
-            # filter checkboxes that are visible and ready to be clicked
-            visible_checkboxes = []
-            for iframe, checkbox in checkboxes:
-                if await checkbox.is_visible():
-                    visible_checkboxes.append((iframe, checkbox))
+        try:
+            # search all non-detached iframes at once, the first iframe with a visible checkbox wins
+            active_iframes = [iframe for iframe in iframes if not iframe.is_detached()]
+            checkbox_data = await first_ready((find_ready_checkbox(iframe) for iframe in active_iframes),
+                                              release=_release_checkbox)
 
-            if visible_checkboxes:
+            if checkbox_data:
                 logger.info('Checkbox input is ready to be clicked')
-                return visible_checkboxes[0]  # return the first visible checkbox
+                return checkbox_data
 
-            logger.info('Waiting for Cloudflare checkbox input...')
-            await asyncio.sleep(delay)
+            logger.info(f'Waiting for Cloudflare checkbox input in {len(active_iframes)} iframes...')
+            await asyncio.sleep(deadline.clamp(retry_policy.delay(delay, attempt)))
         except Exception as e:
             logger.error(f'Error while waiting for checkbox: {e}')
 
     logger.error('Max attempts reached while waiting for Cloudflare checkbox input')
     return None
+
+
+async def _release_checkbox(checkbox_data: Tuple[Frame, ElementHandle]) -> None:
+    """
+    Dispose the handle of a ready checkbox that lost the race against another iframe's checkbox
+    """
+
+    await dispose_handles([checkbox_data[1]])
+
+
+async def find_ready_checkbox(iframe: Frame) -> Optional[Tuple[Frame, ElementHandle]]:
+    """
+    Searches the iframe for checkboxes and checks their visibility with a single geometry probe
+
+    :param iframe: Cloudflare iframe
+    :return: [checkboxes Frame, checkboxes ElementHandle] of the first visible checkbox, None otherwise
+    """
+
+    try:
+        checkboxes = await search_shadow_root_elements(iframe, 'input[type="checkbox"]')
+    except Exception as e:
+        logger.error(f'Error searching for checkboxes in iframe: {e}')
+        return None
+
+    # measure all candidates in one evaluation, the click reuses the geometry of the ready one
+    try:
+        geometries = await probe_elements(iframe, checkboxes)
+    except Exception as e:
+        # e.g. the iframe detached or navigated: the candidates are gone, the next attempt searches again
+        logger.error(f'Error checking checkboxes in iframe: {e}')
+        await dispose_handles(checkboxes)
+        return None
+    ready_checkbox, ready_geometry = next(((checkbox, geometry) for checkbox, geometry in zip(checkboxes, geometries)
+                                           if geometry.visible), (None, None))
+
+    # release the handles of the checkboxes that won't be clicked
+    await dispose_handles(checkbox for checkbox in checkboxes if checkbox is not ready_checkbox)
+
+    if not ready_checkbox:
+        return None
+
+    remember_geometry(ready_checkbox, ready_geometry)
+    return iframe, ready_checkbox
+
+
+async def observe_ready_checkbox(
+        iframes: List[Frame],
+        timeout: float
+) -> Optional[Tuple[Frame, ElementHandle]]:
+    """
+    Waits in all non-detached Cloudflare iframes at once for a visible checkbox using in-page observers
+    and returns the first one that becomes ready
+
+    :param iframes: Cloudflare iframes
+    :param timeout: Maximum time to wait in seconds
+    :return: [checkboxes Frame, checkboxes ElementHandle] if checkbox is found and ready, None otherwise
+    """
+
+    async def observe(iframe: Frame) -> Optional[Tuple[Frame, ElementHandle]]:
+        try:
+            checkbox = await wait_for_shadow_root_element(iframe, 'input[type="checkbox"]', timeout=timeout)
+        except Exception as e:
+            logger.error(f'Error observing checkboxes in iframe: {e}')
+            return None
+
+        return (iframe, checkbox) if checkbox else None
+
+    active_iframes = [iframe for iframe in iframes if not iframe.is_detached()]
+
+    logger.info(f'Waiting for Cloudflare checkbox input in {len(active_iframes)} iframes...')
+
+    # first ready checkbox wins, waiting in the other iframes is cancelled (in the page as well)
+    checkbox_data = await first_ready((observe(iframe) for iframe in active_iframes), release=_release_checkbox)
+    if checkbox_data:
+        logger.info('Checkbox input is ready to be clicked')
+        return checkbox_data
+
+    logger.error('Timed out while waiting for Cloudflare checkbox input')
+    return None
+
+
+async def locate_ready_checkbox(
+        iframes: List[Frame],
+        timeout: float
+) -> Optional[Tuple[Frame, ElementHandle]]:
+    """
+    Waits in all non-detached Cloudflare iframes at once for a visible checkbox with Playwright locators
+    (auto-waiting runs in the browser, the shadow selector engine pierces the closed shadow roots)
+
+    :param iframes: Cloudflare iframes
+    :param timeout: Maximum time to wait in seconds
+    :return: [checkboxes Frame, checkboxes ElementHandle] if checkbox is found and ready, None otherwise
+    :raises Exception: If the shadow selector engine is not registered
+    """
+
+    # Playwright treats a zero timeout as no timeout
+    timeout_ms = max(timeout * 1000, 1)
+
+    async def locate(iframe: Frame) -> Optional[Tuple[Frame, ElementHandle]]:
+        locator = iframe.locator(shadow_selector('input[type="checkbox"]') + ' >> visible=true').first
+
+        try:
+            record_round_trips(2)
+            await locator.wait_for(state='visible', timeout=timeout_ms)
+            checkbox = await locator.element_handle(timeout=timeout_ms)
+        except PlaywrightTimeoutError:
+            return None
+        except Exception as e:
+            if 'Unknown engine' in str(e):
+                raise
+            logger.error(f'Error locating checkboxes in iframe: {e}')
+            return None
+
+        return (iframe, checkbox) if checkbox else None
+
+    active_iframes = [iframe for iframe in iframes if not iframe.is_detached()]
+
+    logger.info(f'Waiting for Cloudflare checkbox input in {len(active_iframes)} iframes...')
+
+    # first ready checkbox wins, waiting in the other iframes is cancelled
+    checkbox_data = await first_ready((locate(iframe) for iframe in active_iframes), release=_release_checkbox)
+    if checkbox_data:
+        logger.info('Checkbox input is ready to be clicked')
+        return checkbox_data
+
+    logger.error('Timed out while waiting for Cloudflare checkbox input')
+    return None
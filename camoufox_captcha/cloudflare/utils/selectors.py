@@ -0,0 +1,21 @@
+# Cloudflare selectors (kept free of imports, the solver registry loads them without loading Playwright)
+
+# selectors for detecting Cloudflare interstitial challenge (page)
+CF_INTERSTITIAL_INDICATORS_SELECTORS = [
+    'script[src*="/cdn-cgi/challenge-platform/"]',
+]
+
+# hidden input turnstile writes its token to (rendered inside the widget container)
+CF_TURNSTILE_RESPONSE_SELECTOR = 'input[name="cf-turnstile-response"]'
+
+# selectors for detecting Cloudflare turnstile challenge (small embedded captcha)
+CF_TURNSTILE_INDICATORS_SELECTORS = [
+    CF_TURNSTILE_RESPONSE_SELECTOR,
+    'script[src*="challenges.cloudflare.com/turnstile/v0"]',
+]
+
+# selectors of the element turnstile is rendered into (falls back to the parent of the response input)
+CF_TURNSTILE_CONTAINER_SELECTORS = [
+    '.cf-turnstile',
+    '[data-sitekey]',
+]
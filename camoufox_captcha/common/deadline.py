@@ -0,0 +1,44 @@
+import time
+from typing import Optional
+
+
+class Deadline:
+    """
+    Overall time budget shared by the phases of a solve, inner waits shrink to fit the remaining budget
+
+    :param timeout: Budget in seconds, None for no limit
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self._expires_at = time.monotonic() + timeout if timeout is not None else None
+
+    @property
+    def remaining(self) -> Optional[float]:
+        """
+        :return: Remaining budget in seconds (never negative), None if there is no limit
+        """
+
+        if self._expires_at is None:
+            return None
+
+        return max(self._expires_at - time.monotonic(), 0)
+
+    @property
+    def expired(self) -> bool:
+        """
+        :return: True if the budget is used up
+        """
+
+        return self.remaining == 0
+
+    def clamp(self, delay: float) -> float:
+        """
+        Shrink a delay or timeout to fit the remaining budget
+
+        :param delay: Delay or timeout in seconds
+        :return: The delay, or the remaining budget if it is smaller
+        """
+
+        remaining = self.remaining
+        return delay if remaining is None else min(delay, remaining)
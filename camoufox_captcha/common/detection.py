@@ -2,6 +2,35 @@ from typing import Optional, Union
 
 from playwright.async_api import ElementHandle, Frame, Page
 
+from camoufox_captcha.common.metrics import record_round_trips
+
+# JS function source: (root) => (selector) => bool, matching the selector in the light DOM of root and in its
+# open shadow roots like Playwright's query_selector does (the open shadow roots are collected once per matcher,
+# on the first light DOM miss)
+OPEN_SHADOW_MATCHER_JS = """
+(root) => {
+    let shadowRoots = null;
+
+    function collect(node, roots) {
+        const walker = document.createTreeWalker(node, NodeFilter.SHOW_ELEMENT);
+        for (let el = walker.currentNode; el; el = walker.nextNode()) {
+            if (el.shadowRoot) {
+                roots.push(el.shadowRoot);
+                collect(el.shadowRoot, roots);
+            }
+        }
+        return roots;
+    }
+
+    return (selector) => {
+        if (root.querySelector(selector)) return true;
+
+        shadowRoots = shadowRoots || collect(root, []);
+        return shadowRoots.some((shadowRoot) => shadowRoot.querySelector(selector));
+    };
+}
+"""
+
 
 async def detect_expected_content(
         queryable: Union[Page, Frame, ElementHandle],
@@ -18,5 +47,6 @@ async def detect_expected_content(
     if not expected_content_selector:
         return False
 
+    record_round_trips()
     element = await queryable.query_selector(expected_content_selector)
     return bool(element)
@@ -0,0 +1,62 @@
+from typing import Any, Union
+
+from playwright.async_api import ElementHandle, Frame, JSHandle, Page
+
+from camoufox_captcha.common.metrics import record_round_trips
+
+
+def _bind_scope(
+        queryable: Union[Page, Frame, ElementHandle],
+        js: str
+) -> str:
+    """
+    Bind a `(root, arg) => ...` JS function to the queryable object's scope
+
+    ElementHandle.evaluate passes the element itself as the first argument, for Page and Frame the function
+    is wrapped so that it receives the document as the root instead
+
+    :param queryable: Page, Frame, ElementHandle
+    :param js: JS function source that accepts the scope root and one argument
+    :return: JS function source ready to be evaluated on the queryable object
+    """
+
+    if isinstance(queryable, ElementHandle):
+        return js
+
+    return f"(arg) => ({js})(document, arg)"
+
+
+async def evaluate_in_scope(
+        queryable: Union[Page, Frame, ElementHandle],
+        js: str,
+        arg: Any = None
+) -> Any:
+    """
+    Evaluate a `(root, arg) => ...` JS function where root is the element or the document of the queryable object
+
+    :param queryable: Page, Frame, ElementHandle
+    :param js: JS function source that accepts the scope root and one argument
+    :param arg: Argument passed to the JS function (must be serializable)
+    :return: JSON-serializable result of the evaluation
+    """
+
+    record_round_trips()
+    return await queryable.evaluate(_bind_scope(queryable, js), arg)
+
+
+async def evaluate_handle_in_scope(
+        queryable: Union[Page, Frame, ElementHandle],
+        js: str,
+        arg: Any = None
+) -> JSHandle:
+    """
+    Same as evaluate_in_scope but returns the result as a JSHandle
+
+    :param queryable: Page, Frame, ElementHandle
+    :param js: JS function source that accepts the scope root and one argument
+    :param arg: Argument passed to the JS function
+    :return: JSHandle of the evaluation result
+    """
+
+    record_round_trips()
+    return await queryable.evaluate_handle(_bind_scope(queryable, js), arg)
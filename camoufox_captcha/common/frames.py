@@ -0,0 +1,117 @@
+import logging
+from typing import Dict, List, Optional, Union
+
+from playwright.async_api import ElementHandle, Frame, Page
+
+from camoufox_captcha.common.evaluate import evaluate_in_scope
+from camoufox_captcha.common.handles import HandleScope
+from camoufox_captcha.common.metrics import record_round_trips
+
+logger = logging.getLogger("camoufox_captcha.common")
+
+
+def _descendant_frames(frame: Frame) -> List[Frame]:
+    """
+    Frames nested in the frame, in tree order (read from Playwright's frame tree, no round trips)
+    """
+
+    frames = []
+    pending = list(frame.child_frames)
+    while pending:
+        child = pending.pop(0)
+        frames.append(child)
+        pending.extend(child.child_frames)
+
+    return frames
+
+
+async def _frames_within(root: ElementHandle, owner: Optional[Frame], frames: List[Frame]) -> List[Frame]:
+    """
+    Keep the frames whose iframe element (or the iframe of their ancestor in the root's document)
+    is inside the root element, across shadow root boundaries
+
+    :param root: Element the frames must be nested in
+    :param owner: Frame of the root's document if already known
+    :param frames: Candidate frames
+    :return: Frames inside the root
+    """
+
+    if owner is None:
+        record_round_trips()
+        owner = await root.owner_frame()
+        if owner is None:
+            return []
+
+    # group the frames by the child frame of the root's document they are nested in
+    groups: Dict[Frame, List[Frame]] = {}
+    for frame in frames:
+        child = frame
+        while child is not None and child.parent_frame is not owner:
+            child = child.parent_frame
+        if child is not None:
+            groups.setdefault(child, []).append(frame)
+
+    if not groups:
+        return []
+
+    # script to check which iframe elements are inside the root, crossing shadow roots to their hosts
+    js = """
+    (root, elements) => elements.map((element) => {
+        for (let node = element; node; node = node.parentNode || node.host) {
+            if (node === root) {
+                return true;
+            }
+        }
+        return false;
+    })
+    """
+
+    async with HandleScope() as scope:
+        iframe_elements = []
+        for child in groups:
+            record_round_trips()
+            iframe_elements.append(scope.track(await child.frame_element()))
+
+        within = await evaluate_in_scope(root, js, iframe_elements)
+
+    return [frame for child, inside in zip(groups, within) if inside for frame in groups[child]]
+
+
+async def search_frame_tree(
+        queryable: Union[Page, Frame, ElementHandle],
+        url_filter: str,
+        root: Optional[ElementHandle] = None
+) -> List[Frame]:
+    """
+    Search for frames whose URL includes the url_filter in Playwright's frame tree
+
+    Frame URLs are known to Playwright without asking the page, so only an ElementHandle (its owner frame)
+    and a root element (the iframe elements of the matched frames) cost round trips
+
+    :param queryable: Page, Frame, ElementHandle (frames nested in its document)
+    :param url_filter: String to filter the frame's URL
+    :param root: Only return frames whose iframe element is inside this element
+    :return: list of matched frames or empty list if no frames found
+    """
+
+    try:
+        if isinstance(queryable, Page):
+            owner = queryable.main_frame
+            frames = queryable.frames
+        elif isinstance(queryable, Frame):
+            owner = queryable
+            frames = _descendant_frames(queryable)
+        else:
+            record_round_trips()
+            owner = await queryable.owner_frame()
+            frames = _descendant_frames(owner) if owner else []
+
+        matched_frames = [frame for frame in frames if url_filter in frame.url and not frame.is_detached()]
+
+        if root is not None and matched_frames:
+            matched_frames = await _frames_within(root, owner if root is queryable else None, matched_frames)
+    except Exception as e:
+        logger.error(f'Error searching the frame tree: {e}')
+        return []
+
+    return matched_frames
@@ -0,0 +1,135 @@
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Union
+
+from playwright.async_api import ElementHandle, Frame, Page
+
+from camoufox_captcha.common.metrics import record_round_trips
+
+# seconds a probed geometry is trusted for a click without Playwright's own actionability checks
+GEOMETRY_MAX_AGE = 1
+
+# script to measure elements in their frame's viewport: visibility as ElementHandle.is_visible() checks it
+# (non-empty bounding box, not visibility:hidden), enabled state and whether the element or its label
+# receives a click at the element's center (hit test in the element's own (shadow) root)
+_PROBE_JS = """
+(elements) => elements.map((element) => {
+    const rect = element.getBoundingClientRect();
+    const visible = rect.width > 0 && rect.height > 0 && getComputedStyle(element).visibility !== "hidden";
+
+    const root = element.getRootNode();
+    const hit = visible && root.elementFromPoint
+        ? root.elementFromPoint(rect.left + rect.width / 2, rect.top + rect.height / 2)
+        : null;
+    const target = element.closest("label") || element;
+
+    return {
+        visible,
+        enabled: !element.matches(":disabled"),
+        obscured: !hit || !(hit === element || target.contains(hit)),
+        x: rect.left,
+        y: rect.top,
+        width: rect.width,
+        height: rect.height
+    };
+})
+"""
+
+# elements whose geometry was probed right before they are clicked
+_geometries: 'weakref.WeakKeyDictionary[ElementHandle, ElementGeometry]' = weakref.WeakKeyDictionary()
+
+
+@dataclass
+class ElementGeometry:
+    """
+    Visibility, state and bounding box of an element, measured in its frame's viewport
+
+    :param visible: Element has a non-empty bounding box and isn't visibility:hidden
+    :param enabled: Element isn't disabled
+    :param obscured: Another element (other than its label) receives clicks at the element's center,
+                     or the center is outside the viewport
+    :param x: Left of the bounding box
+    :param y: Top of the bounding box
+    :param width: Width of the bounding box
+    :param height: Height of the bounding box
+    :param probed_at: time.monotonic() of the probe
+    """
+
+    visible: bool
+    enabled: bool
+    obscured: bool
+    x: float
+    y: float
+    width: float
+    height: float
+    probed_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def clickable(self) -> bool:
+        """
+        :return: True if a click at the element's center would reach it
+        """
+
+        return self.visible and self.enabled and not self.obscured
+
+    @property
+    def center(self) -> Dict[str, float]:
+        """
+        :return: Center of the element relative to its top left corner (click position)
+        """
+
+        return {'x': self.width / 2, 'y': self.height / 2}
+
+    def is_fresh(self, max_age: float = GEOMETRY_MAX_AGE) -> bool:
+        """
+        :param max_age: Maximum age in seconds
+        :return: True if the probe is recent enough to be trusted
+        """
+
+        return time.monotonic() - self.probed_at <= max_age
+
+
+async def probe_elements(queryable: Union[Page, Frame], elements: List[ElementHandle]) -> List[ElementGeometry]:
+    """
+    Measure all elements of the page or frame in a single evaluation
+
+    :param queryable: Page, Frame the elements belong to
+    :param elements: Elements to measure
+    :return: ElementGeometry of each element, in the order of elements
+    """
+
+    if not elements:
+        return []
+
+    record_round_trips()
+    results = await queryable.evaluate(_PROBE_JS, elements)
+
+    return [ElementGeometry(**result) for result in results]
+
+
+def remember_geometry(element: ElementHandle, geometry: ElementGeometry) -> None:
+    """
+    Keep the geometry of an element that is about to be clicked (see take_geometry)
+
+    :param element: Probed element
+    :param geometry: Its ElementGeometry
+    """
+
+    _geometries[element] = geometry
+
+
+def take_geometry(element: ElementHandle, max_age: float = GEOMETRY_MAX_AGE) -> Optional[ElementGeometry]:
+    """
+    Take the remembered geometry of an element, it's only handed out once
+
+    :param element: Element to click
+    :param max_age: Maximum age in seconds of the geometry
+    :return: ElementGeometry if remembered and still fresh, None otherwise
+    """
+
+    geometry = _geometries.pop(element, None)
+    if geometry is None or not geometry.is_fresh(max_age):
+        return None
+
+    return geometry
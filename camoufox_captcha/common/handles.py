@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import weakref
+from typing import Iterable, List, Optional, TypeVar
+
+from playwright.async_api import JSHandle
+
+from camoufox_captcha.common.metrics import record_round_trips
+
+logger = logging.getLogger("camoufox_captcha.common")
+
+H = TypeVar('H', bound=JSHandle)
+
+# handles created through a HandleScope that were not disposed through this module yet
+_live_handles: 'weakref.WeakSet[JSHandle]' = weakref.WeakSet()
+
+
+def live_handle_count() -> int:
+    """
+    Number of handles created by the library's searches that are still alive
+    (kept handles returned to the caller count until they are released with dispose_handles)
+
+    :return: Number of live handles
+    """
+
+    return len(_live_handles)
+
+
+async def dispose_handles(handles: Iterable[Optional[JSHandle]]) -> None:
+    """
+    Dispose handles concurrently, ignoring handles that are already gone (e.g. detached frame)
+
+    :param handles: JSHandles/ElementHandles to dispose
+    """
+
+    async def dispose(handle: JSHandle) -> None:
+        _live_handles.discard(handle)
+        record_round_trips()
+        try:
+            await handle.dispose()
+        except Exception as e:
+            logger.debug(f'Error disposing handle: {e}')
+
+    await asyncio.gather(*(dispose(handle) for handle in handles if handle is not None))
+
+
+class HandleScope:
+    """
+    Async context manager that tracks intermediate handles and disposes all of them when the scope exits,
+    except the ones explicitly kept to be returned to the caller
+
+    Example:
+        ```python
+        async with HandleScope() as scope:
+            handle = scope.track(await frame.evaluate_handle(js))
+            element = scope.keep(handle.as_element())
+        ```
+    """
+
+    def __init__(self):
+        self._handles: List[JSHandle] = []
+
+    def track(self, handle: H) -> H:
+        """
+        Track a handle to be disposed when the scope exits
+
+        :param handle: JSHandle or ElementHandle
+        :return: The same handle
+        """
+
+        if handle is not None and handle not in self._handles:
+            self._handles.append(handle)
+            _live_handles.add(handle)
+        return handle
+
+    def keep(self, handle: H) -> H:
+        """
+        Keep a handle alive after the scope exits (ownership goes to the caller)
+
+        :param handle: JSHandle or ElementHandle
+        :return: The same handle
+        """
+
+        if handle in self._handles:
+            self._handles.remove(handle)
+        return handle
+
+    async def dispose(self) -> None:
+        """
+        Dispose all tracked handles that were not kept
+        """
+
+        handles, self._handles = self._handles, []
+        await dispose_handles(handles)
+
+    async def __aenter__(self) -> 'HandleScope':
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.dispose()
@@ -0,0 +1,334 @@
+import hashlib
+import weakref
+from functools import lru_cache
+from typing import Any, Union
+
+from playwright.async_api import ElementHandle, Frame, JSHandle, Page
+
+from camoufox_captcha.common.metrics import record_round_trips
+
+# in-page helper library, evaluated once per document and stored under HELPERS_KEY on its window.
+# a TreeWalker visits the elements and skips the subtrees of elements without element children in the tree
+# (svg foreignObject and canvas/video/audio fallback content can hold shadow hosts, so they're walked as well;
+# an unscoped traversal costs O(nodes), not O(shadow hosts)),
+# a host selector hint replaces the walk with querySelectorAll and a root element limits it to its subtree.
+# unscoped traversals can opt in to a per-document shadow root index: it is built by the first search,
+# kept up to date by MutationObservers on the document and every shadow root, and rebuilt by any search
+# once it is older than SHADOW_INDEX_STALE_MS (roots attached to already inserted hosts don't produce
+# mutations, so a fresh index can miss them for at most that long). its observers run until disposeShadowIndex
+_HELPERS_JS = """
+(() => {
+    const PRUNED_TAGS = new Set(["SCRIPT", "STYLE", "TEMPLATE", "NOSCRIPT", "TEXTAREA", "IFRAME"]);
+    const SHADOW_INDEX_KEY = "__HELPERS_KEY__" + "_shadowIndex";
+    const SHADOW_INDEX_STALE_MS = 1000;
+
+    function findShadowHosts(node, hostSelector) {
+        if (hostSelector) {
+            return Array.from(node.querySelectorAll(hostSelector)).filter((el) => el.shadowRootUnl);
+        }
+
+        const hosts = [];
+        const walker = document.createTreeWalker(node, NodeFilter.SHOW_ELEMENT, {
+            acceptNode: (el) => PRUNED_TAGS.has(el.tagName) ? NodeFilter.FILTER_REJECT : NodeFilter.FILTER_ACCEPT
+        });
+        while (walker.nextNode()) {
+            if (walker.currentNode.shadowRootUnl) {
+                hosts.push(walker.currentNode);
+            }
+        }
+        return hosts;
+    }
+
+    function createShadowIndex() {
+        const index = {document, roots: new Set(), builtAt: 0};
+
+        function addRoot(root) {
+            if (index.roots.has(root)) return;
+
+            index.roots.add(root);
+            observer.observe(root, {childList: true, subtree: true});
+            addSubtree(root);
+        }
+
+        function addSubtree(node) {
+            if (PRUNED_TAGS.has(node.tagName)) return;
+            if (node.shadowRootUnl) addRoot(node.shadowRootUnl);
+            for (const host of findShadowHosts(node, null)) {
+                addRoot(host.shadowRootUnl);
+            }
+        }
+
+        // inserted subtrees are indexed incrementally, removed hosts are filtered out on read
+        const observer = new MutationObserver((records) => {
+            for (const record of records) {
+                for (const node of record.addedNodes) {
+                    if (node.nodeType === Node.ELEMENT_NODE) addSubtree(node);
+                }
+            }
+        });
+
+        index.rebuild = () => {
+            index.roots.clear();
+            addSubtree(document.documentElement || document);
+            index.builtAt = performance.now();
+        };
+        index.read = () => Array.from(index.roots).filter((root) => root.host.isConnected);
+
+        index.dispose = () => {
+            observer.disconnect();
+            index.roots.clear();
+        };
+
+        observer.observe(document, {childList: true, subtree: true});
+        index.rebuild();
+
+        return index;
+    }
+
+    function getShadowIndex(options) {
+        if (options.root || options.hostSelector || options.maxDepth != null || !options.useIndex) {
+            return null;
+        }
+
+        let index = window[SHADOW_INDEX_KEY];
+        if (!index || index.document !== document) {
+            index = createShadowIndex();
+            Object.defineProperty(window, SHADOW_INDEX_KEY, {value: index, configurable: true});
+        }
+        return index;
+    }
+
+    // disconnect the observers of the document's shadow root index and drop it
+    function disposeShadowIndex() {
+        const index = window[SHADOW_INDEX_KEY];
+        if (!index) return false;
+
+        index.dispose();
+        delete window[SHADOW_INDEX_KEY];
+        return true;
+    }
+
+    function collectShadowRoots(options) {
+        const index = getShadowIndex(options);
+        if (index) {
+            if (performance.now() - index.builtAt >= SHADOW_INDEX_STALE_MS) index.rebuild();
+            return index.read();
+        }
+
+        const {root, hostSelector, maxDepth} = options;
+        const roots = [];
+
+        function visit(node, depth) {
+            if (maxDepth != null && depth > maxDepth) return;
+
+            for (const host of findShadowHosts(node, hostSelector)) {
+                roots.push(host.shadowRootUnl);
+                visit(host.shadowRootUnl, depth + 1);
+            }
+        }
+
+        const start = root || document;
+        if (start.shadowRootUnl) {
+            // the start element may be a shadow host itself
+            roots.push(start.shadowRootUnl);
+            visit(start.shadowRootUnl, 2);
+        }
+        visit(start, 1);
+
+        return roots;
+    }
+
+    // every element matching options.selector in every shadow root
+    function queryShadowRoots(options) {
+        const matches = [];
+        for (const shadowRoot of collectShadowRoots(options)) {
+            matches.push(...shadowRoot.querySelectorAll(options.selector));
+        }
+        return matches;
+    }
+
+    // finish callbacks of the pending waits by wait id, and ids cancelled before their wait started
+    const pendingWaits = new Map();
+    const cancelledWaits = new Set();
+
+    // observe all shadow roots until an element matching options.selector is ready
+    function waitForShadowRootElement(options) {
+        return new Promise((resolve) => {
+            const {selector, timeout, visible, waitId} = options;
+            // the rescans must see roots attached to already inserted hosts, which a fresh index can miss
+            const traversal = {...options, useIndex: false};
+            if (waitId != null && cancelledWaits.delete(waitId)) {
+                resolve(null);
+                return;
+            }
+
+            const observed = new WeakSet();
+            let timer = null;
+            let rescan = null;
+            let scheduled = false;
+
+            function isReady(el) {
+                if (!visible) return true;
+
+                const rect = el.getBoundingClientRect();
+                return rect.width > 0 && rect.height > 0 && getComputedStyle(el).visibility !== "hidden";
+            }
+
+            const observer = new MutationObserver(() => {
+                // coalesce mutation bursts into a single scan
+                if (scheduled) return;
+                scheduled = true;
+                queueMicrotask(() => {
+                    scheduled = false;
+                    check();
+                });
+            });
+
+            function finish(result) {
+                observer.disconnect();
+                clearTimeout(timer);
+                clearInterval(rescan);
+                pendingWaits.delete(waitId);
+                resolve(result);
+            }
+
+            if (waitId != null) pendingWaits.set(waitId, finish);
+
+            function scan() {
+                for (const root of collectShadowRoots(traversal)) {
+                    if (!observed.has(root)) {
+                        observed.add(root);
+                        observer.observe(root, {childList: true, subtree: true, attributes: true});
+                    }
+
+                    for (const el of root.querySelectorAll(selector)) {
+                        if (isReady(el)) return el;
+                    }
+                }
+                return null;
+            }
+
+            function check() {
+                const el = scan();
+                if (el) finish(el);
+            }
+
+            observer.observe(options.root || document, {childList: true, subtree: true, attributes: true});
+
+            // shadow roots attached to already inserted hosts and style-driven visibility changes
+            // don't always produce mutations, so rescan at a low frequency as well
+            rescan = setInterval(check, 250);
+            timer = setTimeout(() => finish(null), timeout);
+
+            check();
+        });
+    }
+
+    // stop a pending waitForShadowRootElement call (it resolves to null), or make it resolve right away
+    // if its evaluation hasn't reached the page yet
+    function cancelWait(waitId) {
+        const finish = pendingWaits.get(waitId);
+        if (finish) {
+            finish(null);
+        } else {
+            cancelledWaits.add(waitId);
+        }
+        return Boolean(finish);
+    }
+
+    // light DOM and shadow DOM matches under a selector engine root (Document, ShadowRoot or Element)
+    function queryAllFrom(root, selector) {
+        const options = {root: root === document ? null : root, hostSelector: null, maxDepth: null,
+                         useIndex: false, selector};
+        return Array.from(new Set([...root.querySelectorAll(selector), ...queryShadowRoots(options)]));
+    }
+
+    return Object.freeze({collectShadowRoots, queryShadowRoots, waitForShadowRootElement, cancelWait,
+                          queryAllFrom, disposeShadowIndex});
+})()
+"""
+
+# window property holding the helpers, versioned by the library source so that documents shared with
+# another version of the package don't run stale helpers (or reuse their shadow root index)
+HELPERS_KEY = '__camoufoxCaptchaHelpers_' + hashlib.sha1(_HELPERS_JS.encode()).hexdigest()[:12]
+
+# error thrown by a helper call on a document the helpers are not installed in (e.g. after a navigation)
+_HELPERS_MISSING = 'camoufox-captcha helpers are not installed'
+
+# queryables the helpers were installed through, their next calls only send the short call script
+_installed: 'weakref.WeakSet[Union[Page, Frame, ElementHandle]]' = weakref.WeakSet()
+
+
+@lru_cache(maxsize=None)
+def install_helpers_js() -> str:
+    """
+    :return: JS expression evaluating to the helpers of the document, installing them if it doesn't have them
+    """
+
+    library = _HELPERS_JS.strip().replace('__HELPERS_KEY__', HELPERS_KEY)
+    return (f'(window["{HELPERS_KEY}"] || (Object.defineProperty(window, "{HELPERS_KEY}", '
+            f'{{value: {library}, configurable: true}}), window["{HELPERS_KEY}"]))')
+
+
+@lru_cache(maxsize=None)
+def _call_js(name: str, install: bool, element: bool) -> str:
+    """
+    Build the script calling a helper (the same source for every call, so the page can reuse its compilation)
+
+    :param name: Helper name
+    :param install: Install the helpers first if the document doesn't have them
+    :param element: Wrap the script for ElementHandle, which passes the element itself as the first argument
+    :return: JS function source that accepts the helper's argument
+    """
+
+    if install:
+        js = f"(arg) => {{ const helpers = {install_helpers_js()}; return helpers.{name}(arg); }}"
+    else:
+        js = (f'(arg) => {{ const helpers = window["{HELPERS_KEY}"]; '
+              f'if (!helpers) throw new Error("{_HELPERS_MISSING}"); return helpers.{name}(arg); }}')
+
+    if element:
+        js = f"(_, arg) => ({js})(arg)"
+
+    return js
+
+
+async def call_helper(
+        queryable: Union[Page, Frame, ElementHandle],
+        name: str,
+        arg: Any = None,
+        handle: bool = False
+) -> Union[Any, JSHandle]:
+    """
+    Call a function of the in-page helper library with its argument
+
+    The library is sent with the first call through a queryable object and stored on the window of its document,
+    later calls only send a short call script. A document that lost the helpers (e.g. after a navigation)
+    gets them installed again by a second evaluation
+
+    :param queryable: Page, Frame, ElementHandle
+    :param name: Helper name (collectShadowRoots, queryShadowRoots, waitForShadowRootElement, cancelWait,
+                 queryAllFrom, disposeShadowIndex)
+    :param arg: Argument passed to the helper (a dict of options)
+    :param handle: Return the result as a JSHandle instead of its JSON value
+    :return: Result of the helper
+    """
+
+    element = isinstance(queryable, ElementHandle)
+    evaluate = queryable.evaluate_handle if handle else queryable.evaluate
+    installed = queryable in _installed
+
+    record_round_trips()
+    try:
+        result = await evaluate(_call_js(name, not installed, element), arg)
+    except Exception as e:
+        if not installed or _HELPERS_MISSING not in str(e):
+            raise
+
+        record_round_trips()
+        result = await evaluate(_call_js(name, True, element), arg)
+
+    if not installed:
+        _installed.add(queryable)
+
+    return result
@@ -0,0 +1,194 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    from playwright.async_api import Frame
+
+logger = logging.getLogger("camoufox_captcha.common")
+
+# metrics collector of the solve running in the current context (shared with tasks spawned from it)
+_current_metrics: ContextVar[Optional['SolveMetrics']] = ContextVar('camoufox_captcha_metrics', default=None)
+
+
+@dataclass
+class WidgetResult:
+    """
+    Outcome of one widget of a multi-widget solve
+
+    :param index: Position of the widget's iframe in discovery order
+    :param iframe: Challenge iframe of the widget
+    :param success: True if the widget was verified as solved
+    :param decided_by: Branch that decided the outcome (e.g. "turnstile_success", "checkbox_not_found",
+                       "click_failed", "max_attempts", "timed_out")
+    :param attempts: Number of attempts started for the widget
+    :param duration: Time in seconds from the start of the widget stage until the widget was decided
+    """
+
+    index: int
+    iframe: Optional['Frame'] = field(default=None, repr=False)
+    success: bool = False
+    decided_by: Optional[str] = None
+    attempts: int = 0
+    duration: float = 0
+
+
+@dataclass
+class SolveResult:
+    """
+    Structured outcome of a solve call
+
+    :param success: True if solved (or no challenge was present), False otherwise
+    :param decided_by: Branch that decided the outcome (e.g. "no_challenge", "expected_content",
+                       "turnstile_success", "challenge_gone", "max_attempts", "timed_out")
+    :param attempts: Number of solve attempts started
+    :param round_trips: Number of browser protocol round trips issued by the library
+    :param duration: Total duration of the solve in seconds
+    :param phase_durations: Cumulative duration in seconds of each phase ("detection", "iframe_search",
+                            "checkbox_wait", "click", "verification", "retry_delay")
+    :param challenge_type: Type of the challenge that was solved (detected one for challenge_type="auto")
+    :param widgets: Per-widget outcomes of a multi-widget solve (empty for single-widget solves)
+    """
+
+    success: bool
+    decided_by: Optional[str] = None
+    attempts: int = 0
+    round_trips: int = 0
+    duration: float = 0
+    phase_durations: Dict[str, float] = field(default_factory=dict)
+    challenge_type: Optional[str] = None
+    widgets: List[WidgetResult] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return self.success
+
+    @property
+    def timed_out(self) -> bool:
+        """
+        :return: True if the solve ran out of its time budget
+        """
+
+        return self.decided_by == 'timed_out'
+
+
+class SolveHooks:
+    """
+    Callback interface for exporting solve metrics, override the methods you need
+
+    Example:
+        ```python
+        class PrometheusHooks(SolveHooks):
+            def on_phase(self, phase, duration):
+                PHASE_SECONDS.labels(phase).observe(duration)
+
+        await solve_captcha(page, hooks=PrometheusHooks())
+        ```
+    """
+
+    def on_phase(self, phase: str, duration: float) -> None:
+        """
+        Called every time a phase finishes
+
+        :param phase: Phase name
+        :param duration: Duration of this run of the phase in seconds
+        """
+
+    def on_result(self, result: SolveResult) -> None:
+        """
+        Called once when the solve finishes
+
+        :param result: SolveResult of the solve
+        """
+
+
+class SolveMetrics:
+    """
+    Collects phase durations, attempts and round trips of a single solve
+
+    :param hooks: Optional SolveHooks notified about phases and the final result
+    """
+
+    def __init__(self, hooks: Optional[SolveHooks] = None):
+        self.hooks = hooks
+        self.attempts = 0
+        self.challenge_type: Optional[str] = None
+        self.widgets: List[WidgetResult] = []
+        self.round_trips = 0
+        self.phase_durations: Dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    def _call_hook(self, name: str, *args) -> None:
+        if not self.hooks:
+            return
+
+        # metrics export must never break the solve
+        try:
+            getattr(self.hooks, name)(*args)
+        except Exception as e:
+            logger.error(f'Error in solve hook {name}: {e}')
+
+    @contextmanager
+    def activate(self) -> Iterator['SolveMetrics']:
+        """
+        Make this collector current, so round trips issued by the library are counted into it
+        """
+
+        token = _current_metrics.set(self)
+        try:
+            yield self
+        finally:
+            _current_metrics.reset(token)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Measure the duration of a phase (durations of repeated phases are summed up)
+
+        :param name: Phase name
+        """
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - started
+            self.phase_durations[name] = self.phase_durations.get(name, 0) + duration
+            self._call_hook('on_phase', name, duration)
+
+    def finish(self, success: bool, decided_by: Optional[str] = None) -> SolveResult:
+        """
+        Build the SolveResult and notify the hooks
+
+        :param success: True if solved, False otherwise
+        :param decided_by: Branch that decided the outcome
+        :return: SolveResult
+        """
+
+        result = SolveResult(
+            success=success,
+            decided_by=decided_by,
+            attempts=self.attempts,
+            round_trips=self.round_trips,
+            duration=time.perf_counter() - self._started,
+            phase_durations=dict(self.phase_durations),
+            challenge_type=self.challenge_type,
+            widgets=list(self.widgets)
+        )
+        self._call_hook('on_result', result)
+
+        return result
+
+
+def record_round_trips(count: int = 1) -> None:
+    """
+    Count browser protocol round trips into the solve running in the current context (no-op outside a solve)
+
+    :param count: Number of round trips
+    """
+
+    metrics = _current_metrics.get()
+    if metrics:
+        metrics.round_trips += count
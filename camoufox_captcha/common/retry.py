@@ -0,0 +1,80 @@
+import random
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Schedule of the delays between retries: exponential backoff from a base delay, capped and optionally jittered
+    so that many pages retrying at the same time spread out instead of hitting the browser in lockstep
+
+    The default policy keeps every delay equal to its base delay
+
+    Example:
+        ```python
+        # 1s, 2s, 4s, ... up to 10s, each randomized down by up to 50%
+        policy = RetryPolicy(factor=2, max_delay=10, jitter=0.5)
+        await solve_captcha(page, attempt_delay=1, retry_policy=policy)
+        ```
+
+    :param factor: Multiplier applied to the delay after every retry (1 = constant delay)
+    :param max_delay: Upper bound of a single delay in seconds (applied before the jitter)
+    :param jitter: Fraction of the delay that is randomized, the delay is drawn from [delay * (1 - jitter), delay]
+                   (0 = no jitter, 1 = "full jitter")
+    :param rng: Source of uniform random numbers in [0, 1) (e.g. a seeded random.Random().random)
+    """
+
+    factor: float = 1
+    max_delay: Optional[float] = None
+    jitter: float = 0
+    rng: Callable[[], float] = field(default=random.random, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.factor < 1:
+            raise ValueError('factor must be at least 1')
+        if not 0 <= self.jitter <= 1:
+            raise ValueError('jitter must be between 0 and 1')
+
+    def backoff(self, base: float, retry: int) -> float:
+        """
+        Delay before a retry without the jitter
+
+        :param base: Base delay in seconds (delay before the first retry)
+        :param retry: Number of retries already made (0 for the first retry)
+        :return: Delay in seconds
+        """
+
+        delay = base * self.factor ** retry
+        if self.max_delay is not None:
+            delay = min(delay, self.max_delay)
+        return delay
+
+    def delay(self, base: float, retry: int) -> float:
+        """
+        Delay before a retry
+
+        :param base: Base delay in seconds (delay before the first retry)
+        :param retry: Number of retries already made (0 for the first retry)
+        :return: Delay in seconds
+        """
+
+        delay = self.backoff(base, retry)
+        if self.jitter:
+            delay *= 1 - self.jitter * self.rng()
+        return delay
+
+    def total(self, base: float, retries: int) -> float:
+        """
+        Longest possible time spent waiting over a number of retries
+
+        :param base: Base delay in seconds
+        :param retries: Number of retries
+        :return: Sum of the delays without the jitter in seconds
+        """
+
+        return sum(self.backoff(base, retry) for retry in range(retries))
+
+
+# constant delays, the behaviour of the solver before retry policies were configurable
+DEFAULT_RETRY_POLICY = RetryPolicy()
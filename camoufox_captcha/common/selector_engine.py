@@ -0,0 +1,77 @@
+import logging
+import weakref
+from typing import Set
+
+from playwright.async_api import Selectors
+
+from camoufox_captcha.common.helpers import install_helpers_js
+
+logger = logging.getLogger("camoufox_captcha.common")
+
+# name of the selector engine piercing closed shadow roots (e.g. "camoufox-shadow=input[type=checkbox]")
+SHADOW_SELECTOR_ENGINE = 'camoufox-shadow'
+
+# Selectors objects and the engine names registered on them
+_registered: 'weakref.WeakKeyDictionary[Selectors, Set[str]]' = weakref.WeakKeyDictionary()
+
+
+def shadow_selector_engine_script() -> str:
+    """
+    :return: Source of the selector engine, it shares the in-page helper library (and its shadow root index)
+             with the library's searches
+    """
+
+    # helpers already installed by the library's searches are reused, otherwise the first query installs them
+    return f"""
+    (() => {{
+        const helpers = () => {install_helpers_js()};
+        return {{
+            query: (root, selector) => helpers().queryAllFrom(root, selector)[0] || null,
+            queryAll: (root, selector) => helpers().queryAllFrom(root, selector)
+        }};
+    }})()
+    """
+
+
+def shadow_selector(selector: str, engine: str = SHADOW_SELECTOR_ENGINE) -> str:
+    """
+    Build a Playwright selector matching the CSS selector in the light DOM and in every (closed) shadow root
+
+    :param selector: CSS selector
+    :param engine: Name the engine was registered under
+    :return: Selector for page.locator, frame.locator, etc.
+    """
+
+    return f'{engine}={selector}'
+
+
+async def register_shadow_selector_engine(selectors: Selectors, name: str = SHADOW_SELECTOR_ENGINE) -> None:
+    """
+    Register the closed shadow root piercing selector engine, so locators get Playwright's auto-waiting
+    and retries inside the shadow DOM (registering the same name again is a no-op)
+
+    Example:
+        ```python
+        from camoufox_captcha import register_shadow_selector_engine, shadow_selector
+
+        await register_shadow_selector_engine(playwright.selectors)
+        await frame.locator(shadow_selector('input[type="checkbox"]')).click()
+        ```
+
+    :param selectors: Selectors of the Playwright instance driving the browser (playwright.selectors)
+    :param name: Name of the engine, used as the selector prefix
+    """
+
+    names = _registered.setdefault(selectors, set())
+    if name in names:
+        return
+
+    try:
+        await selectors.register(name, shadow_selector_engine_script())
+    except Exception as e:
+        # registered by another call (e.g. before this module was reloaded)
+        if 'already registered' not in str(e):
+            raise
+        logger.debug(f'Selector engine "{name}" is already registered')
+
+    names.add(name)
@@ -1,121 +1,265 @@
+import asyncio
 import logging
+import uuid
+from dataclasses import dataclass
 from typing import Union, List, Optional
 
-from playwright.async_api import ElementHandle, Page, Frame
+from playwright.async_api import ElementHandle, Page, Frame, JSHandle
+
+from camoufox_captcha.common.handles import HandleScope, dispose_handles
+from camoufox_captcha.common.helpers import call_helper
+from camoufox_captcha.common.metrics import record_round_trips
 
 logger = logging.getLogger("camoufox_captcha.common")
 
 
+@dataclass
+class TraversalOptions:
+    """
+    Options limiting the shadow root traversal, so searches don't have to scan the whole document
+
+    :param root: Start the traversal at this element (and its shadow root) instead of the document
+    :param host_selector: Only elements matching this CSS selector are treated as shadow hosts, hosts are then
+                          found by the native selector engine instead of the JS walk (still a scan of every
+                          element in scope, but without a callback per node)
+    :param max_depth: Maximum shadow root nesting depth (1 = only shadow roots of hosts in the light DOM)
+    :param use_index: Serve unscoped traversals from the cached in-page shadow root index (kept up to date
+                      by MutationObservers and rebuilt once it is older than a second). The observers keep
+                      running until dispose_shadow_index is called for the document
+    """
+
+    root: Optional[ElementHandle] = None
+    host_selector: Optional[str] = None
+    max_depth: Optional[int] = None
+    use_index: bool = False
+
+
+def _traversal_arg(traversal: Optional[TraversalOptions], **kwargs) -> dict:
+    """
+    Build the JS argument of a traversal script (the root element handle is passed through as is)
+    """
+
+    traversal = traversal or TraversalOptions()
+    return {
+        'root': traversal.root,
+        'hostSelector': traversal.host_selector,
+        'maxDepth': traversal.max_depth,
+        'useIndex': traversal.use_index,
+        **kwargs
+    }
+
+
+async def _unpack_elements(
+        handle: JSHandle,
+        scope: HandleScope
+) -> List[ElementHandle]:
+    """
+    Convert a JSHandle of an array to a python list of ElementHandle
+
+    Property handles are tracked by the scope, only the element handles are kept alive
+
+    :param handle: JSHandle of an array
+    :param scope: HandleScope disposing the intermediate handles
+    :return: List of ElementHandles in the array
+    """
+
+    record_round_trips()
+    properties = await handle.get_properties()
+
+    elements = []
+    for prop_handle in properties.values():
+        scope.track(prop_handle)
+
+        element = prop_handle.as_element()
+        if element:
+            elements.append(scope.keep(element))
+
+    return elements
+
+
 async def get_shadow_roots(
         queryable: Union[Page, Frame, ElementHandle],
+        traversal: Optional[TraversalOptions] = None
 ) -> List[ElementHandle]:
     """
     Get all shadow roots on the page
 
     :param queryable: Page, Frame, ElementHandle
+    :param traversal: Optional options limiting the traversal (root element, host selector, max depth)
     :return: List of shadow roots ElementHandles
     """
 
-    # script to collect all shadow roots
-    js = """
-    () => {
-        const roots = [];
+    async with HandleScope() as scope:
+        handle = scope.track(await call_helper(queryable, 'collectShadowRoots', _traversal_arg(traversal),
+                                               handle=True))
+        return await _unpack_elements(handle, scope)
 
-        function collectShadowRoots(node) {
-            if (!node) return;
 
-            if (node.shadowRootUnl) {
-                roots.push(node.shadowRootUnl);
-                node = node.shadowRootUnl;
-            }
-
-            for (const el of node.querySelectorAll("*")) {
-                if (el.shadowRootUnl) {
-                    collectShadowRoots(el);
-                }
-            }
-        }
+async def dispose_shadow_index(queryable: Union[Page, Frame, ElementHandle]) -> bool:
+    """
+    Disconnect the observers of the in-page shadow root index (see TraversalOptions.use_index) and drop it
 
-        collectShadowRoots(document);
-        console.log(roots);
-        return roots;
-    }
+    :param queryable: Page, Frame, ElementHandle of the document
+    :return: True if the document had an index
     """
 
-    handle = await queryable.evaluate_handle(js)
+    try:
+        return await call_helper(queryable, 'disposeShadowIndex')
+    except Exception as e:
+        logger.debug(f'Error disposing the shadow root index: {e}')
 
-    # convert JSHandle array to python list of ElementHandle
-    properties = await handle.get_properties()
+    return False
 
-    shadow_roots = []
-    for prop_handle in properties.values():
-        element = prop_handle.as_element()
-        if element:
-            shadow_roots.append(element)
 
-    return shadow_roots
+async def query_shadow_root_elements(
+        queryable: Union[Page, Frame, ElementHandle],
+        selector: str,
+        traversal: Optional[TraversalOptions] = None
+) -> List[ElementHandle]:
+    """
+    Query all elements matching the selector in every shadow root of the queryable object in a single evaluation
+
+    Shadow roots are walked and queried (querySelectorAll) inside the page, so the whole search costs one
+    evaluation no matter how many shadow hosts there are. Unscoped searches can reuse the in-page shadow root
+    index (TraversalOptions.use_index), so repeat lookups in the same document skip the traversal
+
+    :param queryable: Page, Frame, ElementHandle
+    :param selector: CSS selector to search for elements (passed as an argument, so any quoting is safe)
+    :param traversal: Optional options limiting the traversal (root element, host selector, max depth)
+    :return: List of ElementHandles that match the selector
+    """
+
+    async with HandleScope() as scope:
+        handle = scope.track(await call_helper(queryable, 'queryShadowRoots',
+                                               _traversal_arg(traversal, selector=selector), handle=True))
+        return await _unpack_elements(handle, scope)
 
 
 async def search_shadow_root_elements(
         queryable: Union[Page, Frame, ElementHandle],
-        selector: str
+        selector: str,
+        traversal: Optional[TraversalOptions] = None
 ) -> List[ElementHandle]:
     """
     Search for elements by selector within the shadow DOM of the queryable object
 
     :param queryable: Page, Frame, ElementHandle
     :param selector: CSS selector to search for elements
+    :param traversal: Optional options limiting the traversal (root element, host selector, max depth)
     :return: List of ElementHandles that match the selector
     """
 
-    elements = []
-
     try:
-        shadow_roots = await get_shadow_roots(queryable)  # get all shadow roots in the queryable object
-        for shadow_root in shadow_roots:
-            # find all elements by selector within the shadow root
-            element_handle = await shadow_root.evaluate_handle(
-                f"shadow => shadow.querySelector('{selector}')"
-            )
-            if not element_handle:
-                continue
-
-            element = element_handle.as_element()
-            if element:
-                elements.append(element)
+        return await query_shadow_root_elements(queryable, selector, traversal)
     except Exception as e:
         logger.error(f'Error searching for elements: {e}')
 
-    return elements
+    return []
 
 
 async def search_shadow_root_iframes(
         queryable: Union[Page, Frame, ElementHandle],
-        src_filter: str
+        src_filter: str,
+        traversal: Optional[TraversalOptions] = None
 ) -> Optional[List[Frame]]:
     """
     Search for an iframe within the shadow DOM, src of which includes the src_filter
 
     :param queryable: Page, Frame, ElementHandle
     :param src_filter: String to filter the iframe's src attribute
+    :param traversal: Optional options limiting the traversal (root element, host selector, max depth)
     :return: list of matched iframes or empty list if no iframes found
     """
 
     matched_iframes = []
 
     try:
-        iframe_elements = await search_shadow_root_elements(queryable, 'iframe')
-        for iframe_element in iframe_elements:
-            src_prop = await iframe_element.get_property('src')
-            src = await src_prop.json_value()
+        # iframe elements and their src properties are only needed to resolve the frames
+        async with HandleScope() as scope:
+            iframe_elements = await search_shadow_root_elements(queryable, 'iframe', traversal)
+            for iframe_element in iframe_elements:
+                scope.track(iframe_element)
+
+                record_round_trips(2)
+                src_prop = scope.track(await iframe_element.get_property('src'))
+                src = await src_prop.json_value()
 
-            if src_filter in src:
-                cf_iframe = await iframe_element.content_frame()
-                if cf_iframe and cf_iframe.is_detached():  # skip detached iframes
-                    continue
+                if src_filter in src:
+                    record_round_trips()
+                    cf_iframe = await iframe_element.content_frame()
+                    if not cf_iframe or cf_iframe.is_detached():  # skip iframes without a (live) frame
+                        continue
 
-                matched_iframes.append(cf_iframe)
+                    matched_iframes.append(cf_iframe)
     except Exception as e:
         logger.error(f'Error searching for iframes: {e}')
 
     return matched_iframes
+
+
+async def _abort_wait(
+        queryable: Union[Page, Frame, ElementHandle],
+        wait_id: str,
+        evaluation: 'asyncio.Future[JSHandle]'
+) -> None:
+    """
+    Stop the in-page wait of a cancelled wait_for_shadow_root_element call (its observers and rescans would
+    otherwise run until the in-page timeout) and release the handle its evaluation settles with
+    """
+
+    try:
+        await call_helper(queryable, 'cancelWait', wait_id)
+    except Exception as e:
+        logger.debug(f'Error cancelling the in-page wait: {e}')
+
+    try:
+        # the aborted wait resolves right away, unless it found the element just before
+        handle = await asyncio.wait_for(evaluation, timeout=1)
+    except Exception as e:
+        logger.debug(f'In-page wait ended without a handle: {e}')
+        return
+
+    await dispose_handles([handle])
+
+
+async def wait_for_shadow_root_element(
+        queryable: Union[Page, Frame, ElementHandle],
+        selector: str,
+        timeout: float,
+        visible: bool = True,
+        traversal: Optional[TraversalOptions] = None
+) -> Optional[ElementHandle]:
+    """
+    Wait until an element matching the selector appears within the shadow DOM of the queryable object
+
+    The wait runs inside the page: a MutationObserver watches the document and every shadow root, so the call
+    resolves as soon as a matching (and visible, if requested) element shows up instead of polling from Python.
+    Cancelling the call stops the in-page wait as well
+
+    :param queryable: Page, Frame, ElementHandle
+    :param selector: CSS selector to wait for
+    :param timeout: Maximum time to wait in seconds
+    :param visible: Only resolve for elements that are visible (non-empty box and not visibility:hidden)
+    :param traversal: Optional options limiting the traversal (root element, host selector, max depth)
+    :return: ElementHandle of the first matching element or None if timed out
+    """
+
+    wait_id = uuid.uuid4().hex
+    evaluation = asyncio.ensure_future(call_helper(
+        queryable, 'waitForShadowRootElement',
+        _traversal_arg(traversal, selector=selector, timeout=timeout * 1000, visible=visible, waitId=wait_id),
+        handle=True
+    ))
+
+    try:
+        # in-page timer resolves first, the timeout only guards against a hung evaluation
+        handle = await asyncio.wait_for(asyncio.shield(evaluation), timeout=timeout + 1)
+    except (asyncio.CancelledError, asyncio.TimeoutError):
+        await _abort_wait(queryable, wait_id, evaluation)
+        raise
+
+    element = handle.as_element()
+    if not element:
+        await dispose_handles([handle])
+
+    return element
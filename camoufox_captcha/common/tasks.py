@@ -0,0 +1,52 @@
+import asyncio
+from typing import Awaitable, Callable, Iterable, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+async def first_ready(
+        awaitables: Iterable[Awaitable[Optional[T]]],
+        release: Optional[Callable[[T], Awaitable[None]]] = None
+) -> Optional[T]:
+    """
+    Run awaitables concurrently and return the first truthy result, cancelling the ones still running
+
+    :param awaitables: Awaitables to run concurrently
+    :param release: Optional callback releasing truthy results that lost the race (e.g. disposing their handles)
+    :return: First truthy result, or None if none of them produced one
+    :raises Exception: The first exception raised, if no awaitable produced a truthy result
+    """
+
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    error = None
+    winner = None
+
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                result = await next_done
+            except Exception as e:
+                error = error or e
+                continue
+
+            if result:
+                winner = result
+                return result
+    finally:
+        for task in tasks:
+            task.cancel()
+
+        if release:
+            # results that finished alongside the winner
+            for task in tasks:
+                if not task.done() or task.cancelled() or task.exception():
+                    continue
+
+                result = task.result()
+                if result and result is not winner:
+                    await release(result)
+
+    if error:
+        raise error
+
+    return None
@@ -0,0 +1,443 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Set, Union
+
+from playwright.async_api import Browser, BrowserContext, Page
+
+from camoufox_captcha.common.metrics import SolveResult
+
+logger = logging.getLogger("camoufox_captcha.pool")
+
+# Camoufox launch options the solver needs (closed shadow roots and cross-origin challenge iframes)
+CAMOUFOX_LAUNCH_OPTIONS: Dict[str, Any] = {'config': {'forceScopeAccess': True}, 'disable_coop': True}
+
+
+@dataclass
+class PagePoolStats:
+    """
+    Snapshot of the pool utilization
+
+    :param max_pages: Maximum number of open pages
+    :param open_pages: Pages currently open (idle and in use)
+    :param in_use: Pages currently handed out
+    :param idle: Warm pages waiting to be handed out
+    :param contexts: Open browser contexts
+    :param acquisitions: Pages handed out so far
+    :param warm_hits: Acquisitions served by an already open page
+    :param created: Pages opened so far
+    :param recycled: Pages returned to the idle pool after use
+    :param discarded: Pages closed because they were unhealthy, worn out or in a retired context
+    :param health_failures: Pages that failed a health check
+    :param wait_time: Total time in seconds spent waiting for a page (including opening new ones)
+    :param busy_time: Total time in seconds pages spent handed out
+    :param uptime: Time in seconds since the pool was created
+    """
+
+    max_pages: int
+    open_pages: int
+    in_use: int
+    idle: int
+    contexts: int
+    acquisitions: int
+    warm_hits: int
+    created: int
+    recycled: int
+    discarded: int
+    health_failures: int
+    wait_time: float
+    busy_time: float
+    uptime: float
+
+    @property
+    def utilization(self) -> float:
+        """
+        :return: Fraction of the pool capacity currently in use
+        """
+
+        return self.in_use / self.max_pages
+
+    @property
+    def average_utilization(self) -> float:
+        """
+        :return: Fraction of the pool capacity in use on average since the pool was created
+        """
+
+        return self.busy_time / (self.max_pages * self.uptime) if self.uptime else 0.0
+
+    @property
+    def warm_hit_rate(self) -> float:
+        """
+        :return: Fraction of acquisitions that didn't have to open a page
+        """
+
+        return self.warm_hits / self.acquisitions if self.acquisitions else 0.0
+
+    @property
+    def average_wait(self) -> float:
+        """
+        :return: Average time in seconds an acquisition waited for its page
+        """
+
+        return self.wait_time / self.acquisitions if self.acquisitions else 0.0
+
+
+@dataclass
+class _PooledContext:
+    context: BrowserContext
+    pages: int = 0  # open pages, including the ones being opened
+    uses: int = 0
+    retired: bool = False
+
+
+class PagePool:
+    """
+    Keeps warm pages of a Camoufox browser and hands them out for navigate + solve, so the per-URL cost of
+    opening a context and a page (and its first layout) is paid once per page instead of once per URL
+
+    Pages are opened in shared contexts (up to pages_per_context each), health checked when returned and
+    recycled until they are worn out. Contexts are retired after max_context_uses solves, a retired context is
+    closed with its last page
+
+    Example:
+        ```python
+        from camoufox import AsyncCamoufox
+        from camoufox_captcha import PagePool, CAMOUFOX_LAUNCH_OPTIONS
+
+        async with AsyncCamoufox(headless=True, **CAMOUFOX_LAUNCH_OPTIONS) as browser:
+            async with PagePool(browser, max_pages=8, warm_pages=4) as pool:
+                success = await pool.goto_and_solve('https://example.com', expected_content_selector='#content')
+
+                async with pool.page() as page:
+                    ...  # navigate, solve and scrape
+        ```
+
+    :param browser: Browser launched with CAMOUFOX_LAUNCH_OPTIONS
+    :param max_pages: Maximum number of open pages (acquisitions wait while all of them are in use)
+    :param pages_per_context: Maximum number of pages sharing one BrowserContext
+    :param warm_pages: Number of open pages the pool keeps, opened by start() and replaced when discarded
+    :param max_page_uses: Number of uses after which a page is closed instead of recycled (None = unlimited)
+    :param max_context_uses: Number of uses after which a context is retired (None = never, contexts keep
+                             their cookies, e.g. cf_clearance, across solves)
+    :param health_check_timeout: Time in seconds a returned page has to answer the health check
+    :param context_kwargs: Keyword arguments passed to browser.new_context
+    """
+
+    def __init__(
+            self,
+            browser: Browser,
+            max_pages: int = 8,
+            pages_per_context: int = 4,
+            warm_pages: int = 0,
+            max_page_uses: Optional[int] = 50,
+            max_context_uses: Optional[int] = None,
+            health_check_timeout: float = 2,
+            context_kwargs: Optional[Dict[str, Any]] = None
+    ):
+        if max_pages <= 0 or pages_per_context <= 0:
+            raise ValueError('max_pages and pages_per_context must be positive')
+        if not 0 <= warm_pages <= max_pages:
+            raise ValueError('warm_pages must be between 0 and max_pages')
+
+        self.browser = browser
+        self.max_pages = max_pages
+        self.pages_per_context = pages_per_context
+        self.warm_pages = warm_pages
+        self.max_page_uses = max_page_uses
+        self.max_context_uses = max_context_uses
+        self.health_check_timeout = health_check_timeout
+        self.context_kwargs = context_kwargs or {}
+
+        self._contexts: Dict[BrowserContext, _PooledContext] = {}
+        self._page_contexts: Dict[Page, _PooledContext] = {}
+        self._page_uses: Dict[Page, int] = {}
+        self._crashed: Set[Page] = set()
+        self._idle: Deque[Page] = deque()
+        self._in_use: Dict[Page, float] = {}  # page -> time it was handed out
+        self._tasks: Set[asyncio.Task] = set()
+        self._closed = False
+
+        # the semaphore and the lock are created lazily so that they are bound to the running event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._context_lock: Optional[asyncio.Lock] = None
+
+        self._created_at = time.monotonic()
+        self._acquisitions = 0
+        self._warm_hits = 0
+        self._created = 0
+        self._recycled = 0
+        self._discarded = 0
+        self._health_failures = 0
+        self._wait_time = 0.0
+        self._busy_time = 0.0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pages)
+        return self._semaphore
+
+    def _get_context_lock(self) -> asyncio.Lock:
+        if self._context_lock is None:
+            self._context_lock = asyncio.Lock()
+        return self._context_lock
+
+    async def __aenter__(self) -> 'PagePool':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        """
+        Open the warm pages
+        """
+
+        missing = self.warm_pages - len(self._page_contexts)
+        if missing > 0:
+            pages = await asyncio.gather(*(self._open_page() for _ in range(missing)), return_exceptions=True)
+            for page in pages:
+                if isinstance(page, BaseException):
+                    logger.error(f'Error opening warm page: {page}')
+                else:
+                    self._idle.append(page)
+
+    async def acquire(self) -> Page:
+        """
+        Hand out a warm page (or open a new one), waiting while all max_pages pages are in use
+
+        :return: Page to navigate and solve on, give it back with release()
+        """
+
+        if self._closed:
+            raise RuntimeError('PagePool is closed')
+
+        started = time.monotonic()
+        semaphore = self._get_semaphore()
+        await semaphore.acquire()
+
+        try:
+            page = None
+            while self._idle:
+                candidate = self._idle.popleft()
+                if self._is_reusable(candidate):
+                    page = candidate
+                    self._warm_hits += 1
+                    break
+                await self._discard(candidate)
+
+            if page is None:
+                page = await self._open_page()
+        except BaseException:
+            semaphore.release()
+            raise
+
+        now = time.monotonic()
+        self._acquisitions += 1
+        self._wait_time += now - started
+        self._in_use[page] = now
+        return page
+
+    async def release(self, page: Page, healthy: bool = True) -> None:
+        """
+        Give a page back to the pool, it's recycled if it passes the health check
+
+        :param page: Page handed out by acquire()
+        :param healthy: False to close the page without checking it (e.g. after an error)
+        """
+
+        handed_out = self._in_use.pop(page, None)
+        if handed_out is None:
+            logger.error('Released page was not handed out by this pool')
+            return
+
+        self._busy_time += time.monotonic() - handed_out
+
+        try:
+            self._page_uses[page] += 1
+            pooled_context = self._page_contexts[page]
+            pooled_context.uses += 1
+            if self.max_context_uses is not None and pooled_context.uses >= self.max_context_uses:
+                pooled_context.retired = True
+
+            worn_out = self.max_page_uses is not None and self._page_uses[page] >= self.max_page_uses
+            if not healthy or worn_out or self._closed or not self._is_reusable(page):
+                await self._discard(page)
+            elif not await self._check_health(page):
+                self._health_failures += 1
+                await self._discard(page)
+            else:
+                self._recycled += 1
+                self._idle.append(page)
+        finally:
+            self._get_semaphore().release()
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Page]:
+        """
+        Borrow a page for the duration of the block, it's closed instead of recycled if the block raises
+
+        :return: Async context manager yielding the Page
+        """
+
+        page = await self.acquire()
+        healthy = False
+        try:
+            yield page
+            healthy = True
+        finally:
+            await self.release(page, healthy=healthy)
+
+    async def goto_and_solve(
+            self,
+            url: str,
+            solver: Optional[Callable[..., Awaitable[Union[bool, SolveResult]]]] = None,
+            **kwargs
+    ) -> Union[bool, SolveResult]:
+        """
+        Navigate a pooled page to the url, solve the challenge and recycle the page
+
+        :param url: URL to navigate to
+        :param solver: Coroutine function called as solver(page, url, **kwargs),
+                       defaults to camoufox_captcha.cloudflare.goto_and_solve
+        :param kwargs: Additional parameters passed to the solver
+        :return: Result of the solver
+        """
+
+        if solver is None:
+            from camoufox_captcha.cloudflare.navigation import goto_and_solve as solver
+
+        async with self.page() as page:
+            return await solver(page, url, **kwargs)
+
+    def stats(self) -> PagePoolStats:
+        """
+        :return: Snapshot of the pool utilization
+        """
+
+        now = time.monotonic()
+        busy_time = self._busy_time + sum(now - handed_out for handed_out in self._in_use.values())
+
+        return PagePoolStats(
+            max_pages=self.max_pages,
+            open_pages=len(self._page_contexts),
+            in_use=len(self._in_use),
+            idle=len(self._idle),
+            contexts=len(self._contexts),
+            acquisitions=self._acquisitions,
+            warm_hits=self._warm_hits,
+            created=self._created,
+            recycled=self._recycled,
+            discarded=self._discarded,
+            health_failures=self._health_failures,
+            wait_time=self._wait_time,
+            busy_time=busy_time,
+            uptime=now - self._created_at
+        )
+
+    async def close(self) -> None:
+        """
+        Close every idle page and context of the pool, pages still in use are closed when released
+        """
+
+        self._closed = True
+
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+
+        while self._idle:
+            await self._discard(self._idle.popleft())
+
+        for pooled_context in list(self._contexts.values()):
+            pooled_context.retired = True
+            if not pooled_context.pages:
+                await self._close_context(pooled_context)
+
+    def _is_reusable(self, page: Page) -> bool:
+        """
+        Local checks only, no round trip
+        """
+
+        return page not in self._crashed and not page.is_closed() and not self._page_contexts[page].retired
+
+    async def _check_health(self, page: Page) -> bool:
+        """
+        Check that the page still answers within health_check_timeout (a hung or crashed renderer doesn't)
+        """
+
+        try:
+            return await asyncio.wait_for(page.evaluate('1'), self.health_check_timeout) == 1
+        except Exception as e:
+            logger.error(f'Pooled page failed the health check: {e}')
+            return False
+
+    async def _open_page(self) -> Page:
+        # the slot is reserved under the lock, so concurrent openings share contexts instead of overfilling them
+        # or opening one context each
+        async with self._get_context_lock():
+            pooled_context = next((pooled for pooled in self._contexts.values()
+                                   if not pooled.retired and pooled.pages < self.pages_per_context), None)
+            if pooled_context is None:
+                pooled_context = _PooledContext(await self.browser.new_context(**self.context_kwargs))
+                self._contexts[pooled_context.context] = pooled_context
+
+            pooled_context.pages += 1
+
+        try:
+            page = await pooled_context.context.new_page()
+        except BaseException:
+            pooled_context.pages -= 1
+            raise
+
+        page.on('crash', self._crashed.add)
+        self._page_contexts[page] = pooled_context
+        self._page_uses[page] = 0
+        self._created += 1
+        return page
+
+    async def _discard(self, page: Page) -> None:
+        pooled_context = self._page_contexts.pop(page)
+        self._page_uses.pop(page, None)
+        self._crashed.discard(page)
+        self._discarded += 1
+        pooled_context.pages -= 1
+
+        try:
+            await page.close()
+        except Exception as e:
+            logger.error(f'Error closing pooled page: {e}')
+
+        if pooled_context.retired and not pooled_context.pages:
+            await self._close_context(pooled_context)
+
+        if not self._closed and len(self._page_contexts) < self.warm_pages:
+            # replace the page in the background, the caller doesn't wait for it
+            task = asyncio.ensure_future(self._replace_warm_page())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _replace_warm_page(self) -> None:
+        if len(self._page_contexts) >= self.warm_pages:
+            return  # acquisitions opened pages in the meantime
+
+        try:
+            page = await self._open_page()
+        except Exception as e:
+            logger.error(f'Error opening warm page: {e}')
+            return
+
+        if self._closed or len(self._page_contexts) > self.max_pages:
+            await self._discard(page)
+        else:
+            self._idle.append(page)
+
+    async def _close_context(self, pooled_context: _PooledContext) -> None:
+        self._contexts.pop(pooled_context.context, None)
+        try:
+            await pooled_context.context.close()
+        except Exception as e:
+            logger.error(f'Error closing pooled context: {e}')
@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import weakref
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Union
+
+from playwright.async_api import Browser, BrowserContext, ElementHandle, Frame, Page
+
+from camoufox_captcha import solve_captcha
+from camoufox_captcha.page_pool import PagePool
+
+logger = logging.getLogger("camoufox_captcha.pool")
+
+PoolItem = Union[Page, Frame, ElementHandle, str]
+
+
+@dataclass
+class PoolResult:
+    """
+    Outcome of solving a single item in the pool
+
+    :param index: Position of the item in the input iterable
+    :param item: Page, Frame, ElementHandle or URL that was solved
+    :param success: True if the captcha was solved (or not present), False otherwise
+    :param error: Exception raised while opening or solving the item, if any
+    :param page: Page opened by the pool for URL items (owned by the caller unless close_pages is set,
+                 None if the page was borrowed from a PagePool opener and has been recycled)
+    """
+
+    index: int
+    item: PoolItem
+    success: bool
+    error: Optional[BaseException] = None
+    page: Optional[Page] = None
+
+
+class SolverPool:
+    """
+    Runs solve_captcha across many queryables or URLs with bounded parallelism,
+    so one browser process can keep many challenges in flight at once
+
+    :param opener: Browser, BrowserContext or PagePool used to open pages for URL items
+                   (PagePool pages are recycled once solved)
+    :param max_concurrency: Maximum number of items solved at the same time (per pool, across all browsers)
+    :param max_per_context: Maximum number of items solved at the same time within one BrowserContext
+    :param close_pages: Close pages opened for URL items once they are solved
+    :param goto_kwargs: Keyword arguments passed to page.goto for URL items
+    :param solver: Solving coroutine function, defaults to solve_captcha
+    :param solve_kwargs: Keyword arguments passed to the solver for every item
+    """
+
+    def __init__(
+            self,
+            opener: Optional[Union[Browser, BrowserContext, PagePool]] = None,
+            max_concurrency: int = 8,
+            max_per_context: int = 4,
+            close_pages: bool = False,
+            goto_kwargs: Optional[Dict[str, Any]] = None,
+            solver: Callable[..., Awaitable[bool]] = solve_captcha,
+            **solve_kwargs
+    ):
+        if max_concurrency <= 0 or max_per_context <= 0:
+            raise ValueError('max_concurrency and max_per_context must be positive')
+
+        self.opener = opener
+        self.max_concurrency = max_concurrency
+        self.max_per_context = max_per_context
+        self.close_pages = close_pages
+        self.goto_kwargs = goto_kwargs if goto_kwargs is not None else {'wait_until': 'load'}
+        self.solver = solver
+        self.solve_kwargs = solve_kwargs
+
+        # semaphores are created lazily so that they are bound to the running event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._context_semaphores: 'weakref.WeakKeyDictionary[BrowserContext, asyncio.Semaphore]' = \
+            weakref.WeakKeyDictionary()
+        self._unbound_semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _get_context_semaphore(self, context: Optional[BrowserContext]) -> asyncio.Semaphore:
+        if context is None:
+            # items whose context is unknown or not shared (Browser.new_page creates one per page)
+            if self._unbound_semaphore is None:
+                self._unbound_semaphore = asyncio.Semaphore(self.max_concurrency)
+            return self._unbound_semaphore
+
+        if context not in self._context_semaphores:
+            self._context_semaphores[context] = asyncio.Semaphore(self.max_per_context)
+        return self._context_semaphores[context]
+
+    async def _get_context(self, item: PoolItem) -> Optional[BrowserContext]:
+        """
+        Resolve the BrowserContext the item belongs to (or will be opened in)
+        """
+
+        if isinstance(item, str):
+            return self.opener if isinstance(self.opener, BrowserContext) else None
+
+        if isinstance(item, ElementHandle):
+            frame = await item.owner_frame()
+            return frame.page.context if frame else None
+
+        if isinstance(item, Frame):
+            return item.page.context
+
+        return item.context
+
+    async def _open(self, url: str) -> Page:
+        if self.opener is None:
+            raise ValueError('Browser or BrowserContext opener is required to solve URL items')
+
+        if isinstance(self.opener, PagePool):
+            page = await self.opener.acquire()
+        else:
+            page = await self.opener.new_page()
+
+        try:
+            await page.goto(url, **self.goto_kwargs)
+        except Exception:
+            # the page never reaches the caller, so it's released (or closed) here whatever close_pages says
+            if isinstance(self.opener, PagePool):
+                await self.opener.release(page, healthy=False)
+            else:
+                try:
+                    await page.close()
+                except Exception as e:
+                    logger.debug(f'Error closing page after failed navigation: {e}')
+            raise
+        return page
+
+    async def solve(self, item: PoolItem, index: int = 0) -> PoolResult:
+        """
+        Solve a single item, respecting the pool's concurrency limits
+
+        :param item: Page, Frame, ElementHandle or URL
+        :param index: Position of the item reported back in the result
+        :return: PoolResult of the item (errors are captured, not raised)
+        """
+
+        async with self._get_semaphore():
+            page = None
+            error = None
+            try:
+                context = await self._get_context(item)
+                async with self._get_context_semaphore(context):
+                    if isinstance(item, str):
+                        page = await self._open(item)
+
+                    success = await self.solver(page or item, **self.solve_kwargs)
+
+                return PoolResult(index=index, item=item, success=success, page=self._returned_page(page))
+            except Exception as e:
+                error = e
+                logger.error(f'Error solving captcha for item {index}: {e}')
+                return PoolResult(index=index, item=item, success=False, error=e, page=self._returned_page(page))
+            finally:
+                if page and isinstance(self.opener, PagePool):
+                    await self.opener.release(page, healthy=error is None)
+                elif page and self.close_pages:
+                    # a page that fails to close (e.g. disconnected browser) must not replace the result
+                    try:
+                        await page.close()
+                    except Exception as e:
+                        logger.debug(f'Error closing page of item {index}: {e}')
+
+    def _returned_page(self, page: Optional[Page]) -> Optional[Page]:
+        # pooled pages go back to the PagePool, they can't be handed to the caller
+        return None if isinstance(self.opener, PagePool) else page
+
+    async def solve_many(self, items: Iterable[PoolItem]) -> AsyncIterator[PoolResult]:
+        """
+        Solve many items concurrently and yield their results as they finish
+
+        Items are pulled from the iterable only when a slot frees up, so at most max_concurrency
+        items are in flight and a slow consumer applies backpressure to the producer
+
+        :param items: Iterable of Pages, Frames, ElementHandles or URLs
+        :return: Async iterator of PoolResult in completion order
+        """
+
+        iterator = iter(enumerate(items))
+        pending = set()
+
+        try:
+            while True:
+                # top up in-flight items until the limit is reached or the input is exhausted
+                while len(pending) < self.max_concurrency:
+                    try:
+                        index, item = next(iterator)
+                    except StopIteration:
+                        break
+                    pending.add(asyncio.ensure_future(self.solve(item, index)))
+
+                if not pending:
+                    return
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+async def solve_captcha_many(
+        items: Iterable[PoolItem],
+        opener: Optional[Union[Browser, BrowserContext, PagePool]] = None,
+        max_concurrency: int = 8,
+        max_per_context: int = 4,
+        **kwargs
+) -> AsyncIterator[PoolResult]:
+    """
+    Solve captcha on many Pages, Frames, ElementHandles or URLs concurrently
+
+    Example:
+        ```python
+        async for result in solve_captcha_many(urls, opener=context, max_concurrency=8,
+                                               captcha_type='cloudflare', challenge_type='interstitial'):
+            print(result.item, result.success)
+        ```
+
+    :param items: Iterable of Pages, Frames, ElementHandles or URLs
+    :param opener: Browser, BrowserContext or PagePool used to open pages for URL items
+    :param max_concurrency: Maximum number of items solved at the same time (per pool, across all browsers)
+    :param max_per_context: Maximum number of items solved at the same time within one BrowserContext
+    :param kwargs: Additional parameters passed to SolverPool (close_pages, goto_kwargs) and solve_captcha
+    :return: Async iterator of PoolResult in completion order
+    """
+
+    pool = SolverPool(opener, max_concurrency=max_concurrency, max_per_context=max_per_context, **kwargs)
+    async for result in pool.solve_many(items):
+        yield result
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import importlib
+import logging
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from camoufox_captcha.common.metrics import SolveMetrics, SolveResult
+
+if TYPE_CHECKING:
+    from playwright.async_api import ElementHandle, Frame, Page
+
+logger = logging.getLogger("camoufox_captcha.registry")
+
+SolverFunc = Callable[..., Awaitable[Union[bool, SolveResult]]]
+
+
+@dataclass(frozen=True)
+class SolverEntry:
+    """
+    Solver registered for a (provider, challenge_type, method) combination
+
+    :param provider: Captcha provider (e.g. "cloudflare")
+    :param challenge_type: Type of challenge specific to the provider (e.g. "interstitial")
+    :param method: Solving method (e.g. "click")
+    :param solver: Solving coroutine function or its "module:function" import path, imported on first use
+                   (called as solver(queryable, challenge_type=..., timeout=..., **kwargs))
+    :param probe_selectors: CSS selectors detecting the challenge, any match means the challenge is present
+                            (probes of all entries are checked in a single evaluation)
+    """
+
+    provider: str
+    challenge_type: str
+    method: str
+    solver: Union[str, SolverFunc]
+    probe_selectors: Tuple[str, ...] = field(default=())
+
+    def load(self) -> SolverFunc:
+        """
+        :return: Solving coroutine function (imported from its path if registered lazily)
+        """
+
+        if not isinstance(self.solver, str):
+            return self.solver
+
+        # resolved on every call, the module is imported once and patched attributes are respected
+        module_name, _, attribute = self.solver.partition(':')
+        return getattr(importlib.import_module(module_name), attribute)
+
+
+def _quote_options(options: Sequence[str], conjunction: str = 'or') -> str:
+    quoted = [f"'{option}'" for option in options]
+    if len(quoted) == 1:
+        return quoted[0]
+    return f"{', '.join(quoted[:-1])} {conjunction} {quoted[-1]}"
+
+
+class SolverRegistry:
+    """
+    Registry of solvers keyed by (provider, challenge_type, method)
+
+    The first registered challenge type of a provider and the first registered method of a challenge type
+    are the defaults. Registering only stores an import path and selectors, so providers add neither imports
+    nor round trips to solves that name their captcha and challenge type explicitly
+
+    Example:
+        ```python
+        from camoufox_captcha import registry
+
+        registry.register('hcaptcha', 'checkbox', 'click', 'my_package.hcaptcha:solve_by_click',
+                          probe_selectors=['iframe[src*="hcaptcha.com"]'])
+        ```
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str, str], SolverEntry] = {}
+
+    def register(
+            self,
+            provider: str,
+            challenge_type: str,
+            method: str,
+            solver: Union[str, SolverFunc],
+            probe_selectors: Sequence[str] = ()
+    ) -> SolverEntry:
+        """
+        Register a solver (replaces the solver registered for the same combination)
+
+        :param provider: Captcha provider (e.g. "cloudflare")
+        :param challenge_type: Type of challenge specific to the provider
+        :param method: Solving method
+        :param solver: Solving coroutine function or its "module:function" import path
+        :param probe_selectors: CSS selectors detecting the challenge, used when the provider or challenge type
+                                is "auto" (entries without selectors are never picked by detection)
+        :return: Registered SolverEntry
+        """
+
+        entry = SolverEntry(provider, challenge_type, method, solver, tuple(probe_selectors))
+        self._entries[(provider, challenge_type, method)] = entry
+        return entry
+
+    def unregister(self, provider: str, challenge_type: str, method: str) -> None:
+        """
+        Remove a registered solver
+
+        :param provider: Captcha provider
+        :param challenge_type: Type of challenge specific to the provider
+        :param method: Solving method
+        """
+
+        self._entries.pop((provider, challenge_type, method), None)
+
+    def entries(self, provider: Optional[str] = None) -> List[SolverEntry]:
+        """
+        :param provider: Only return the entries of this provider
+        :return: Registered entries in registration order
+        """
+
+        return [entry for entry in self._entries.values() if provider is None or entry.provider == provider]
+
+    def get(
+            self,
+            provider: str,
+            challenge_type: Optional[str] = None,
+            method: Optional[str] = None
+    ) -> SolverEntry:
+        """
+        Find the solver for the combination, defaults are used for an empty challenge type or method
+
+        :param provider: Captcha provider
+        :param challenge_type: Type of challenge specific to the provider
+        :param method: Solving method
+        :return: Matching SolverEntry
+        :raises ValueError: If nothing is registered for the combination
+        """
+
+        provider_entries = self.entries(provider)
+        if not provider_entries:
+            providers = list(dict.fromkeys(entry.provider for entry in self._entries.values()))
+            raise ValueError(
+                f"Unsupported captcha type: '{provider}'. "
+                f"Currently only {_quote_options(providers)} {'is' if len(providers) == 1 else 'are'} supported."
+            )
+
+        if not challenge_type:
+            challenge_type = provider_entries[0].challenge_type
+
+        challenge_entries = [entry for entry in provider_entries if entry.challenge_type == challenge_type]
+        if not challenge_entries:
+            challenge_types = list(dict.fromkeys(entry.challenge_type for entry in provider_entries))
+            raise ValueError(
+                f"Unsupported {provider.capitalize()} challenge type: '{challenge_type}'. "
+                f"Supported types are: {_quote_options(challenge_types)}"
+            )
+
+        if method is None:
+            return challenge_entries[0]
+
+        for entry in challenge_entries:
+            if entry.method == method:
+                return entry
+
+        methods = [entry.method for entry in challenge_entries]
+        raise ValueError(
+            f"Unsupported method '{method}' for {provider.capitalize()} captcha. "
+            f"Currently only {_quote_options(methods)} method{'' if len(methods) == 1 else 's'} "
+            f"{'is' if len(methods) == 1 else 'are'} supported."
+        )
+
+    async def detect(
+            self,
+            queryable: Union[Page, Frame, ElementHandle],
+            provider: Optional[str] = None
+    ) -> Optional[SolverEntry]:
+        """
+        Run the probes of all registered challenges (of the provider) in a single evaluation
+
+        :param queryable: Page, Frame, ElementHandle
+        :param provider: Only detect challenges of this provider
+        :return: First matching entry in registration order (default method), None if nothing matched
+        """
+
+        # one candidate per (provider, challenge_type), the first registered method is the default
+        candidates: Dict[Tuple[str, str], SolverEntry] = {}
+        for entry in self.entries(provider):
+            if entry.probe_selectors:
+                candidates.setdefault((entry.provider, entry.challenge_type), entry)
+
+        if not candidates:
+            return None
+
+        from camoufox_captcha.common.detection import OPEN_SHADOW_MATCHER_JS
+        from camoufox_captcha.common.evaluate import evaluate_in_scope
+
+        # script to check every probe in the scope of the queryable object at once
+        # (open shadow roots included, as query_selector would)
+        js = """
+        (root, probes) => {
+            const matcher = (%s)(root);
+            return probes.map((selectors) => selectors.some((selector) => {
+                try {
+                    return matcher(selector);
+                } catch (e) {
+                    return false;  // a provider's invalid selector must not break the other probes
+                }
+            }));
+        }
+        """ % OPEN_SHADOW_MATCHER_JS
+
+        entries = list(candidates.values())
+        matches = await evaluate_in_scope(queryable, js, [list(entry.probe_selectors) for entry in entries])
+
+        for entry, matched in zip(entries, matches):
+            if matched:
+                return entry
+
+        return None
+
+    async def solve(
+            self,
+            queryable: Union[Page, Frame, ElementHandle],
+            captcha_type: str,
+            challenge_type: Optional[str] = None,
+            method: Optional[str] = None,
+            **kwargs: Any
+    ) -> Union[bool, SolveResult]:
+        """
+        Route to the registered solver, "auto" as captcha_type (or as the challenge type of a provider without
+        an "auto" solver) picks it with the batched detection probe
+
+        :param queryable: Page, Frame, ElementHandle
+        :param captcha_type: Captcha provider or "auto"
+        :param challenge_type: Type of challenge specific to the provider or "auto"
+        :param method: Solving method (defaults to the first registered one)
+        :param kwargs: Parameters passed to the solver
+        :return: Result of the solver, success if "auto" detected no challenge
+        """
+
+        if captcha_type == 'auto' or (challenge_type == 'auto' and not self._has(captcha_type, 'auto')):
+            provider = None if captcha_type == 'auto' else captcha_type
+            if provider:
+                self.get(provider)  # unknown providers are reported before probing
+
+            entry = await self.detect(queryable, provider)
+            if not entry:
+                logger.info('No registered challenge detected')
+                result = SolveMetrics(kwargs.get('hooks')).finish(True, 'no_challenge')
+                return result if kwargs.get('return_result') else result.success
+
+            logger.info(f'Detected {entry.provider} {entry.challenge_type} challenge')
+            if method is not None:
+                entry = self.get(entry.provider, entry.challenge_type, method)
+        else:
+            entry = self.get(captcha_type, challenge_type, method)
+
+        return await entry.load()(queryable, challenge_type=entry.challenge_type, **kwargs)
+
+    def _has(self, provider: str, challenge_type: str) -> bool:
+        return any(entry.challenge_type == challenge_type for entry in self.entries(provider))
+
+
+# default registry used by solve_captcha
+registry = SolverRegistry()
+
+
+def register_solver(
+        provider: str,
+        challenge_type: str,
+        method: str,
+        solver: Union[str, SolverFunc],
+        probe_selectors: Sequence[str] = ()
+) -> SolverEntry:
+    """
+    Register a solver in the default registry used by solve_captcha (see SolverRegistry.register)
+    """
+
+    return registry.register(provider, challenge_type, method, solver, probe_selectors)
+
+
+def _register_builtin_solvers() -> None:
+    from camoufox_captcha.cloudflare.utils.selectors import CF_INTERSTITIAL_INDICATORS_SELECTORS, \
+        CF_TURNSTILE_INDICATORS_SELECTORS
+
+    cloudflare_click = 'camoufox_captcha.cloudflare.solve_by_click:solve_cloudflare_by_click'
+
+    # interstitial first: it's the default challenge type and interstitial pages carry turnstile indicators too
+    register_solver('cloudflare', 'interstitial', 'click', cloudflare_click, CF_INTERSTITIAL_INDICATORS_SELECTORS)
+    register_solver('cloudflare', 'turnstile', 'click', cloudflare_click, CF_TURNSTILE_INDICATORS_SELECTORS)
+    # the click solver classifies the challenge itself on every attempt
+    register_solver('cloudflare', 'auto', 'click', cloudflare_click)
+    # every turnstile widget of the page solved concurrently
+    register_solver('cloudflare', 'turnstile', 'click_all',
+                    'camoufox_captcha.cloudflare.solve_by_click:solve_cloudflare_widgets')
+
+
+_register_builtin_solvers()
@@ -0,0 +1,183 @@
+"""
+Synchronous entry point for scrapers built on Playwright's sync API
+
+Sync Page/Frame/ElementHandle objects are backed by an asyncio loop that Playwright drives on a greenlet,
+so the async solving pipeline runs on that very loop (the same way every sync Playwright call does):
+no event loop or thread is created per call, and each worker thread keeps using its own Playwright instance
+"""
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Literal, Optional, Union
+
+from playwright._impl._async_base import mapping as async_mapping
+from playwright._impl._sync_base import SyncBase
+from playwright.sync_api import ElementHandle, Frame, Page
+
+from camoufox_captcha import solve_captcha as async_solve_captcha
+from camoufox_captcha.cloudflare import solve_cloudflare_by_click as async_solve_cloudflare_by_click
+from camoufox_captcha.common.metrics import SolveResult
+
+# attribute caching the async API wrapper of an impl object that belongs to a sync connection
+# (the shared wrapper cache of that object must keep returning the sync wrapper to the caller's code)
+_ASYNC_API_ATTR = '_camoufox_captcha_async_api_'
+
+# the async wrapper mapping is only replaced while sync solves run (counted across worker threads)
+_async_mapping_lock = threading.Lock()
+_async_mapping_users = 0
+_replaced_from_maybe_impl: Optional[Callable[..., Any]] = None
+
+
+def _check_playwright_support() -> None:
+    """
+    Check that the Playwright internals bridging sync objects to the async API are available
+
+    :raises RuntimeError: If the installed Playwright version doesn't provide them
+    """
+
+    missing = [name for name, available in (
+        ('ImplToApiMapping.from_maybe_impl', callable(getattr(async_mapping, 'from_maybe_impl', None))),
+        ('ImplToApiMapping._mapping', isinstance(getattr(async_mapping, '_mapping', None), dict)),
+        ('SyncBase._sync', callable(getattr(SyncBase, '_sync', None))),
+    ) if not available]
+
+    if missing:
+        raise RuntimeError(
+            f"camoufox_captcha.sync_api isn't supported by the installed Playwright version "
+            f"(missing: {', '.join(missing)}). Use camoufox_captcha.solve_captcha with Playwright's async API"
+        )
+
+
+@contextmanager
+def _async_mapping_of_sync_connections() -> Iterator[None]:
+    """
+    Make the async API wrap impl objects of sync connections without touching their sync wrappers,
+    Playwright's own mapping is restored once the last sync solve is done
+
+    Playwright caches a single API wrapper on every impl object, so async wrappers created for objects of a sync
+    connection would otherwise replace the sync wrappers returned to the caller (e.g. by page.frames)
+    """
+
+    global _async_mapping_users, _replaced_from_maybe_impl
+
+    with _async_mapping_lock:
+        if not _async_mapping_users:
+            _replaced_from_maybe_impl = vars(async_mapping).get('from_maybe_impl')
+            from_maybe_impl = async_mapping.from_maybe_impl
+
+            def from_maybe_impl_of_sync_connection(obj: Any, visited: Any = None) -> Any:
+                api_class = async_mapping._mapping.get(type(obj))
+                # objects of async connections don't have a dispatcher fiber
+                if api_class is None or getattr(obj, '_dispatcher_fiber', None) is None:
+                    return from_maybe_impl(obj, visited)
+
+                api_instance = obj.__dict__.get(_ASYNC_API_ATTR)
+                if api_instance is None:
+                    api_instance = api_class(obj)
+                    setattr(obj, _ASYNC_API_ATTR, api_instance)
+                return api_instance
+
+            async_mapping.from_maybe_impl = from_maybe_impl_of_sync_connection
+        _async_mapping_users += 1
+
+    try:
+        yield
+    finally:
+        with _async_mapping_lock:
+            _async_mapping_users -= 1
+            if not _async_mapping_users:
+                if _replaced_from_maybe_impl is None:
+                    del async_mapping.from_maybe_impl
+                else:
+                    async_mapping.from_maybe_impl = _replaced_from_maybe_impl
+                _replaced_from_maybe_impl = None
+
+
+def _to_async(queryable: Union[Page, Frame, ElementHandle]) -> Any:
+    """
+    Get the async API counterpart of a sync Page, Frame or ElementHandle
+
+    :param queryable: sync Page, Frame, ElementHandle
+    :return: async Page, Frame, ElementHandle backed by the same browser object
+    """
+
+    if not isinstance(queryable, (Page, Frame, ElementHandle)):
+        raise TypeError(
+            f"Unsupported queryable type: '{type(queryable).__name__}'. "
+            f"Expected a sync Page, Frame or ElementHandle (use camoufox_captcha.solve_captcha for async objects)"
+        )
+
+    impl_obj = getattr(queryable, '_impl_obj', None)
+    if impl_obj is None or not hasattr(impl_obj, '_dispatcher_fiber'):
+        raise RuntimeError(
+            f"camoufox_captcha.sync_api can't reach the browser object behind '{type(queryable).__name__}' "
+            f"with the installed Playwright version. Use camoufox_captcha.solve_captcha with Playwright's async API"
+        )
+
+    return async_mapping.from_impl(impl_obj)
+
+
+def _run(queryable: SyncBase, solver: Callable[..., Any], **kwargs) -> Any:
+    """
+    Run an async solver on the Playwright loop backing the sync object and return its result
+
+    :param queryable: sync Page, Frame, ElementHandle
+    :param solver: Async solver called with the async counterpart of queryable
+    :param kwargs: Parameters of the solver
+    """
+
+    _check_playwright_support()
+    with _async_mapping_of_sync_connections():
+        return queryable._sync(solver(_to_async(queryable), **kwargs))
+
+
+def solve_captcha(
+        queryable: Union[Page, Frame, ElementHandle],
+        captcha_type: Literal["cloudflare", "auto"] = "cloudflare",
+        challenge_type: Literal["interstitial", "turnstile", "auto"] = "interstitial",
+        method: Optional[str] = None,
+        timeout: Optional[float] = None,
+        **kwargs
+) -> Union[bool, SolveResult]:
+    """
+    Synchronous version of camoufox_captcha.solve_captcha for Playwright's sync API
+
+    Example:
+        ```python
+        from camoufox.sync_api import Camoufox
+        from camoufox_captcha.sync_api import solve_captcha
+
+        with Camoufox(config={'forceScopeAccess': True}, disable_coop=True) as browser:
+            page = browser.new_page()
+            page.goto('https://example.com')
+            success = solve_captcha(page, captcha_type='cloudflare', challenge_type='interstitial')
+        ```
+
+    :param queryable: sync Page, Frame or ElementHandle containing the captcha
+    :param captcha_type: Type of captcha provider
+    :param challenge_type: Type of challenge specific to the captcha provider
+    :param method: Solving method (defaults to the best available method for the captcha type)
+    :param timeout: Optional overall time budget in seconds
+    :param kwargs: Additional parameters passed to the specific solver function
+    :return: True if solved, False otherwise (SolveResult if return_result=True is passed)
+    """
+
+    return _run(queryable, async_solve_captcha, captcha_type=captcha_type, challenge_type=challenge_type,
+                method=method, timeout=timeout, **kwargs)
+
+
+def solve_cloudflare_by_click(
+        queryable: Union[Page, Frame, ElementHandle],
+        **kwargs
+) -> Union[bool, SolveResult]:
+    """
+    Synchronous version of camoufox_captcha.cloudflare.solve_cloudflare_by_click for Playwright's sync API
+
+    :param queryable: sync Page, Frame or ElementHandle containing the challenge
+    :param kwargs: Parameters of solve_cloudflare_by_click
+    :return: True if solved, False otherwise (SolveResult if return_result=True is passed)
+    """
+
+    return _run(queryable, async_solve_cloudflare_by_click, **kwargs)
+
+
+__all__ = ['solve_captcha', 'solve_cloudflare_by_click', 'SolveResult']
@@ -1,10 +1,12 @@
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
-from playwright.async_api import Page, Frame, ElementHandle
+from playwright.async_api import Page, Frame, ElementHandle, Response
 
-from camoufox_captcha.cloudflare.utils.detection import detect_cloudflare_challenge, \
-    CF_TURNSTILE_INDICATORS_SELECTORS, CF_INTERSTITIAL_INDICATORS_SELECTORS
+from camoufox_captcha.cloudflare.utils.detection import detect_cloudflare_challenge, probe_cloudflare_challenge, \
+    ChallengeProbe, CF_TURNSTILE_INDICATORS_SELECTORS, CF_INTERSTITIAL_INDICATORS_SELECTORS, \
+    is_cloudflare_challenge_response, locate_turnstile_container, CF_TURNSTILE_RESPONSE_SELECTOR, \
+    CF_TURNSTILE_CONTAINER_SELECTORS
 
 
 @pytest.fixture
@@ -82,3 +84,107 @@ async def test_detect_cloudflare_challenge_with_element_handle(mock_element_hand
     result = await detect_cloudflare_challenge(mock_element_handle)
 
     assert result is True
+
+
+@pytest.mark.asyncio
+async def test_probe_cloudflare_challenge_single_evaluation(mock_page):
+    """ Test that all indicator groups and the expected content are checked in one evaluation """
+    mock_page.evaluate.return_value = {'interstitial': True, 'turnstile': False, 'expectedContent': False}
+
+    probe = await probe_cloudflare_challenge(mock_page, expected_content_selector='#content')
+
+    assert probe == ChallengeProbe(interstitial=True, turnstile=False, expected_content=False)
+    assert probe.detected('interstitial') is True
+    assert probe.detected('turnstile') is False
+    mock_page.evaluate.assert_called_once()
+    mock_page.query_selector.assert_not_called()
+
+    js, arg = mock_page.evaluate.call_args.args
+    assert arg == {'interstitial': CF_INTERSTITIAL_INDICATORS_SELECTORS,
+                   'turnstile': CF_TURNSTILE_INDICATORS_SELECTORS,
+                   'expected': '#content'}
+    # expected content and indicators in open shadow roots match, as with query_selector
+    assert 'el.shadowRoot' in js and 'expectedContent = matcher(expected)' in js
+
+
+@pytest.mark.asyncio
+async def test_probe_cloudflare_challenge_non_css_expected_content(mock_page):
+    """ Test that selectors the page can't handle fall back to Playwright's query_selector """
+    mock_page.evaluate.return_value = {'interstitial': False, 'turnstile': True, 'expectedContent': None}
+    mock_page.query_selector.return_value = AsyncMock()
+
+    probe = await probe_cloudflare_challenge(mock_page, expected_content_selector='text=Passed')
+
+    assert probe.expected_content is True
+    mock_page.query_selector.assert_called_once_with('text=Passed')
+
+
+@pytest.mark.asyncio
+async def test_probe_cloudflare_challenge_with_element_handle(mock_element_handle):
+    """ Test that the probe is scoped to the element for ElementHandle """
+    mock_element_handle.evaluate.return_value = {'interstitial': False, 'turnstile': True, 'expectedContent': False}
+
+    probe = await probe_cloudflare_challenge(mock_element_handle)
+
+    assert probe.turnstile is True
+    js = mock_element_handle.evaluate.call_args.args[0]
+    assert 'document' not in js.split('=>')[0]
+
+
+def make_response(status, headers):
+    response = MagicMock(spec=Response)
+    response.status = status
+    response.headers = headers
+    return response
+
+
+@pytest.mark.parametrize('status, headers, expected', [
+    (403, {'cf-mitigated': 'challenge', 'server': 'cloudflare'}, True),
+    (200, {'cf-mitigated': 'challenge'}, True),
+    (503, {'server': 'cloudflare'}, True),
+    (403, {'server': 'cloudflare'}, True),
+    (200, {'server': 'cloudflare'}, False),
+    (403, {'server': 'nginx'}, False),
+    (200, {}, False),
+])
+def test_is_cloudflare_challenge_response(status, headers, expected):
+    """ Test challenge detection from the document response status and headers """
+    assert is_cloudflare_challenge_response(make_response(status, headers)) is expected
+
+
+@pytest.mark.parametrize('interstitial, turnstile, expected', [
+    (True, True, 'interstitial'),
+    (True, False, 'interstitial'),
+    (False, True, 'turnstile'),
+    (False, False, None),
+])
+def test_challenge_probe_classify(interstitial, turnstile, expected):
+    """ Test challenge classification, interstitial pages carry turnstile indicators as well """
+    probe = ChallengeProbe(interstitial=interstitial, turnstile=turnstile, expected_content=False)
+    assert probe.classify() == expected
+
+
+@pytest.mark.asyncio
+async def test_locate_turnstile_container_found(mock_page, mock_element_handle):
+    """ Test locating the turnstile container in a single evaluation """
+    handle = MagicMock()
+    handle.as_element.return_value = mock_element_handle
+    mock_page.evaluate_handle.return_value = handle
+
+    container = await locate_turnstile_container(mock_page)
+
+    assert container is mock_element_handle
+    mock_page.evaluate_handle.assert_called_once()
+    assert mock_page.evaluate_handle.call_args.args[1] == {'response': CF_TURNSTILE_RESPONSE_SELECTOR,
+                                                           'containers': CF_TURNSTILE_CONTAINER_SELECTORS}
+
+
+@pytest.mark.asyncio
+async def test_locate_turnstile_container_not_found(mock_page):
+    """ Test that the result handle is disposed when there is no turnstile widget """
+    handle = AsyncMock()
+    handle.as_element = MagicMock(return_value=None)
+    mock_page.evaluate_handle.return_value = handle
+
+    assert await locate_turnstile_container(mock_page) is None
+    handle.dispose.assert_called_once()
@@ -1,19 +1,35 @@
+import asyncio
 import logging
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-from playwright.async_api import Frame, ElementHandle
+from playwright.async_api import Frame, ElementHandle, Locator, TimeoutError as PlaywrightTimeoutError
 
 from camoufox_captcha.cloudflare.utils.dom_helpers import get_ready_checkbox
+from camoufox_captcha.common.deadline import Deadline
+from camoufox_captcha.common.geometry import take_geometry
+from camoufox_captcha.common.metrics import SolveMetrics
+from camoufox_captcha.common.retry import RetryPolicy
+
+
+def probe_result(visible=True, enabled=True, obscured=False):
+    return {'visible': visible, 'enabled': enabled, 'obscured': obscured, 'x': 10, 'y': 20, 'width': 24, 'height': 24}
+
+
+def probe_checkboxes(visible=True):
+    # the geometry probe of the frame measures every checkbox passed to it
+    return lambda js, checkboxes: [probe_result(visible) for _ in checkboxes]
 
 
 @pytest.fixture
 def mock_frames():
     frame1 = AsyncMock(spec=Frame)
     frame1.is_detached.return_value = False
+    frame1.evaluate.side_effect = probe_checkboxes()
 
     frame2 = AsyncMock(spec=Frame)
     frame2.is_detached.return_value = False
+    frame2.evaluate.side_effect = probe_checkboxes()
 
     return [frame1, frame2]
 
@@ -21,14 +37,6 @@ def mock_frames():
 @pytest.fixture
 def mock_checkbox():
     checkbox = AsyncMock(spec=ElementHandle)
-    checkbox.is_visible.return_value = True
-    return checkbox
-
-
-@pytest.fixture
-def mock_invisible_checkbox():
-    checkbox = AsyncMock(spec=ElementHandle)
-    checkbox.is_visible.return_value = False
     return checkbox
 
 
@@ -52,10 +60,37 @@ async def test_get_ready_checkbox_success(mock_frames, mock_checkbox):
 
 
 @pytest.mark.asyncio
-async def test_get_ready_checkbox_invisible(mock_frames, mock_invisible_checkbox):
+async def test_get_ready_checkbox_probes_candidates_at_once(mock_frames):
+    """ Test that all candidates of an iframe are measured in one probe and the ready one keeps its geometry """
+    hidden, ready, other = (AsyncMock(spec=ElementHandle) for _ in range(3))
+    mock_frames[0].evaluate.side_effect = None
+    mock_frames[0].evaluate.return_value = [probe_result(visible=False), probe_result(), probe_result()]
+
+    metrics = SolveMetrics()
+    with patch('camoufox_captcha.cloudflare.utils.dom_helpers.search_shadow_root_elements',
+               AsyncMock(return_value=[hidden, ready, other])), metrics.activate():
+        result = await get_ready_checkbox(mock_frames[:1], delay=0, attempts=1)
+
+    assert result == (mock_frames[0], ready)
+    mock_frames[0].evaluate.assert_called_once()
+    assert mock_frames[0].evaluate.call_args.args[1] == [hidden, ready, other]
+    ready.is_visible.assert_not_called()
+    hidden.dispose.assert_called_once()
+    other.dispose.assert_called_once()
+    assert metrics.round_trips == 3  # the probe and two disposals
+
+    geometry = take_geometry(ready)
+    assert geometry.clickable is True and geometry.center == {'x': 12, 'y': 12}
+
+
+@pytest.mark.asyncio
+async def test_get_ready_checkbox_invisible(mock_frames, mock_checkbox):
     """ Test get_ready_checkbox when checkbox is found but not visible """
+    for frame in mock_frames:
+        frame.evaluate.side_effect = probe_checkboxes(visible=False)
+
     with patch('camoufox_captcha.cloudflare.utils.dom_helpers.search_shadow_root_elements',
-               AsyncMock(return_value=[mock_invisible_checkbox])):
+               AsyncMock(return_value=[mock_checkbox])):
         result = await get_ready_checkbox(mock_frames, delay=0, attempts=1)
 
         assert result is None
@@ -162,17 +197,190 @@ async def test_get_ready_checkbox_negative_attempts(mock_frames, mock_checkbox):
 
 
 @pytest.mark.asyncio
-async def test_get_ready_checkbox_outer_exception(mock_frames, caplog):
-    """ Test get_ready_checkbox when checkbox.is_visible() raises an exception """
-    # checkbox that raises an exception on is_visible
-    error_checkbox = AsyncMock(spec=ElementHandle)
-    error_checkbox.is_visible = AsyncMock(side_effect=Exception("Visibility error"))
+async def test_get_ready_checkbox_probe_exception(mock_frames, caplog):
+    """ Test that a failing geometry probe releases the candidates and waits before the next attempt """
+    for frame in mock_frames:
+        frame.evaluate.side_effect = Exception("Visibility error")
+    checkbox = AsyncMock(spec=ElementHandle)
+    sleep_mock = AsyncMock()
 
     with patch('camoufox_captcha.cloudflare.utils.dom_helpers.search_shadow_root_elements',
-               AsyncMock(return_value=[error_checkbox])):
-        with patch('camoufox_captcha.cloudflare.utils.dom_helpers.asyncio.sleep', AsyncMock()):
+               AsyncMock(return_value=[checkbox])):
+        with patch('camoufox_captcha.cloudflare.utils.dom_helpers.asyncio.sleep', sleep_mock):
             with caplog.at_level(logging.ERROR):
-                result = await get_ready_checkbox(mock_frames, delay=0, attempts=2)
+                result = await get_ready_checkbox(mock_frames, delay=1, attempts=2)
 
                 assert result is None
-                assert "Error while waiting for checkbox: Visibility error" in caplog.text
+                assert "Error checking checkboxes in iframe: Visibility error" in caplog.text
+                assert checkbox.dispose.call_count == 4  # every candidate of both attempts in both frames
+                assert sleep_mock.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_get_ready_checkbox_observe_mode(mock_detached_frame, mock_frames, mock_checkbox):
+    """ Test get_ready_checkbox in observe mode waits in all non-detached frames with the overall timeout """
+    frames = [mock_detached_frame] + mock_frames
+
+    async def mock_wait(frame, selector, timeout):
+        return mock_checkbox if frame is mock_frames[1] else None
+
+    wait_mock = AsyncMock(side_effect=mock_wait)
+    with patch('camoufox_captcha.cloudflare.utils.dom_helpers.wait_for_shadow_root_element', wait_mock):
+        result = await get_ready_checkbox(frames, delay=2, attempts=3, wait_mode='observe')
+
+        assert result == (mock_frames[1], mock_checkbox)
+        assert all(call.kwargs['timeout'] == 6 for call in wait_mock.call_args_list)
+        assert mock_detached_frame not in [call.args[0] for call in wait_mock.call_args_list]
+
+
+@pytest.mark.asyncio
+async def test_get_ready_checkbox_observe_mode_timeout(mock_frames, caplog):
+    """ Test get_ready_checkbox in observe mode when no checkbox appears or observing fails """
+    async def mock_wait(frame, selector, timeout):
+        if frame is mock_frames[0]:
+            raise Exception("Observer error")
+        return None
+
+    with patch('camoufox_captcha.cloudflare.utils.dom_helpers.wait_for_shadow_root_element',
+               AsyncMock(side_effect=mock_wait)):
+        with caplog.at_level(logging.ERROR):
+            result = await get_ready_checkbox(mock_frames, delay=1, attempts=1, wait_mode='observe')
+
+            assert result is None
+            assert "Error observing checkboxes in iframe: Observer error" in caplog.text
+            assert "Timed out while waiting for Cloudflare checkbox input" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_get_ready_checkbox_first_ready_iframe_wins(mock_frames, mock_checkbox):
+    """ Test get_ready_checkbox searches iframes concurrently and does not wait for slow iframes """
+    slow_search_cancelled = False
+
+    async def mock_search(frame, *args, **kwargs):
+        nonlocal slow_search_cancelled
+        if frame is mock_frames[0]:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                slow_search_cancelled = True
+                raise
+        return [mock_checkbox]
+
+    with patch('camoufox_captcha.cloudflare.utils.dom_helpers.search_shadow_root_elements',
+               AsyncMock(side_effect=mock_search)):
+        result = await asyncio.wait_for(get_ready_checkbox(mock_frames, delay=0, attempts=1), timeout=1)
+        await asyncio.sleep(0)
+
+        assert result == (mock_frames[1], mock_checkbox)
+        assert slow_search_cancelled is True
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('wait_mode', ['poll', 'locator'])
+async def test_get_ready_checkbox_releases_losing_checkboxes(mock_frames, wait_mode):
+    """ Test that a checkbox found ready in the same round as the winner has its handle disposed """
+    checkboxes = {frame: AsyncMock(spec=ElementHandle) for frame in mock_frames}
+    for frame, checkbox in checkboxes.items():
+        mock_locator(frame).element_handle.return_value = checkbox
+
+    with patch('camoufox_captcha.cloudflare.utils.dom_helpers.search_shadow_root_elements',
+               AsyncMock(side_effect=lambda frame, *args, **kwargs: [checkboxes[frame]])):
+        result = await get_ready_checkbox(mock_frames, delay=0, attempts=1, wait_mode=wait_mode)
+
+    winner = result[1]
+    losers = [checkbox for checkbox in checkboxes.values() if checkbox is not winner]
+    winner.dispose.assert_not_called()
+    assert [loser.dispose.await_count for loser in losers] == [1]
+
+
+@pytest.mark.asyncio
+async def test_get_ready_checkbox_deadline(mock_frames):
+    """ Test get_ready_checkbox shrinks its waits to the deadline and stops once it is used up """
+    deadline = MagicMock(spec=Deadline)
+    deadline.expired = True
+    deadline.clamp.return_value = 0.5
+    sleep_mock = AsyncMock()
+
+    with patch('camoufox_captcha.cloudflare.utils.dom_helpers.search_shadow_root_elements',
+               AsyncMock(return_value=[])) as search_mock, \
+            patch('camoufox_captcha.cloudflare.utils.dom_helpers.asyncio.sleep', sleep_mock):
+        result = await get_ready_checkbox(mock_frames, delay=6, attempts=10, deadline=deadline)
+
+        assert result is None
+        assert search_mock.call_count == len(mock_frames)  # a single attempt
+        sleep_mock.assert_called_once_with(0.5)
+
+
+@pytest.mark.asyncio
+async def test_get_ready_checkbox_observe_mode_deadline(mock_frames):
+    """ Test get_ready_checkbox in observe mode uses the remaining budget as the timeout """
+    deadline = MagicMock(spec=Deadline)
+    deadline.clamp.return_value = 2
+
+    wait_mock = AsyncMock(return_value=None)
+    with patch('camoufox_captcha.cloudflare.utils.dom_helpers.wait_for_shadow_root_element', wait_mock):
+        await get_ready_checkbox(mock_frames, delay=6, attempts=10, wait_mode='observe', deadline=deadline)
+
+        deadline.clamp.assert_called_once_with(60)
+        assert all(call.kwargs['timeout'] == 2 for call in wait_mock.call_args_list)
+
+
+@pytest.mark.asyncio
+async def test_get_ready_checkbox_retry_policy(mock_frames):
+    """ Test get_ready_checkbox waits between checks on the retry policy's schedule """
+    sleep_mock = AsyncMock()
+    policy = RetryPolicy(factor=2, max_delay=3)
+
+    with patch('camoufox_captcha.cloudflare.utils.dom_helpers.search_shadow_root_elements',
+               AsyncMock(return_value=[])), \
+            patch('camoufox_captcha.cloudflare.utils.dom_helpers.asyncio.sleep', sleep_mock):
+        result = await get_ready_checkbox(mock_frames, delay=1, attempts=4, retry_policy=policy)
+
+        assert result is None
+        assert [call.args[0] for call in sleep_mock.call_args_list] == [1, 2, 3, 3]
+
+
+def mock_locator(frame, wait_for=None):
+    locator = AsyncMock(spec=Locator)
+    locator.wait_for.side_effect = wait_for
+    frame.locator.return_value.first = locator
+    return locator
+
+
+@pytest.mark.asyncio
+async def test_get_ready_checkbox_locator_mode(mock_frames, mock_checkbox):
+    """ Test get_ready_checkbox in locator mode waits with the shadow selector engine in every iframe """
+    mock_locator(mock_frames[0], wait_for=PlaywrightTimeoutError('Timeout 60000ms exceeded'))
+    locator = mock_locator(mock_frames[1])
+    locator.element_handle.return_value = mock_checkbox
+
+    result = await get_ready_checkbox(mock_frames, delay=6, attempts=10, wait_mode='locator')
+
+    assert result == (mock_frames[1], mock_checkbox)
+    assert mock_frames[1].locator.call_args.args[0] == 'camoufox-shadow=input[type="checkbox"] >> visible=true'
+    locator.wait_for.assert_called_once_with(state='visible', timeout=60000)
+
+
+@pytest.mark.asyncio
+async def test_get_ready_checkbox_locator_mode_timeout(mock_frames):
+    """ Test get_ready_checkbox in locator mode when no checkbox becomes visible """
+    for frame in mock_frames:
+        mock_locator(frame, wait_for=PlaywrightTimeoutError('Timeout exceeded'))
+
+    assert await get_ready_checkbox(mock_frames, delay=1, attempts=2, wait_mode='locator') is None
+
+
+@pytest.mark.asyncio
+async def test_get_ready_checkbox_locator_mode_without_engine(mock_frames, mock_checkbox, caplog):
+    """ Test get_ready_checkbox falls back to observing when the selector engine isn't registered """
+    for frame in mock_frames:
+        mock_locator(frame, wait_for=Exception('Unknown engine "camoufox-shadow" while parsing selector'))
+
+    wait_mock = AsyncMock(return_value=mock_checkbox)
+    with patch('camoufox_captcha.cloudflare.utils.dom_helpers.wait_for_shadow_root_element', wait_mock), \
+            caplog.at_level(logging.WARNING):
+        result = await get_ready_checkbox(mock_frames, delay=1, attempts=2, wait_mode='locator')
+
+    assert result == (mock_frames[0], mock_checkbox)
+    assert 'Locator wait unavailable' in caplog.text
+    assert wait_mock.call_args.kwargs['timeout'] == 2
@@ -0,0 +1,137 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from playwright.async_api import Page, Frame, Response, Request, ElementHandle
+
+from camoufox_captcha.cloudflare.navigation import goto_and_solve, solve_challenge_response, \
+    wait_for_challenge_iframe, ChallengeWatcher, CF_CHALLENGE_IFRAME_SELECTOR
+from camoufox_captcha.common.metrics import SolveResult
+
+
+@pytest.fixture
+def mock_page():
+    page = AsyncMock(spec=Page)
+    page.main_frame = MagicMock(spec=Frame)
+    page.on = MagicMock()
+    page.remove_listener = MagicMock()
+    return page
+
+
+def make_response(page, status=200, headers=None, navigation=True, frame=None):
+    response = MagicMock(spec=Response)
+    response.status = status
+    response.headers = headers or {}
+    response.frame = frame or page.main_frame
+    response.request = MagicMock(spec=Request)
+    response.request.is_navigation_request.return_value = navigation
+    return response
+
+
+CHALLENGE_HEADERS = {'cf-mitigated': 'challenge', 'server': 'cloudflare'}
+
+
+@pytest.mark.asyncio
+async def test_goto_and_solve_no_challenge(mock_page):
+    """ Test that a non-challenge response returns right away without DOM probing """
+    mock_page.goto.return_value = make_response(mock_page)
+
+    with patch('camoufox_captcha.cloudflare.navigation.solve_challenge_response', AsyncMock()) as solve_mock:
+        result = await goto_and_solve(mock_page, 'https://example.com', return_result=True)
+
+        assert isinstance(result, SolveResult)
+        assert result.success is True
+        assert result.decided_by == 'no_challenge'
+        solve_mock.assert_not_called()
+        mock_page.evaluate.assert_not_called()
+        mock_page.goto.assert_called_once_with('https://example.com', wait_until='domcontentloaded')
+
+
+@pytest.mark.asyncio
+async def test_goto_and_solve_challenge(mock_page):
+    """ Test that a challenge response starts solving immediately """
+    mock_page.goto.return_value = make_response(mock_page, 403, CHALLENGE_HEADERS)
+
+    with patch('camoufox_captcha.cloudflare.navigation.solve_challenge_response',
+               AsyncMock(return_value=True)) as solve_mock:
+        result = await goto_and_solve(mock_page, 'https://example.com', goto_timeout=30,
+                                      expected_content_selector='#content')
+
+        assert result is True
+        solve_mock.assert_called_once_with(mock_page, expected_content_selector='#content')
+        mock_page.goto.assert_called_once_with('https://example.com', wait_until='domcontentloaded', timeout=30000)
+
+
+@pytest.mark.asyncio
+async def test_solve_challenge_response_waits_for_iframe(mock_page):
+    """ Test that solving starts once the challenge iframe is attached """
+    with patch('camoufox_captcha.cloudflare.navigation.wait_for_challenge_iframe',
+               AsyncMock(return_value=True)) as wait_mock, \
+            patch('camoufox_captcha.cloudflare.navigation.solve_cloudflare_by_click',
+                  AsyncMock(return_value=True)) as solve_mock:
+        assert await solve_challenge_response(mock_page, iframe_timeout=5, solve_attempts=2) is True
+
+        wait_mock.assert_called_once_with(mock_page, 5)
+        solve_mock.assert_called_once_with(mock_page, challenge_type='interstitial', timeout=None, solve_attempts=2)
+
+
+@pytest.mark.asyncio
+async def test_wait_for_challenge_iframe(mock_page):
+    """ Test waiting for the challenge iframe and disposing its handle """
+    iframe_element = AsyncMock(spec=ElementHandle)
+
+    with patch('camoufox_captcha.cloudflare.navigation.wait_for_shadow_root_element',
+               AsyncMock(return_value=iframe_element)) as wait_mock:
+        assert await wait_for_challenge_iframe(mock_page, 3) is True
+
+        wait_mock.assert_called_once_with(mock_page, CF_CHALLENGE_IFRAME_SELECTOR, 3, visible=False)
+        iframe_element.dispose.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_wait_for_challenge_iframe_error(mock_page):
+    """ Test that errors (e.g. navigation while waiting) are treated as a missing iframe """
+    with patch('camoufox_captcha.cloudflare.navigation.wait_for_shadow_root_element',
+               AsyncMock(side_effect=Exception('Execution context was destroyed'))):
+        assert await wait_for_challenge_iframe(mock_page, 3) is False
+
+
+@pytest.mark.asyncio
+async def test_challenge_watcher_solves_challenge_response(mock_page):
+    """ Test that the watcher starts a single solve for challenge responses of the main document """
+    release = asyncio.Event()
+
+    async def solve(*args, **kwargs):
+        await release.wait()
+        return True
+
+    with patch('camoufox_captcha.cloudflare.navigation.solve_challenge_response',
+               AsyncMock(side_effect=solve)) as solve_mock:
+        async with ChallengeWatcher(mock_page, solve_attempts=2) as watcher:
+            mock_page.on.assert_called_once_with('response', watcher._on_response)
+
+            watcher._on_response(make_response(mock_page, 200))
+            watcher._on_response(make_response(mock_page, 403, CHALLENGE_HEADERS, navigation=False))
+            watcher._on_response(make_response(mock_page, 403, CHALLENGE_HEADERS, frame=MagicMock(spec=Frame)))
+            assert watcher.challenge_detected is False
+
+            watcher._on_response(make_response(mock_page, 403, CHALLENGE_HEADERS))
+            watcher._on_response(make_response(mock_page, 403, CHALLENGE_HEADERS))  # reload while solving
+            assert watcher.challenge_detected is True
+
+            release.set()
+            assert await watcher.wait() is True
+
+        solve_mock.assert_called_once_with(mock_page, solve_attempts=2)
+        mock_page.remove_listener.assert_called_once_with('response', watcher._on_response)
+
+
+@pytest.mark.asyncio
+async def test_challenge_watcher_no_challenge(mock_page):
+    """ Test that wait succeeds right away when no challenge response was seen """
+    async with ChallengeWatcher(mock_page, return_result=True) as watcher:
+        watcher._on_response(make_response(mock_page, 200))
+        result = await watcher.wait()
+
+    assert result.success is True
+    assert result.decided_by == 'no_challenge'
@@ -1,9 +1,22 @@
-from unittest.mock import AsyncMock, patch
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-from playwright.async_api import Page, Frame, ElementHandle
+from playwright.async_api import Page, Frame, ElementHandle, Locator
 
 from camoufox_captcha import solve_captcha
+from camoufox_captcha.cloudflare.solve_by_click import wait_for_solved, find_cloudflare_iframes, \
+    solve_cloudflare_widgets, click_checkbox, VERIFY_INITIAL_DELAY, VERIFY_MAX_DELAY, CF_IFRAME_SRC_FILTER
+from camoufox_captcha.cloudflare.utils.detection import ChallengeProbe
+from camoufox_captcha.common.deadline import Deadline
+from camoufox_captcha.common.geometry import ElementGeometry, remember_geometry
+from camoufox_captcha.common.metrics import SolveHooks, SolveResult
+from camoufox_captcha.common.retry import DEFAULT_RETRY_POLICY
+from camoufox_captcha.common.shadow_root import TraversalOptions
+
+
+def make_probe(interstitial=False, turnstile=False, expected_content=False):
+    return ChallengeProbe(interstitial=interstitial, turnstile=turnstile, expected_content=expected_content)
 
 
 @pytest.fixture
@@ -33,10 +46,8 @@ def mock_checkbox():
 @pytest.mark.asyncio
 async def test_solve_by_click_no_challenge_detected(mock_page):
     """ Test solving by click when no Cloudflare challenge is detected """
-    with patch('camoufox_captcha.cloudflare.solve_by_click.detect_cloudflare_challenge',
-               AsyncMock(return_value=False)), \
-            patch('camoufox_captcha.cloudflare.solve_by_click.detect_expected_content',
-                  AsyncMock(return_value=False)):
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               AsyncMock(return_value=make_probe())):
         result = await solve_captcha(mock_page, captcha_type='cloudflare', challenge_type='interstitial')
 
         assert result is True
@@ -45,10 +56,8 @@ async def test_solve_by_click_no_challenge_detected(mock_page):
 @pytest.mark.asyncio
 async def test_solve_by_click_expected_content_already_present(mock_page):
     """ Test solving by click when expected content is already detected """
-    with patch('camoufox_captcha.cloudflare.solve_by_click.detect_cloudflare_challenge',
-               AsyncMock(return_value=True)), \
-            patch('camoufox_captcha.cloudflare.solve_by_click.detect_expected_content',
-                  AsyncMock(return_value=True)):
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               AsyncMock(return_value=make_probe(interstitial=True, expected_content=True))):
         result = await solve_captcha(mock_page, captcha_type='cloudflare', challenge_type='interstitial',
                                      expected_content_selector='.content')
 
@@ -58,10 +67,8 @@ async def test_solve_by_click_expected_content_already_present(mock_page):
 @pytest.mark.asyncio
 async def test_solve_by_click_no_iframes_found(mock_page):
     """ Test solving by click when no Cloudflare iframes are found """
-    with patch('camoufox_captcha.cloudflare.solve_by_click.detect_cloudflare_challenge',
-               AsyncMock(return_value=True)), \
-            patch('camoufox_captcha.cloudflare.solve_by_click.detect_expected_content',
-                  AsyncMock(return_value=False)), \
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               AsyncMock(return_value=make_probe(interstitial=True, turnstile=True))), \
             patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_iframes',
                   AsyncMock(return_value=[])):
         result = await solve_captcha(mock_page, captcha_type='cloudflare', challenge_type='interstitial')
@@ -72,10 +79,9 @@ async def test_solve_by_click_no_iframes_found(mock_page):
 @pytest.mark.asyncio
 async def test_solve_by_click_no_checkbox_found(mock_page, mock_frame):
     """ Test solving by click when no checkbox is found in iframes """
-    with patch('camoufox_captcha.cloudflare.solve_by_click.detect_cloudflare_challenge',
-               AsyncMock(return_value=True)), \
-            patch('camoufox_captcha.cloudflare.solve_by_click.detect_expected_content',
-                  AsyncMock(return_value=False)), \
+    mock_frame.is_detached.return_value = False
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               AsyncMock(return_value=make_probe(interstitial=True, turnstile=True))), \
             patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_iframes',
                   AsyncMock(return_value=[mock_frame])), \
             patch('camoufox_captcha.cloudflare.solve_by_click.get_ready_checkbox',
@@ -88,13 +94,12 @@ async def test_solve_by_click_no_checkbox_found(mock_page, mock_frame):
 @pytest.mark.asyncio
 async def test_solve_by_click_interstitial_success(mock_page, mock_frame, mock_checkbox):
     """ Test successful solving of interstitial challenge """
-    detect_challenge_mock = AsyncMock()
-    detect_challenge_mock.side_effect = [True, False]  # challenge present, then absent after solving
+    probe_mock = AsyncMock()
+    probe_mock.side_effect = [make_probe(interstitial=True, turnstile=True),
+                              make_probe()]  # challenge present, then absent after solving
 
-    with patch('camoufox_captcha.cloudflare.solve_by_click.detect_cloudflare_challenge',
-               detect_challenge_mock), \
-            patch('camoufox_captcha.cloudflare.solve_by_click.detect_expected_content',
-                  AsyncMock(return_value=False)), \
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               probe_mock), \
             patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_iframes',
                   AsyncMock(return_value=[mock_frame])), \
             patch('camoufox_captcha.cloudflare.solve_by_click.get_ready_checkbox',
@@ -111,10 +116,8 @@ async def test_solve_by_click_turnstile_success(mock_page, mock_frame, mock_chec
     """ Test successful solving of turnstile challenge """
     success_element = AsyncMock()
 
-    with patch('camoufox_captcha.cloudflare.solve_by_click.detect_cloudflare_challenge',
-               AsyncMock(return_value=True)), \
-            patch('camoufox_captcha.cloudflare.solve_by_click.detect_expected_content',
-                  AsyncMock(return_value=False)), \
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               AsyncMock(return_value=make_probe(interstitial=True, turnstile=True))), \
             patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_iframes',
                   AsyncMock(return_value=[mock_frame])), \
             patch('camoufox_captcha.cloudflare.solve_by_click.get_ready_checkbox',
@@ -131,14 +134,14 @@ async def test_solve_by_click_turnstile_success(mock_page, mock_frame, mock_chec
 @pytest.mark.asyncio
 async def test_solve_by_click_click_exception(mock_page, mock_frame, mock_checkbox):
     """ Test solve by click when checkbox click raises an exception """
+    mock_frame.is_detached.return_value = False
     mock_checkbox.click.side_effect = Exception("Click error")
-    detect_challenge_mock = AsyncMock()
-    detect_challenge_mock.side_effect = [True, False]  # challenge present, then absent after solving
+    probe_mock = AsyncMock()
+    probe_mock.side_effect = [make_probe(interstitial=True, turnstile=True),
+                              make_probe()]  # challenge present, then absent after solving
 
-    with patch('camoufox_captcha.cloudflare.solve_by_click.detect_cloudflare_challenge',
-               detect_challenge_mock), \
-            patch('camoufox_captcha.cloudflare.solve_by_click.detect_expected_content',
-                  AsyncMock(return_value=False)), \
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               probe_mock), \
             patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_iframes',
                   AsyncMock(return_value=[mock_frame])), \
             patch('camoufox_captcha.cloudflare.solve_by_click.get_ready_checkbox',
@@ -152,15 +155,13 @@ async def test_solve_by_click_click_exception(mock_page, mock_frame, mock_checkb
 @pytest.mark.asyncio
 async def test_solve_by_click_max_attempts_reached(mock_page, mock_frame, mock_checkbox):
     """ Test solving by click when max attempts are reached without success """
-    detect_challenge_mock = AsyncMock(return_value=True)  # challenge always present
-    detect_content_mock = AsyncMock(return_value=False)  # content never appears
+    # challenge always present, content never appears
+    probe_mock = AsyncMock(return_value=make_probe(interstitial=True, turnstile=True))
 
     solve_attempts = 3
 
-    with patch('camoufox_captcha.cloudflare.solve_by_click.detect_cloudflare_challenge',
-               detect_challenge_mock), \
-            patch('camoufox_captcha.cloudflare.solve_by_click.detect_expected_content',
-                  detect_content_mock), \
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               probe_mock), \
             patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_iframes',
                   AsyncMock(return_value=[mock_frame])), \
             patch('camoufox_captcha.cloudflare.solve_by_click.get_ready_checkbox',
@@ -172,5 +173,566 @@ async def test_solve_by_click_max_attempts_reached(mock_page, mock_frame, mock_c
                                      solve_attempts=solve_attempts)
 
         assert result is False
-        assert detect_challenge_mock.call_count > 1
+        assert probe_mock.call_count > 1
         assert mock_checkbox.click.call_count == solve_attempts
+
+
+@pytest.mark.asyncio
+async def test_wait_for_solved_returns_early(mock_page, mock_frame):
+    """ Test wait_for_solved returns as soon as success is detected instead of sleeping the full delay """
+    sleep_mock = AsyncMock()
+
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               AsyncMock(side_effect=[make_probe(interstitial=True, turnstile=True), make_probe()])), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.asyncio.sleep', sleep_mock):
+        result = await wait_for_solved(mock_page, mock_frame, 'interstitial', timeout=6)
+
+        assert result == 'challenge_gone'
+        slept = [call.args[0] for call in sleep_mock.call_args_list]
+        assert slept == [VERIFY_INITIAL_DELAY, VERIFY_INITIAL_DELAY * 2]
+
+
+@pytest.mark.asyncio
+async def test_wait_for_solved_timeout_is_upper_bound(mock_page, mock_frame):
+    """ Test wait_for_solved never sleeps longer than the timeout in total and tolerates check errors """
+    sleep_mock = AsyncMock()
+
+    with patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_elements',
+               AsyncMock(side_effect=[Exception("Execution context was destroyed"), [], [], [], []])), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.detect_expected_content',
+                  AsyncMock(return_value=False)), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.asyncio.sleep', sleep_mock):
+        result = await wait_for_solved(mock_page, mock_frame, 'turnstile', timeout=2.5)
+
+        assert result is None
+        slept = [call.args[0] for call in sleep_mock.call_args_list]
+        assert sum(slept) == 2.5
+        assert max(slept) <= VERIFY_MAX_DELAY
+
+
+@pytest.mark.asyncio
+async def test_wait_for_solved_locator_mode(mock_page, mock_frame):
+    """ Test wait_for_solved in locator mode resolves when the turnstile success element is attached """
+    locator = AsyncMock(spec=Locator)
+    mock_frame.locator.return_value.first = locator
+
+    async def poll_solved(*args):
+        await asyncio.sleep(10)
+
+    with patch('camoufox_captcha.cloudflare.solve_by_click._poll_solved', poll_solved):
+        result = await wait_for_solved(mock_page, mock_frame, 'turnstile', timeout=3, wait_mode='locator')
+
+    assert result == 'turnstile_success'
+    assert mock_frame.locator.call_args.args[0] == 'camoufox-shadow=div[id="success"]'
+    locator.wait_for.assert_called_once_with(state='attached', timeout=3000)
+
+
+@pytest.mark.asyncio
+async def test_wait_for_solved_expected_content(mock_page, mock_frame):
+    """ Test wait_for_solved succeeds when the expected content appears """
+    with patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_elements',
+               AsyncMock(return_value=[])), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.detect_expected_content',
+                  AsyncMock(return_value=True)), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.asyncio.sleep', AsyncMock()):
+        result = await wait_for_solved(mock_page, mock_frame, 'turnstile', '#content', timeout=6)
+
+        assert result == 'expected_content'
+
+
+@pytest.mark.asyncio
+async def test_solve_by_click_return_result(mock_page, mock_frame, mock_checkbox):
+    """ Test the opt-in structured result with phases, attempts, deciding branch and hooks """
+    hooks = MagicMock(spec=SolveHooks)
+
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               AsyncMock(return_value=make_probe(turnstile=True))), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_iframes',
+                  AsyncMock(return_value=[mock_frame])), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.get_ready_checkbox',
+                  AsyncMock(return_value=(mock_frame, mock_checkbox))), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_elements',
+                  AsyncMock(side_effect=[[], [AsyncMock()]])), \
+            patch('asyncio.sleep', AsyncMock()):
+        result = await solve_captcha(mock_page, captcha_type='cloudflare', challenge_type='turnstile',
+                                     return_result=True, hooks=hooks)
+
+        assert isinstance(result, SolveResult)
+        assert result.success is True and bool(result) is True
+        assert result.decided_by == 'turnstile_success'
+        assert result.attempts == 1
+        assert result.round_trips == 2  # the click and the checkbox dispose, the other calls are mocked
+        assert set(result.phase_durations) == {'detection', 'iframe_search', 'checkbox_wait', 'click',
+                                               'verification'}
+        assert hooks.on_phase.call_count == 5
+        hooks.on_result.assert_called_once_with(result)
+
+
+@pytest.mark.asyncio
+async def test_solve_by_click_return_result_max_attempts(mock_page):
+    """ Test the structured result when solving gives up """
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               AsyncMock(return_value=make_probe(interstitial=True))), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_iframes',
+                  AsyncMock(return_value=[])), \
+            patch('asyncio.sleep', AsyncMock()):
+        result = await solve_captcha(mock_page, solve_attempts=2, return_result=True)
+
+        assert result.success is False
+        assert result.decided_by == 'max_attempts'
+        assert result.attempts == 2
+        assert 'retry_delay' in result.phase_durations
+
+
+@pytest.mark.asyncio
+async def test_solve_by_click_timeout_cuts_off_hanging_call(mock_page):
+    """ Test that the time budget finishes the solve cleanly with a timed-out result """
+    async def hanging_probe(*args, **kwargs):
+        await asyncio.Event().wait()
+
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               AsyncMock(side_effect=hanging_probe)):
+        result = await solve_captcha(mock_page, timeout=0.05, return_result=True)
+
+        assert result.success is False
+        assert result.timed_out is True
+
+
+@pytest.mark.asyncio
+async def test_solve_by_click_timeout_stops_retrying(mock_page, mock_frame, mock_checkbox):
+    """ Test that retries stop once the budget is used up and inner waits are clamped to it """
+    deadline = MagicMock(spec=Deadline)
+    deadline.remaining = 10
+    deadline.expired = True  # used up by the end of the first attempt
+    deadline.clamp.side_effect = lambda delay: min(delay, 4)
+    wait_mock = AsyncMock(return_value=None)
+    checkbox_mock = AsyncMock(return_value=(mock_frame, mock_checkbox))
+
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               AsyncMock(return_value=make_probe(interstitial=True))), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_iframes',
+                  AsyncMock(return_value=[mock_frame])), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.get_ready_checkbox', checkbox_mock), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.wait_for_solved', wait_mock), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.Deadline', MagicMock(return_value=deadline)):
+        result = await solve_captcha(mock_page, timeout=10, solve_attempts=3, solve_click_delay=6,
+                                     return_result=True)
+
+        assert result.timed_out is True
+        assert result.attempts == 1
+        assert wait_mock.call_args.kwargs['timeout'] == 4
+        assert checkbox_mock.call_args.kwargs['deadline'] is deadline
+
+
+@pytest.mark.asyncio
+async def test_find_cloudflare_iframes_rooted_at_element(mock_element, mock_frame):
+    """ Test that iframe search for an ElementHandle is rooted at it and falls back to the whole document """
+    search_mock = AsyncMock(side_effect=[[], [mock_frame]])
+
+    with patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_iframes', search_mock):
+        frames = await find_cloudflare_iframes(mock_element)
+
+        assert frames == [mock_frame]
+        assert search_mock.call_args_list[0].args == (mock_element, CF_IFRAME_SRC_FILTER,
+                                                      TraversalOptions(root=mock_element))
+        assert search_mock.call_args_list[1].args == (mock_element, CF_IFRAME_SRC_FILTER)
+
+
+@pytest.mark.asyncio
+async def test_find_cloudflare_iframes_frame_tree_first(mock_page, mock_element, mock_frame):
+    """ Test that frames found in the frame tree skip the DOM search """
+    tree_mock = AsyncMock(return_value=[mock_frame])
+    dom_mock = AsyncMock(return_value=[])
+
+    with patch('camoufox_captcha.cloudflare.solve_by_click.search_frame_tree', tree_mock), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_iframes', dom_mock):
+        assert await find_cloudflare_iframes(mock_page) == [mock_frame]
+        tree_mock.assert_called_once_with(mock_page, CF_IFRAME_SRC_FILTER)
+
+        tree_mock.reset_mock()
+        assert await find_cloudflare_iframes(mock_element) == [mock_frame]
+        tree_mock.assert_called_once_with(mock_element, CF_IFRAME_SRC_FILTER, root=mock_element)
+
+        dom_mock.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_find_cloudflare_iframes_discovery_modes(mock_page, mock_frame):
+    """ Test that "frame_tree" never falls back to the DOM search and "dom" never reads the frame tree """
+    tree_mock = AsyncMock(return_value=[])
+    dom_mock = AsyncMock(return_value=[mock_frame])
+
+    with patch('camoufox_captcha.cloudflare.solve_by_click.search_frame_tree', tree_mock), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_iframes', dom_mock):
+        assert await find_cloudflare_iframes(mock_page, 'frame_tree') == []
+        dom_mock.assert_not_called()
+
+        tree_mock.reset_mock()
+        assert await find_cloudflare_iframes(mock_page, 'dom') == [mock_frame]
+        tree_mock.assert_not_called()
+
+        assert await find_cloudflare_iframes(mock_page) == [mock_frame]  # auto falls back
+        tree_mock.assert_called_once()
+
+        with pytest.raises(ValueError):
+            await find_cloudflare_iframes(mock_page, 'xpath')
+
+
+@pytest.mark.asyncio
+async def test_find_cloudflare_iframes_page(mock_page, mock_frame):
+    """ Test that iframe search for a Page scans the whole document once """
+    search_mock = AsyncMock(return_value=[mock_frame])
+
+    with patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_iframes', search_mock):
+        assert await find_cloudflare_iframes(mock_page) == [mock_frame]
+        search_mock.assert_called_once_with(mock_page, CF_IFRAME_SRC_FILTER)
+
+
+@pytest.mark.asyncio
+async def test_solve_by_click_auto_detects_turnstile(mock_page, mock_frame, mock_checkbox, mock_element):
+    """ Test that auto mode classifies a turnstile page, locates its container and verifies as turnstile """
+    search_iframes_mock = AsyncMock(return_value=[mock_frame])
+
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               AsyncMock(return_value=make_probe(turnstile=True))), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.locate_turnstile_container',
+                  AsyncMock(return_value=mock_element)) as locate_mock, \
+            patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_iframes', search_iframes_mock), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.get_ready_checkbox',
+                  AsyncMock(return_value=(mock_frame, mock_checkbox))), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_elements',
+                  AsyncMock(return_value=[AsyncMock()])), \
+            patch('asyncio.sleep', AsyncMock()):
+        result = await solve_captcha(mock_page, captcha_type='cloudflare', challenge_type='auto',
+                                     return_result=True)
+
+        assert result.success is True
+        assert result.decided_by == 'turnstile_success'
+        assert result.challenge_type == 'turnstile'
+        locate_mock.assert_called_once_with(mock_page)
+        # iframe search is rooted at the located container
+        assert search_iframes_mock.call_args_list[0].args[0] is mock_element
+        # the container handle is released once the solve is over
+        mock_element.dispose.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_solve_by_click_auto_detects_interstitial(mock_page, mock_frame, mock_checkbox):
+    """ Test that auto mode treats pages with interstitial indicators as interstitial """
+    probe_mock = AsyncMock(side_effect=[make_probe(interstitial=True, turnstile=True), make_probe()])
+
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge', probe_mock), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.locate_turnstile_container',
+                  AsyncMock()) as locate_mock, \
+            patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_iframes',
+                  AsyncMock(return_value=[mock_frame])), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.get_ready_checkbox',
+                  AsyncMock(return_value=(mock_frame, mock_checkbox))), \
+            patch('asyncio.sleep', AsyncMock()):
+        result = await solve_captcha(mock_page, captcha_type='cloudflare', challenge_type='auto',
+                                     return_result=True)
+
+        assert result.success is True
+        assert result.decided_by == 'challenge_gone'
+        assert result.challenge_type == 'interstitial'
+        locate_mock.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_solve_by_click_auto_no_challenge(mock_page):
+    """ Test that auto mode succeeds right away when no challenge of any type is detected """
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               AsyncMock(return_value=make_probe())):
+        result = await solve_captcha(mock_page, challenge_type='auto', return_result=True)
+
+        assert result.success is True
+        assert result.decided_by == 'no_challenge'
+        assert result.challenge_type is None
+
+
+@pytest.mark.asyncio
+async def test_solve_by_click_retry_resumes_from_checkpoint(mock_page, mock_frame, mock_checkbox):
+    """ Test that a retry with the iframe still attached skips the iframe search and reuses the checkbox """
+    mock_frame.is_detached.return_value = False
+    mock_checkbox.is_visible.return_value = True
+    probe_mock = AsyncMock(return_value=make_probe(turnstile=True))
+    search_mock = AsyncMock(return_value=[mock_frame])
+    checkbox_mock = AsyncMock(return_value=(mock_frame, mock_checkbox))
+    check_mock = AsyncMock(side_effect=[None, 'turnstile_success'])
+
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge', probe_mock), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_iframes', search_mock), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.get_ready_checkbox', checkbox_mock), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.wait_for_solved', AsyncMock(return_value=None)), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.check_solved', check_mock), \
+            patch('asyncio.sleep', AsyncMock()):
+        result = await solve_captcha(mock_page, challenge_type='turnstile', solve_attempts=3, return_result=True)
+
+        assert result.success is True
+        assert result.decided_by == 'turnstile_success'
+        assert result.attempts == 3
+        assert probe_mock.call_count == 3  # detection runs on every attempt
+        search_mock.assert_called_once()
+        checkbox_mock.assert_called_once()
+        assert mock_checkbox.click.call_count == 2
+        assert check_mock.call_args.args == (mock_page, mock_frame, 'turnstile')
+
+
+@pytest.mark.asyncio
+async def test_solve_by_click_resumed_retry_detects_expected_content(mock_page, mock_frame):
+    """ Test that a resumed retry without a click still detects content that appeared during the retry delay """
+    mock_frame.is_detached.return_value = False
+    probe_mock = AsyncMock(side_effect=[make_probe(turnstile=True),
+                                        make_probe(turnstile=True, expected_content=True)])
+    search_mock = AsyncMock(return_value=[mock_frame])
+
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge', probe_mock), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_iframes', search_mock), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.get_ready_checkbox', AsyncMock(return_value=None)), \
+            patch('asyncio.sleep', AsyncMock()):
+        result = await solve_captcha(mock_page, challenge_type='turnstile', expected_content_selector='.content',
+                                     solve_attempts=3, return_result=True)
+
+        assert result.success is True
+        assert result.decided_by == 'expected_content'
+        assert probe_mock.call_count == 2
+        search_mock.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_solve_by_click_retry_refinds_hidden_checkbox(mock_page, mock_frame, mock_checkbox):
+    """ Test that a retry searches the known iframes again when the previous checkbox is gone """
+    mock_frame.is_detached.return_value = False
+    mock_checkbox.is_visible.return_value = False
+    new_checkbox = AsyncMock(spec=ElementHandle)
+    search_mock = AsyncMock(return_value=[mock_frame])
+    checkbox_mock = AsyncMock(side_effect=[(mock_frame, mock_checkbox), (mock_frame, new_checkbox)])
+
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               AsyncMock(return_value=make_probe(interstitial=True, turnstile=True))), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_iframes', search_mock), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.get_ready_checkbox', checkbox_mock), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.wait_for_solved',
+                  AsyncMock(side_effect=[None, 'challenge_gone'])), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.check_solved', AsyncMock(return_value=None)), \
+            patch('asyncio.sleep', AsyncMock()):
+        assert await solve_captcha(mock_page, solve_attempts=2) is True
+
+        search_mock.assert_called_once()
+        assert checkbox_mock.call_args.args[0] == [mock_frame]
+        new_checkbox.click.assert_called_once()
+        # both checkbox handles are released at the end of the solve
+        mock_checkbox.dispose.assert_called_once()
+        new_checkbox.dispose.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_solve_by_click_retry_rediscovers_detached_frames(mock_page, mock_frame, mock_checkbox):
+    """ Test that a retry starts from detection again once the known iframes have detached """
+    mock_frame.is_detached.return_value = True
+    probe_mock = AsyncMock(return_value=make_probe(interstitial=True, turnstile=True))
+    search_mock = AsyncMock(return_value=[mock_frame])
+
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge', probe_mock), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_iframes', search_mock), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.get_ready_checkbox',
+                  AsyncMock(return_value=(mock_frame, mock_checkbox))), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.wait_for_solved', AsyncMock(return_value=None)), \
+            patch('asyncio.sleep', AsyncMock()):
+        assert await solve_captcha(mock_page, solve_attempts=2) is False
+
+        assert probe_mock.call_count == 2
+        assert search_mock.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_solve_widgets_concurrently(mock_page):
+    """ Test that all widgets are discovered once and solved concurrently with per-widget outcomes """
+    frames = [AsyncMock(spec=Frame) for _ in range(3)]
+    checkboxes = {frame: (frame, AsyncMock(spec=ElementHandle)) for frame in frames}
+    waiting = []
+    release = asyncio.Event()
+
+    async def ready_checkbox(iframes, **kwargs):
+        # every widget waits for its checkbox at the same time
+        waiting.append(iframes[0])
+        if len(waiting) == len(frames):
+            release.set()
+        await release.wait()
+        return checkboxes[iframes[0]]
+
+    async def solved(queryable, iframe, challenge_type, *args, **kwargs):
+        return 'turnstile_success' if iframe is not frames[1] else None
+
+    iframes_mock = AsyncMock(return_value=frames)
+
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               AsyncMock(return_value=make_probe(turnstile=True))), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.find_cloudflare_iframes', iframes_mock), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.get_ready_checkbox',
+                  AsyncMock(side_effect=ready_checkbox)), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.wait_for_solved', AsyncMock(side_effect=solved)), \
+            patch('asyncio.sleep', AsyncMock()):
+        result = await solve_captcha(mock_page, captcha_type='cloudflare', challenge_type='turnstile',
+                                     method='click_all', solve_attempts=2, return_result=True)
+
+    iframes_mock.assert_called_once()
+    assert set(waiting) == set(frames)
+    assert result.success is False and result.decided_by == 'widgets_failed'
+    assert [widget.index for widget in result.widgets] == [0, 1, 2]
+    assert [widget.success for widget in result.widgets] == [True, False, True]
+    assert [widget.decided_by for widget in result.widgets] == ['turnstile_success', 'max_attempts',
+                                                                'turnstile_success']
+    assert [widget.attempts for widget in result.widgets] == [1, 2, 1]
+    assert result.attempts == 2
+    for frame, (_, checkbox) in checkboxes.items():
+        assert checkbox.click.call_count == (2 if frame is frames[1] else 1)
+
+
+@pytest.mark.asyncio
+async def test_solve_widgets_all_solved(mock_page, mock_frame, mock_checkbox):
+    """ Test that the solve succeeds once every widget is verified """
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               AsyncMock(return_value=make_probe(turnstile=True))), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.find_cloudflare_iframes',
+                  AsyncMock(return_value=[mock_frame])), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.get_ready_checkbox',
+                  AsyncMock(return_value=(mock_frame, mock_checkbox))), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.search_shadow_root_elements',
+                  AsyncMock(return_value=[AsyncMock()])), \
+            patch('asyncio.sleep', AsyncMock()):
+        result = await solve_captcha(mock_page, captcha_type='cloudflare', challenge_type='turnstile',
+                                     method='click_all')
+
+    assert result is True
+    mock_checkbox.click.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_solve_widgets_isolates_failures(mock_page, mock_checkbox):
+    """ Test that a widget failing with an error or without a checkbox doesn't fail the others """
+    frames = [AsyncMock(spec=Frame) for _ in range(3)]
+
+    async def ready_checkbox(iframes, **kwargs):
+        if iframes[0] is frames[0]:
+            raise Exception('Frame was detached')
+        return None if iframes[0] is frames[1] else (iframes[0], mock_checkbox)
+
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               AsyncMock(return_value=make_probe(turnstile=True))), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.find_cloudflare_iframes',
+                  AsyncMock(return_value=frames)), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.get_ready_checkbox',
+                  AsyncMock(side_effect=ready_checkbox)), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.wait_for_solved',
+                  AsyncMock(return_value='turnstile_success')), \
+            patch('asyncio.sleep', AsyncMock()):
+        result = await solve_captcha(mock_page, captcha_type='cloudflare', challenge_type='turnstile',
+                                     method='click_all', solve_attempts=1, return_result=True)
+
+    assert [widget.decided_by for widget in result.widgets] == ['error', 'checkbox_not_found',
+                                                                'turnstile_success']
+    assert result.widgets[2].success is True
+
+
+@pytest.mark.asyncio
+async def test_solve_widgets_accepts_click_options(mock_page, mock_frame, mock_checkbox):
+    """ Test that the click solver options are accepted and the expected content is checked """
+    probe_mock = AsyncMock(return_value=make_probe(expected_content=True))
+
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge', probe_mock):
+        result = await solve_captcha(mock_page, captcha_type='cloudflare', challenge_type='turnstile',
+                                     method='click_all', expected_content_selector='.content',
+                                     checkbox_click_attempts=2, return_result=True)
+
+    assert result.success is True and result.decided_by == 'expected_content'
+    probe_mock.assert_called_once_with(mock_page, '.content')
+
+    solved_mock = AsyncMock(return_value='expected_content')
+
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               AsyncMock(return_value=make_probe(turnstile=True))), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.find_cloudflare_iframes',
+                  AsyncMock(return_value=[mock_frame])), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.get_ready_checkbox',
+                  AsyncMock(return_value=(mock_frame, mock_checkbox))), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.wait_for_solved', solved_mock), \
+            patch('asyncio.sleep', AsyncMock()):
+        result = await solve_cloudflare_widgets(mock_page, expected_content_selector='.content', return_result=True)
+
+    assert result.success is True and result.widgets[0].decided_by == 'expected_content'
+    assert solved_mock.call_args.args == (mock_page, mock_frame, 'turnstile', '.content')
+
+
+@pytest.mark.asyncio
+async def test_solve_widgets_no_challenge_and_no_iframes(mock_page):
+    """ Test the outcomes without widgets on the page """
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               AsyncMock(return_value=make_probe())):
+        result = await solve_cloudflare_widgets(mock_page, return_result=True)
+
+    assert result.success is True and result.decided_by == 'no_challenge' and result.widgets == []
+
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               AsyncMock(return_value=make_probe(turnstile=True))), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.find_cloudflare_iframes', AsyncMock(return_value=[])):
+        result = await solve_cloudflare_widgets(mock_page, return_result=True)
+
+    assert result.success is False and result.decided_by == 'iframes_not_found'
+
+    with pytest.raises(ValueError, match="Supported is: 'turnstile'"):
+        await solve_cloudflare_widgets(mock_page, challenge_type='interstitial')
+
+
+@pytest.mark.asyncio
+async def test_solve_widgets_timeout_keeps_widget_outcomes(mock_page, mock_checkbox):
+    """ Test that widgets decided before the time budget ran out keep their outcomes """
+    frames = [AsyncMock(spec=Frame) for _ in range(2)]
+
+    async def solved(queryable, iframe, *args, **kwargs):
+        if iframe is frames[1]:
+            await asyncio.Event().wait()
+        return 'turnstile_success'
+
+    with patch('camoufox_captcha.cloudflare.solve_by_click.probe_cloudflare_challenge',
+               AsyncMock(return_value=make_probe(turnstile=True))), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.find_cloudflare_iframes',
+                  AsyncMock(return_value=frames)), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.get_ready_checkbox',
+                  AsyncMock(side_effect=lambda iframes, **kwargs: (iframes[0], mock_checkbox))), \
+            patch('camoufox_captcha.cloudflare.solve_by_click.wait_for_solved', AsyncMock(side_effect=solved)):
+        result = await solve_cloudflare_widgets(mock_page, timeout=0.05, return_result=True)
+
+    assert result.timed_out is True
+    assert [widget.decided_by for widget in result.widgets] == ['turnstile_success', 'timed_out']
+    assert result.widgets[1].duration > 0
+
+
+@pytest.mark.asyncio
+async def test_click_checkbox_reuses_probed_geometry(mock_checkbox):
+    """ Test that a fresh clickable geometry skips the actionability checks of the first click only """
+    remember_geometry(mock_checkbox, ElementGeometry(visible=True, enabled=True, obscured=False,
+                                                     x=10, y=20, width=24, height=30))
+    mock_checkbox.click.side_effect = [Exception('Element is detached'), None]
+
+    with patch('asyncio.sleep', AsyncMock()):
+        assert await click_checkbox(mock_checkbox, 3, 1, Deadline(), DEFAULT_RETRY_POLICY) is True
+
+    first, retry = mock_checkbox.click.call_args_list
+    assert first.kwargs == {'position': {'x': 12, 'y': 15}, 'force': True}
+    assert retry.kwargs == {}
+
+
+@pytest.mark.asyncio
+async def test_click_checkbox_obscured_geometry(mock_checkbox):
+    """ Test that an obscured checkbox and a checkbox without geometry get Playwright's regular click """
+    remember_geometry(mock_checkbox, ElementGeometry(visible=True, enabled=True, obscured=True,
+                                                     x=10, y=20, width=24, height=30))
+
+    assert await click_checkbox(mock_checkbox, 1, 0, Deadline(), DEFAULT_RETRY_POLICY) is True
+    assert await click_checkbox(mock_checkbox, 1, 0, Deadline(), DEFAULT_RETRY_POLICY) is True
+
+    assert all(call.kwargs == {} for call in mock_checkbox.click.call_args_list)
+
+    mock_checkbox.click.side_effect = Exception('Element is not attached')
+    assert await click_checkbox(mock_checkbox, 2, 0, Deadline(), DEFAULT_RETRY_POLICY) is False
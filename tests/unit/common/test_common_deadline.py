@@ -0,0 +1,29 @@
+from unittest.mock import patch
+
+from camoufox_captcha.common.deadline import Deadline
+
+
+def test_deadline_without_limit():
+    """ Test that a deadline without timeout never expires and keeps delays as they are """
+    deadline = Deadline()
+
+    assert deadline.remaining is None
+    assert deadline.expired is False
+    assert deadline.clamp(6) == 6
+
+
+def test_deadline_shrinks_delays_to_remaining_budget():
+    """ Test that delays are clamped to the remaining budget and the deadline expires """
+    with patch('camoufox_captcha.common.deadline.time.monotonic', return_value=100):
+        deadline = Deadline(10)
+
+    with patch('camoufox_captcha.common.deadline.time.monotonic', return_value=107):
+        assert deadline.remaining == 3
+        assert deadline.clamp(6) == 3
+        assert deadline.clamp(1) == 1
+        assert deadline.expired is False
+
+    with patch('camoufox_captcha.common.deadline.time.monotonic', return_value=111):
+        assert deadline.remaining == 0
+        assert deadline.clamp(6) == 0
+        assert deadline.expired is True
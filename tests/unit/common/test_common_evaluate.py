@@ -0,0 +1,45 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from playwright.async_api import ElementHandle, Frame, Page
+
+from camoufox_captcha.common.evaluate import evaluate_in_scope, evaluate_handle_in_scope
+
+JS = "(root, arg) => root.querySelector(arg)"
+
+
+@pytest.mark.asyncio
+async def test_evaluate_in_scope_page_uses_document():
+    """ Test that Page and Frame evaluations receive the document as the root """
+    page = AsyncMock(spec=Page)
+    page.evaluate.return_value = True
+
+    result = await evaluate_in_scope(page, JS, '#content')
+
+    assert result is True
+    js, arg = page.evaluate.call_args.args
+    assert js == f"(arg) => ({JS})(document, arg)"
+    assert arg == '#content'
+
+
+@pytest.mark.asyncio
+async def test_evaluate_in_scope_element_handle_uses_element():
+    """ Test that ElementHandle evaluations receive the element itself as the root """
+    element = AsyncMock(spec=ElementHandle)
+
+    await evaluate_in_scope(element, JS, '#content')
+
+    element.evaluate.assert_called_once_with(JS, '#content')
+
+
+@pytest.mark.asyncio
+async def test_evaluate_handle_in_scope():
+    """ Test evaluate_handle_in_scope returns the handle of the evaluation """
+    frame = AsyncMock(spec=Frame)
+    handle = AsyncMock()
+    frame.evaluate_handle.return_value = handle
+
+    result = await evaluate_handle_in_scope(frame, JS)
+
+    assert result is handle
+    assert frame.evaluate_handle.call_args.args[0] == f"(arg) => ({JS})(document, arg)"
@@ -0,0 +1,88 @@
+import logging
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from playwright.async_api import ElementHandle, Frame, Page
+
+from camoufox_captcha.common.frames import search_frame_tree
+from camoufox_captcha.common.metrics import SolveMetrics
+
+
+def make_frame(url, parent=None, detached=False):
+    frame = MagicMock(spec=Frame)
+    frame.url = url
+    frame.parent_frame = parent
+    frame.child_frames = []
+    frame.is_detached.return_value = detached
+    frame.frame_element = AsyncMock(return_value=AsyncMock(spec=ElementHandle))
+    if parent is not None:
+        parent.child_frames.append(frame)
+    return frame
+
+
+@pytest.fixture
+def frame_tree():
+    main = make_frame('https://example.com/')
+    challenge = make_frame('https://challenges.example/cdn-cgi/x', main)
+    nested = make_frame('https://challenges.example/cdn-cgi/nested', challenge)
+    other = make_frame('https://ads.example/', main)
+    detached = make_frame('https://challenges.example/cdn-cgi/old', main, detached=True)
+    return main, challenge, nested, other, detached
+
+
+@pytest.mark.asyncio
+async def test_search_frame_tree_page_without_round_trips(frame_tree):
+    """ Test that frames of a Page are matched by URL without protocol calls """
+    main, challenge, nested, other, detached = frame_tree
+    page = AsyncMock(spec=Page)
+    page.main_frame = main
+    page.frames = [main, challenge, nested, other, detached]
+
+    metrics = SolveMetrics()
+    with metrics.activate():
+        frames = await search_frame_tree(page, 'challenges.example/cdn-cgi/')
+
+    assert frames == [challenge, nested]
+    assert metrics.round_trips == 0
+
+
+@pytest.mark.asyncio
+async def test_search_frame_tree_frame_descendants(frame_tree):
+    """ Test that a Frame only matches the frames nested in it """
+    main, challenge, nested, other, detached = frame_tree
+
+    assert await search_frame_tree(challenge, 'challenges.example/cdn-cgi/') == [nested]
+    assert await search_frame_tree(main, 'challenges.example/cdn-cgi/') == [challenge, nested]
+
+
+@pytest.mark.asyncio
+async def test_search_frame_tree_rooted_at_element(frame_tree):
+    """ Test that a root element keeps only the frames whose iframe element is inside it """
+    main, challenge, nested, other, detached = frame_tree
+    root = AsyncMock(spec=ElementHandle)
+    root.owner_frame.return_value = main
+    root.evaluate.return_value = [True]
+
+    metrics = SolveMetrics()
+    with metrics.activate():
+        frames = await search_frame_tree(root, 'challenges.example/cdn-cgi/', root=root)
+
+    assert frames == [challenge, nested]
+    challenge.frame_element.assert_called_once()  # nested frames are mapped through their ancestor
+    nested.frame_element.assert_not_called()
+    assert root.evaluate.call_args.args[1] == [await challenge.frame_element()]
+    assert metrics.round_trips == 4  # owner frame, iframe element, containment check, disposal
+
+    root.evaluate.return_value = [False]
+    assert await search_frame_tree(root, 'challenges.example/cdn-cgi/', root=root) == []
+
+
+@pytest.mark.asyncio
+async def test_search_frame_tree_error(caplog):
+    """ Test that errors are logged and reported as no frames """
+    element = AsyncMock(spec=ElementHandle)
+    element.owner_frame.side_effect = Exception('Element is detached')
+
+    with caplog.at_level(logging.ERROR):
+        assert await search_frame_tree(element, 'challenges.example') == []
+        assert 'Error searching the frame tree: Element is detached' in caplog.text
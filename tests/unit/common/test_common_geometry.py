@@ -0,0 +1,58 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from playwright.async_api import ElementHandle, Frame
+
+from camoufox_captcha.common.geometry import ElementGeometry, probe_elements, remember_geometry, take_geometry
+from camoufox_captcha.common.metrics import SolveMetrics
+
+
+def make_geometry(**kwargs):
+    values = {'visible': True, 'enabled': True, 'obscured': False, 'x': 10, 'y': 20, 'width': 24, 'height': 30}
+    values.update(kwargs)
+    return ElementGeometry(**values)
+
+
+@pytest.mark.asyncio
+async def test_probe_elements_single_evaluation():
+    """ Test that all elements are measured in one evaluation """
+    frame = AsyncMock(spec=Frame)
+    elements = [AsyncMock(spec=ElementHandle), AsyncMock(spec=ElementHandle)]
+    frame.evaluate.return_value = [
+        {'visible': True, 'enabled': True, 'obscured': False, 'x': 10, 'y': 20, 'width': 24, 'height': 30},
+        {'visible': False, 'enabled': True, 'obscured': True, 'x': 0, 'y': 0, 'width': 0, 'height': 0}
+    ]
+
+    metrics = SolveMetrics()
+    with metrics.activate():
+        geometries = await probe_elements(frame, elements)
+
+    assert [geometry.visible for geometry in geometries] == [True, False]
+    assert frame.evaluate.call_args.args[1] == elements
+    assert metrics.round_trips == 1
+
+    assert await probe_elements(frame, []) == []
+    frame.evaluate.assert_called_once()
+
+
+def test_element_geometry_clickable_and_center():
+    """ Test that only visible, enabled and unobscured elements are clickable at their center """
+    assert make_geometry().clickable is True
+    assert make_geometry().center == {'x': 12, 'y': 15}
+    assert make_geometry(visible=False).clickable is False
+    assert make_geometry(enabled=False).clickable is False
+    assert make_geometry(obscured=True).clickable is False
+
+
+def test_take_geometry_once_while_fresh():
+    """ Test that a remembered geometry is handed out once and only while it is fresh """
+    element = AsyncMock(spec=ElementHandle)
+    geometry = make_geometry()
+
+    remember_geometry(element, geometry)
+    assert take_geometry(element) is geometry
+    assert take_geometry(element) is None
+
+    remember_geometry(element, geometry)
+    with patch('camoufox_captcha.common.geometry.time.monotonic', return_value=geometry.probed_at + 5):
+        assert take_geometry(element) is None
@@ -0,0 +1,64 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from playwright.async_api import ElementHandle, JSHandle
+
+from camoufox_captcha.common.handles import HandleScope, dispose_handles, live_handle_count
+
+
+@pytest.mark.asyncio
+async def test_handle_scope_disposes_tracked_handles():
+    """ Test that tracked handles are disposed on exit and the live counter goes back down """
+    initial_count = live_handle_count()
+    handle = AsyncMock(spec=JSHandle)
+
+    async with HandleScope() as scope:
+        assert scope.track(handle) is handle
+        assert live_handle_count() == initial_count + 1
+
+    handle.dispose.assert_called_once()
+    assert live_handle_count() == initial_count
+
+
+@pytest.mark.asyncio
+async def test_handle_scope_keeps_returned_handles():
+    """ Test that kept handles survive the scope and count as live until released """
+    initial_count = live_handle_count()
+    intermediate = AsyncMock(spec=JSHandle)
+    element = AsyncMock(spec=ElementHandle)
+
+    async with HandleScope() as scope:
+        scope.track(intermediate)
+        scope.keep(scope.track(element))
+
+    intermediate.dispose.assert_called_once()
+    element.dispose.assert_not_called()
+    assert live_handle_count() == initial_count + 1
+
+    await dispose_handles([element])
+
+    element.dispose.assert_called_once()
+    assert live_handle_count() == initial_count
+
+
+@pytest.mark.asyncio
+async def test_handle_scope_disposes_on_error():
+    """ Test that handles are disposed when the scope exits with an exception and dispose errors are ignored """
+    handle = AsyncMock(spec=JSHandle)
+    failing_handle = AsyncMock(spec=JSHandle)
+    failing_handle.dispose.side_effect = Exception("Target closed")
+
+    with pytest.raises(ValueError):
+        async with HandleScope() as scope:
+            scope.track(handle)
+            scope.track(failing_handle)
+            raise ValueError("Search error")
+
+    handle.dispose.assert_called_once()
+    failing_handle.dispose.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_dispose_handles_skips_none():
+    """ Test that dispose_handles ignores missing handles """
+    await dispose_handles([None])
@@ -0,0 +1,141 @@
+import json
+import re
+import shutil
+import subprocess
+from unittest.mock import AsyncMock
+
+import pytest
+from playwright.async_api import ElementHandle, Frame, Page
+
+from camoufox_captcha.common.helpers import HELPERS_KEY, call_helper, install_helpers_js
+
+# minimal DOM running the helper library in node: one shadow host in the light DOM, observers and timers
+# are recorded so the test drives them by hand
+FAKE_DOM_JS = """
+globalThis.window = globalThis;
+Object.defineProperty(globalThis, "performance", {value: {now: () => 0}, configurable: true});
+globalThis.Node = {ELEMENT_NODE: 1};
+globalThis.NodeFilter = {SHOW_ELEMENT: 1, FILTER_ACCEPT: 1, FILTER_REJECT: 2};
+globalThis.getComputedStyle = () => ({visibility: "visible"});
+
+const observers = [];
+globalThis.MutationObserver = class {
+    constructor() { this.connected = false; observers.push(this); }
+    observe() { this.connected = true; }
+    disconnect() { this.connected = false; }
+};
+const intervals = [];
+globalThis.setInterval = (callback) => intervals.push(callback);
+globalThis.clearInterval = () => {};
+globalThis.setTimeout = () => 0;
+globalThis.clearTimeout = () => {};
+
+const checkbox = {getBoundingClientRect: () => ({width: 20, height: 20})};
+const host = {tagName: "DIV", shadowRootUnl: null, isConnected: true};
+globalThis.document = {
+    documentElement: {tagName: "HTML"},
+    createTreeWalker: (node) => {
+        const nodes = node === document || node === document.documentElement ? [host] : [];
+        let i = -1;
+        return {get currentNode() { return nodes[i]; }, nextNode: () => ++i < nodes.length};
+    }
+};
+"""
+from camoufox_captcha.common.metrics import SolveMetrics
+
+
+@pytest.mark.asyncio
+async def test_call_helper_installs_library_once():
+    """ Test that the library is sent with the first call only, later calls send the short call script """
+    frame = AsyncMock(spec=Frame)
+    frame.evaluate.return_value = ['match']
+
+    assert await call_helper(frame, 'queryShadowRoots', {'selector': '.button'}) == ['match']
+    install_js, arg = frame.evaluate.call_args.args
+    assert 'createTreeWalker' in install_js and HELPERS_KEY in install_js
+    assert arg == {'selector': '.button'}
+
+    await call_helper(frame, 'queryShadowRoots', {'selector': 'input[name="it\'s"]'})
+    call_js, arg = frame.evaluate.call_args.args
+    assert 'createTreeWalker' not in call_js and 'helpers.queryShadowRoots(arg)' in call_js
+    assert len(call_js) < len(install_js) / 10
+    assert arg == {'selector': 'input[name="it\'s"]'}
+
+
+@pytest.mark.asyncio
+async def test_call_helper_reinstalls_after_navigation():
+    """ Test that a document without the helpers gets them installed again """
+    page = AsyncMock(spec=Page)
+    await call_helper(page, 'collectShadowRoots', {}, handle=True)
+
+    page.evaluate_handle.side_effect = [Exception('Error: camoufox-captcha helpers are not installed'), 'handle']
+    metrics = SolveMetrics()
+    with metrics.activate():
+        assert await call_helper(page, 'collectShadowRoots', {}, handle=True) == 'handle'
+
+    assert metrics.round_trips == 2
+    assert 'createTreeWalker' in page.evaluate_handle.call_args.args[0]
+
+
+@pytest.mark.asyncio
+async def test_call_helper_propagates_other_errors():
+    """ Test that errors other than missing helpers are raised """
+    page = AsyncMock(spec=Page)
+    page.evaluate.side_effect = Exception('Execution context was destroyed')
+
+    with pytest.raises(Exception, match='Execution context was destroyed'):
+        await call_helper(page, 'collectShadowRoots', {})
+    page.evaluate.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_call_helper_element_handle():
+    """ Test that the script is wrapped for ElementHandle, which passes itself as the first argument """
+    element = AsyncMock(spec=ElementHandle)
+
+    await call_helper(element, 'queryShadowRoots', {'selector': '.button'}, handle=True)
+
+    js, arg = element.evaluate_handle.call_args.args
+    assert js.startswith('(_, arg) =>')
+    assert arg == {'selector': '.button'}
+
+
+def test_walk_keeps_subtrees_that_can_hold_shadow_hosts():
+    """ Test that only elements without element children in the tree are pruned from the walk
+    (svg foreignObject and media/canvas fallback content can hold custom elements with shadow roots) """
+    pruned = json.loads(re.search(r'PRUNED_TAGS = new Set\((\[.*?\])\)', install_helpers_js()).group(1))
+
+    assert set(pruned) == {'SCRIPT', 'STYLE', 'TEMPLATE', 'NOSCRIPT', 'TEXTAREA', 'IFRAME'}
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='node is not installed')
+def test_wait_sees_root_attached_to_connected_host():
+    """ Test that the wait's rescan finds a shadow root attached to an already inserted host (no mutation),
+    even while a fresh shadow root index misses it, and that disposing the index disconnects its observer """
+    script = FAKE_DOM_JS + f"""
+    const helpers = {install_helpers_js()};
+    const options = {{root: null, hostSelector: null, maxDepth: null, useIndex: true, selector: ".checkbox"}};
+    (async () => {{
+        const before = helpers.queryShadowRoots(options).length;
+        const wait = helpers.waitForShadowRootElement({{...options, timeout: 60000, visible: true, waitId: "w"}});
+
+        // the checkbox frame attaches its shadow root to the host that is already in the document
+        host.shadowRootUnl = {{host, querySelectorAll: (selector) => selector === ".checkbox" ? [checkbox] : []}};
+        intervals[0]();
+        const found = await Promise.race([wait, Promise.resolve(null)]);
+
+        console.log(JSON.stringify({{
+            before,
+            found: found === checkbox,
+            indexed: helpers.queryShadowRoots(options).length,
+            disposed: helpers.disposeShadowIndex(),
+            indexObserverConnected: observers[0].connected,
+            indexKept: Object.getOwnPropertyNames(window).some((key) => key.endsWith("_shadowIndex"))
+        }}));
+    }})();
+    """
+
+    output = subprocess.run(['node', '-e', script], capture_output=True, text=True, check=True).stdout
+
+    assert json.loads(output) == {'before': 0, 'found': True, 'indexed': 0, 'disposed': True,
+                                  'indexObserverConnected': False, 'indexKept': False}
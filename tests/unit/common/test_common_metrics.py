@@ -0,0 +1,49 @@
+import logging
+from unittest.mock import MagicMock
+
+from camoufox_captcha.common.metrics import SolveHooks, SolveMetrics, record_round_trips
+
+
+def test_record_round_trips_counts_into_active_metrics():
+    """ Test that round trips are counted only while a collector is active """
+    metrics = SolveMetrics()
+
+    record_round_trips()
+    with metrics.activate():
+        record_round_trips()
+        record_round_trips(3)
+    record_round_trips()
+
+    assert metrics.round_trips == 4
+
+
+def test_phase_durations_are_summed():
+    """ Test that repeated phases are summed up and reported to the hooks """
+    hooks = MagicMock(spec=SolveHooks)
+    metrics = SolveMetrics(hooks)
+
+    with metrics.phase('detection'):
+        pass
+    with metrics.phase('detection'):
+        pass
+
+    assert list(metrics.phase_durations) == ['detection']
+    assert metrics.phase_durations['detection'] >= 0
+    assert hooks.on_phase.call_count == 2
+
+
+def test_finish_builds_result_and_ignores_hook_errors(caplog):
+    """ Test that finish returns the result even when a hook raises """
+    hooks = MagicMock(spec=SolveHooks)
+    hooks.on_result.side_effect = Exception("Export error")
+    metrics = SolveMetrics(hooks)
+    metrics.attempts = 2
+
+    with caplog.at_level(logging.ERROR):
+        result = metrics.finish(False, 'max_attempts')
+
+    assert result.success is False
+    assert bool(result) is False
+    assert result.attempts == 2
+    assert result.decided_by == 'max_attempts'
+    assert "Error in solve hook on_result: Export error" in caplog.text
@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+from camoufox_captcha.common.retry import DEFAULT_RETRY_POLICY, RetryPolicy
+
+
+def test_default_policy_keeps_constant_delays():
+    """ Test that the default policy reproduces the constant delays """
+    assert [DEFAULT_RETRY_POLICY.delay(2, retry) for retry in range(4)] == [2, 2, 2, 2]
+    assert DEFAULT_RETRY_POLICY.total(2, 3) == 6
+
+
+def test_exponential_backoff_is_capped():
+    """ Test that delays grow by the factor up to max_delay """
+    policy = RetryPolicy(factor=2, max_delay=5)
+
+    assert [policy.delay(1, retry) for retry in range(5)] == [1, 2, 4, 5, 5]
+    assert policy.total(1, 5) == 17
+
+
+def test_jitter_stays_in_range():
+    """ Test that jittered delays are drawn from [delay * (1 - jitter), delay] """
+    policy = RetryPolicy(jitter=0.5, rng=random.Random(1).random)
+    delays = [policy.delay(4, 0) for _ in range(100)]
+
+    assert all(2 <= delay <= 4 for delay in delays)
+    assert len(set(delays)) > 1
+    assert policy.total(4, 2) == 8  # the bound ignores the jitter
+
+
+def test_full_jitter_bounds():
+    """ Test the extremes of the random source with full jitter """
+    assert RetryPolicy(jitter=1, rng=lambda: 0).delay(3, 0) == 3
+    assert RetryPolicy(jitter=1, rng=lambda: 0.5).delay(3, 0) == 1.5
+
+
+@pytest.mark.parametrize('kwargs', [{'factor': 0.5}, {'jitter': -0.1}, {'jitter': 1.5}])
+def test_invalid_policy(kwargs):
+    """ Test that invalid factors and jitters are rejected """
+    with pytest.raises(ValueError):
+        RetryPolicy(**kwargs)
@@ -0,0 +1,48 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from playwright.async_api import Selectors
+
+from camoufox_captcha.common.helpers import HELPERS_KEY
+from camoufox_captcha.common.selector_engine import SHADOW_SELECTOR_ENGINE, register_shadow_selector_engine, \
+    shadow_selector, shadow_selector_engine_script
+
+
+def test_shadow_selector():
+    """ Test that selectors are prefixed with the engine name """
+    assert shadow_selector('input[type="checkbox"]') == f'{SHADOW_SELECTOR_ENGINE}=input[type="checkbox"]'
+    assert shadow_selector('#success', engine='cf') == 'cf=#success'
+
+
+def test_engine_script_shares_helpers():
+    """ Test that the engine queries through the in-page helper library """
+    script = shadow_selector_engine_script()
+
+    assert HELPERS_KEY in script
+    assert 'queryAllFrom(root, selector)' in script
+
+
+@pytest.mark.asyncio
+async def test_register_shadow_selector_engine_once():
+    """ Test that the engine is registered once per Selectors object and name """
+    selectors = AsyncMock(spec=Selectors)
+
+    await register_shadow_selector_engine(selectors)
+    await register_shadow_selector_engine(selectors)
+    await register_shadow_selector_engine(selectors, name='cf')
+
+    assert [call.args[0] for call in selectors.register.call_args_list] == [SHADOW_SELECTOR_ENGINE, 'cf']
+    assert selectors.register.call_args.args[1] == shadow_selector_engine_script()
+
+
+@pytest.mark.asyncio
+async def test_register_shadow_selector_engine_errors():
+    """ Test that an engine registered elsewhere is accepted and other errors are raised """
+    selectors = AsyncMock(spec=Selectors)
+    selectors.register.side_effect = Exception('"camoufox-shadow" selector engine has been already registered')
+    await register_shadow_selector_engine(selectors)
+
+    selectors = AsyncMock(spec=Selectors)
+    selectors.register.side_effect = Exception('Browser has been closed')
+    with pytest.raises(Exception, match='Browser has been closed'):
+        await register_shadow_selector_engine(selectors)
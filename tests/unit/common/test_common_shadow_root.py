@@ -1,13 +1,19 @@
+import asyncio
 import logging
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from playwright.async_api import ElementHandle, Page, Frame
 
+from camoufox_captcha.common.helpers import HELPERS_KEY
 from camoufox_captcha.common.shadow_root import (
+    dispose_shadow_index,
     get_shadow_roots,
+    query_shadow_root_elements,
     search_shadow_root_elements,
     search_shadow_root_iframes,
+    wait_for_shadow_root_element,
+    TraversalOptions,
 )
 
 
@@ -18,6 +24,7 @@ class MockElementHandle:
         self.evaluate_handle = AsyncMock()
         self.get_property = AsyncMock()
         self.content_frame = AsyncMock()
+        self.dispose = AsyncMock()
 
     def as_element(self):
         return self if self.is_element else None
@@ -124,43 +131,68 @@ async def test_get_shadow_roots_with_non_element():
     assert len(shadow_roots) == 0
 
 
+@pytest.mark.asyncio
+async def test_query_shadow_root_elements_with_page(mock_page):
+    """ Test query_shadow_root_elements returns every match from a single evaluation """
+    elements = await query_shadow_root_elements(mock_page, '.button')
+
+    mock_page.evaluate_handle.assert_called_once()
+    assert mock_page.evaluate_handle.call_args.args[1]['selector'] == '.button'
+    assert len(elements) == 2
+    assert all(isinstance(element, MockElementHandle) for element in elements)
+
+
+@pytest.mark.asyncio
+async def test_query_shadow_root_elements_selector_passed_as_argument(mock_frame):
+    """ Test query_shadow_root_elements does not interpolate the selector into the script """
+    selector = 'input[name="it\'s"]'
+
+    await query_shadow_root_elements(mock_frame, selector)
+
+    js, arg = mock_frame.evaluate_handle.call_args.args
+    assert arg['selector'] == selector
+    assert selector not in js
+
+
+@pytest.mark.asyncio
+async def test_query_shadow_root_elements_with_element_handle():
+    """ Test query_shadow_root_elements wraps the script so ElementHandle receives the selector argument """
+    element = AsyncMock(spec=ElementHandle)
+    handle = AsyncMock()
+    handle.get_properties.return_value = {}
+    element.evaluate_handle.return_value = handle
+
+    elements = await query_shadow_root_elements(element, '.button')
+
+    js, arg = element.evaluate_handle.call_args.args
+    assert js.startswith('(_, arg) =>')
+    assert arg == {'root': None, 'hostSelector': None, 'maxDepth': None, 'useIndex': False,
+                   'selector': '.button'}
+    assert len(elements) == 0
+
+
 @pytest.mark.asyncio
 async def test_search_shadow_root_elements_success():
     """ Test search_shadow_root_elements when elements are found """
     page = AsyncMock(spec=Page)
-    shadow_root = MockElementHandle()
-
-    # mock element that will be found
     found_element = MockElementHandle()
 
-    # configure the mocks
-    with patch('camoufox_captcha.common.shadow_root.get_shadow_roots',
-               AsyncMock(return_value=[shadow_root])):
-        shadow_root.evaluate_handle.return_value = found_element
-
+    with patch('camoufox_captcha.common.shadow_root.query_shadow_root_elements',
+               AsyncMock(return_value=[found_element])) as query_mock:
         elements = await search_shadow_root_elements(page, '.button')
 
         assert len(elements) == 1
         assert elements[0] is found_element
+        query_mock.assert_called_once_with(page, '.button', None)
 
 
 @pytest.mark.asyncio
-async def test_search_shadow_root_elements_no_elements():
+async def test_search_shadow_root_elements_no_elements(mock_empty_page):
     """ Test search_shadow_root_elements when no elements are found """
-    page = AsyncMock(spec=Page)
-    shadow_root = MockElementHandle()
-
-    # setup mock to return non-element
-    found_handle = MockElementHandle(is_element=False)
+    elements = await search_shadow_root_elements(mock_empty_page, '.non-existent')
 
-    # configure the mocks
-    with patch('camoufox_captcha.common.shadow_root.get_shadow_roots',
-               AsyncMock(return_value=[shadow_root])):
-        shadow_root.evaluate_handle.return_value = found_handle
-
-        elements = await search_shadow_root_elements(page, '.non-existent')
-
-        assert len(elements) == 0
+    assert len(elements) == 0
+    mock_empty_page.evaluate_handle.assert_called_once()
 
 
 @pytest.mark.asyncio
@@ -169,7 +201,7 @@ async def test_search_shadow_root_elements_with_exception(caplog):
     page = AsyncMock(spec=Page)
 
     # configure the mock to raise an exception
-    with patch('camoufox_captcha.common.shadow_root.get_shadow_roots',
+    with patch('camoufox_captcha.common.shadow_root.query_shadow_root_elements',
                AsyncMock(side_effect=Exception("Test error"))):
         with caplog.at_level(logging.ERROR):
             elements = await search_shadow_root_elements(page, '.button')
@@ -251,20 +283,21 @@ async def test_search_shadow_root_iframes_detached():
 
 
 @pytest.mark.asyncio
-async def test_search_shadow_root_elements_null_element():
-    """ Test search_shadow_root_elements when element_handle is None/false """
+async def test_search_shadow_root_iframes_without_content_frame():
+    """ Test search_shadow_root_iframes skips iframes without a content frame """
     page = AsyncMock(spec=Page)
-    shadow_root = AsyncMock()
+    iframe_element = MockElementHandle()
 
-    shadow_root.evaluate_handle.return_value = None
+    src_prop = AsyncMock()
+    src_prop.json_value.return_value = "https://example.com/iframe"
+    iframe_element.get_property.return_value = src_prop
+    iframe_element.content_frame.return_value = None
 
-    with patch('camoufox_captcha.common.shadow_root.get_shadow_roots',
-               AsyncMock(return_value=[shadow_root])):
-        elements = await search_shadow_root_elements(page, '.button')
+    with patch('camoufox_captcha.common.shadow_root.search_shadow_root_elements',
+               AsyncMock(return_value=[iframe_element])):
+        frames = await search_shadow_root_iframes(page, "example.com")
 
-        assert len(elements) == 0
-        # verify evaluate_handle was called even though result was None
-        shadow_root.evaluate_handle.assert_called_once()
+    assert frames == []
 
 
 @pytest.mark.asyncio
@@ -279,3 +312,157 @@ async def test_search_shadow_root_iframes_exception(caplog):
 
             assert len(frames) == 0
             assert "Error searching for iframes: Iframe search error" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_wait_for_shadow_root_element_found():
+    """ Test wait_for_shadow_root_element when the element appears before the timeout """
+    frame = AsyncMock(spec=Frame)
+    found_element = MockElementHandle()
+    frame.evaluate_handle.return_value = found_element
+
+    element = await wait_for_shadow_root_element(frame, 'input[type="checkbox"]', timeout=2)
+
+    assert element is found_element
+    js, arg = frame.evaluate_handle.call_args.args
+    wait_id = arg.pop('waitId')
+    assert arg == {'root': None, 'hostSelector': None, 'maxDepth': None, 'useIndex': False,
+                   'selector': 'input[type="checkbox"]', 'timeout': 2000, 'visible': True}
+    assert wait_id and 'MutationObserver' in js
+
+
+@pytest.mark.asyncio
+async def test_wait_for_shadow_root_element_cancel_aborts_in_page_wait():
+    """ Test that cancelling the wait stops it in the page and disposes the handle it settles with """
+    frame = AsyncMock(spec=Frame)
+    late_element = MockElementHandle()
+    in_page_wait = asyncio.get_running_loop().create_future()
+
+    async def evaluate_handle(js, arg):
+        return await in_page_wait
+
+    async def evaluate(js, wait_id):
+        # the aborted wait resolves, here with the element it found just before
+        in_page_wait.set_result(late_element)
+        return True
+
+    frame.evaluate_handle.side_effect = evaluate_handle
+    frame.evaluate.side_effect = evaluate
+
+    task = asyncio.ensure_future(wait_for_shadow_root_element(frame, '.button', timeout=60))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    cancel_js, wait_id = frame.evaluate.call_args.args
+    assert 'helpers.cancelWait(arg)' in cancel_js
+    assert wait_id == frame.evaluate_handle.call_args.args[1]['waitId']
+    late_element.dispose.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_wait_for_shadow_root_element_timeout():
+    """ Test wait_for_shadow_root_element when the in-page wait times out """
+    frame = AsyncMock(spec=Frame)
+    frame.evaluate_handle.return_value = MockElementHandle(is_element=False)
+
+    element = await wait_for_shadow_root_element(frame, '.button', timeout=1, visible=False)
+
+    assert element is None
+    assert frame.evaluate_handle.call_args.args[1]['visible'] is False
+
+
+@pytest.mark.asyncio
+async def test_query_shadow_root_elements_disposes_intermediate_handles():
+    """ Test that the array and non-element property handles are disposed and only elements are kept """
+    frame = AsyncMock(spec=Frame)
+    array_handle = AsyncMock()
+    element = MockElementHandle()
+    non_element = MockElementHandle(is_element=False)
+    array_handle.get_properties.return_value = {"0": element, "1": non_element}
+    frame.evaluate_handle.return_value = array_handle
+
+    elements = await query_shadow_root_elements(frame, '.button')
+
+    assert elements == [element]
+    array_handle.dispose.assert_called_once()
+    non_element.dispose.assert_called_once()
+    element.dispose.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_search_shadow_root_iframes_disposes_iframe_handles():
+    """ Test that iframe element and src property handles are disposed after resolving the frames """
+    page = AsyncMock(spec=Page)
+    iframe_element = MockElementHandle()
+    src_prop = AsyncMock()
+    src_prop.json_value.return_value = "https://example.com/iframe"
+    iframe_element.get_property.return_value = src_prop
+    mock_frame = AsyncMock(spec=Frame)
+    mock_frame.is_detached.return_value = False
+    iframe_element.content_frame.return_value = mock_frame
+
+    with patch('camoufox_captcha.common.shadow_root.search_shadow_root_elements',
+               AsyncMock(return_value=[iframe_element])):
+        frames = await search_shadow_root_iframes(page, "example.com")
+
+        assert frames == [mock_frame]
+        iframe_element.dispose.assert_called_once()
+        src_prop.dispose.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_query_shadow_root_elements_with_traversal_options(mock_page):
+    """ Test that traversal options (root element, host selector, max depth) are passed to the page """
+    root = MockElementHandle()
+    traversal = TraversalOptions(root=root, host_selector='div.host', max_depth=2)
+
+    await query_shadow_root_elements(mock_page, 'iframe', traversal)
+
+    js, arg = mock_page.evaluate_handle.call_args.args
+    assert arg == {'root': root, 'hostSelector': 'div.host', 'maxDepth': 2, 'useIndex': False,
+                   'selector': 'iframe'}
+    assert 'createTreeWalker' in js
+    assert 'querySelectorAll("*")' not in js
+
+
+@pytest.mark.asyncio
+async def test_search_shadow_root_iframes_with_traversal_options():
+    """ Test that search_shadow_root_iframes passes the traversal options to the element search """
+    page = AsyncMock(spec=Page)
+    traversal = TraversalOptions(max_depth=1)
+
+    with patch('camoufox_captcha.common.shadow_root.search_shadow_root_elements',
+               AsyncMock(return_value=[])) as search_mock:
+        await search_shadow_root_iframes(page, "example.com", traversal)
+
+        search_mock.assert_called_once_with(page, 'iframe', traversal)
+
+
+@pytest.mark.asyncio
+async def test_query_shadow_root_elements_uses_shadow_index(mock_page):
+    """ Test that the in-page shadow root index is opt-in and versioned like the helpers """
+    await query_shadow_root_elements(mock_page, '.button')
+
+    js, arg = mock_page.evaluate_handle.call_args.args
+    assert arg['useIndex'] is False
+
+    await query_shadow_root_elements(mock_page, '.button', TraversalOptions(use_index=True))
+
+    assert mock_page.evaluate_handle.call_args.args[1]['useIndex'] is True
+    assert f'"{HELPERS_KEY}" + "_shadowIndex"' in js
+    assert '__HELPERS_KEY__' not in js
+    assert 'index.builtAt >= SHADOW_INDEX_STALE_MS) index.rebuild()' in js
+
+
+@pytest.mark.asyncio
+async def test_dispose_shadow_index(mock_page):
+    """ Test that the index is disposed through the helpers and errors are swallowed """
+    mock_page.evaluate.return_value = True
+
+    assert await dispose_shadow_index(mock_page) is True
+    assert 'disposeShadowIndex()' in mock_page.evaluate.call_args.args[0]
+
+    mock_page.evaluate.side_effect = Exception('Target closed')
+    assert await dispose_shadow_index(mock_page) is False
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from camoufox_captcha.common.tasks import first_ready
+
+
+@pytest.mark.asyncio
+async def test_first_ready_returns_first_truthy_and_cancels_rest():
+    """ Test first_ready returns the first truthy result and cancels pending awaitables """
+    cancelled = False
+
+    async def slow():
+        nonlocal cancelled
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+
+    async def empty():
+        return None
+
+    async def ready():
+        await asyncio.sleep(0)
+        return 'ready'
+
+    result = await first_ready([slow(), empty(), ready()])
+    await asyncio.sleep(0)
+
+    assert result == 'ready'
+    assert cancelled is True
+
+
+@pytest.mark.asyncio
+async def test_first_ready_none_ready():
+    """ Test first_ready returns None when no awaitable produces a truthy result """
+    async def empty():
+        return []
+
+    assert await first_ready([empty(), empty()]) is None
+    assert await first_ready([]) is None
+
+
+@pytest.mark.asyncio
+async def test_first_ready_raises_when_nothing_ready():
+    """ Test first_ready re-raises the first error only when no awaitable succeeded """
+    async def failing():
+        raise ValueError("Failure")
+
+    async def ready():
+        await asyncio.sleep(0)
+        return 'ready'
+
+    assert await first_ready([failing(), ready()]) == 'ready'
+
+    with pytest.raises(ValueError):
+        await first_ready([failing()])
+
+
+@pytest.mark.asyncio
+async def test_first_ready_releases_losing_results():
+    """ Test that truthy results finished alongside the winner are released """
+    released = []
+
+    async def ready(value):
+        return value
+
+    async def release(value):
+        released.append(value)
+
+    result = await first_ready([ready('first'), ready('second')], release=release)
+
+    assert result == 'first'
+    assert released == ['second']
@@ -0,0 +1,67 @@
+import math
+
+import pytest
+
+from benchmarks.fixtures import CHALLENGE_FRAME_PATH, challenge_frame, interstitial_page, turnstile_page
+from benchmarks.harness import BenchmarkStats, format_table, measure, percentile
+
+
+def test_percentile_nearest_rank():
+    """ Test nearest-rank percentiles """
+    values = [5, 1, 4, 2, 3]
+
+    assert percentile(values, 50) == 3
+    assert percentile(values, 90) == 5
+    assert percentile(values, 0) == 1
+    assert math.isnan(percentile([], 50))
+
+
+def test_fixture_pages_match_solver_structure():
+    """ Test that the fixtures contain the indicators and iframe source the solver looks for """
+    interstitial = interstitial_page(dom_size=10, checkbox_delay_ms=100)
+    turnstile = turnstile_page(dom_size=10)
+    frame = challenge_frame(checkbox_delay_ms=100)
+
+    assert '/cdn-cgi/challenge-platform/' in interstitial
+    assert CHALLENGE_FRAME_PATH + '?checkbox=100' in interstitial
+    assert 'turnstile_container' in turnstile and 'cf-turnstile-response' in turnstile
+    assert "mode: 'closed'" in frame and 'id="success"' in frame
+    assert '"hostCount": 5' in interstitial_page(dom_size=1000, host_count=5)
+
+
+@pytest.mark.asyncio
+async def test_measure_collects_samples():
+    """ Test that measure records durations, round trips and failures and always tears down """
+    torn_down = []
+    results = iter([True, False])
+
+    async def setup():
+        return 'state'
+
+    async def run(state):
+        return next(results)
+
+    async def teardown(state):
+        torn_down.append(state)
+
+    stats = await measure(BenchmarkStats('case', {'dom_size': 10}), setup, run, runs=2, teardown=teardown)
+    summary = stats.summary()
+
+    assert summary['runs'] == 2
+    assert summary['failures'] == 1
+    assert summary['round_trips'] == 0
+    assert torn_down == ['state', 'state']
+    assert 'case' in format_table([summary], ('name', 'dom_size', 'p50_ms'))
+
+
+def test_retry_simulation():
+    """ Test the lateness, failures and load of simulated pages """
+    from benchmarks.retry_simulation import simulate
+    from camoufox_captcha.common.retry import RetryPolicy
+
+    result = simulate(RetryPolicy(), base_delay=1, attempts=3, ready_times=[0, 1.5, 5])
+
+    assert result['failures'] == 1
+    assert result['p50_late_ms'] == 0 and result['p99_late_ms'] == 500
+    assert result['checks_per_page'] == 7 / 3
+    assert result['peak_retries'] == 2  # the second checks of the two waiting pages coincide
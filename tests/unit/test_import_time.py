@@ -0,0 +1,46 @@
+import subprocess
+import sys
+
+import pytest
+
+# modules that must only load on first use of the names needing them (the import timing is in benchmarks/)
+HEAVY_MODULES = ('playwright', 'greenlet', 'asyncio', 'camoufox_captcha.cloudflare', 'camoufox_captcha.common',
+                 'camoufox_captcha.registry', 'camoufox_captcha.pool', 'camoufox_captcha.page_pool',
+                 'camoufox_captcha.sync_api')
+
+IMPORT_SCRIPT = """
+import sys
+import camoufox_captcha
+print(' '.join(sorted(sys.modules)))
+"""
+
+
+def test_import_does_not_load_heavy_modules():
+    """ Test that importing the package doesn't import Playwright, asyncio or the solver tree """
+    modules = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT], capture_output=True, text=True,
+                             check=True).stdout.split()
+
+    assert 'camoufox_captcha' in modules
+    assert [name for name in modules if name in HEAVY_MODULES or name.startswith(
+        tuple(f'{module}.' for module in HEAVY_MODULES))] == []
+
+
+def test_lazy_attributes_resolve():
+    """ Test that the lazily loaded public names resolve to the same objects as their modules """
+    import camoufox_captcha
+    from camoufox_captcha.cloudflare.solve_by_click import solve_cloudflare_by_click
+    from camoufox_captcha.common.metrics import SolveHooks
+    from camoufox_captcha.pool import SolverPool
+
+    assert camoufox_captcha.solve_cloudflare_by_click is solve_cloudflare_by_click
+    assert camoufox_captcha.SolveHooks is SolveHooks
+    assert camoufox_captcha.SolverPool is SolverPool
+    assert set(camoufox_captcha.__all__) <= set(dir(camoufox_captcha))
+
+
+def test_unknown_attribute():
+    """ Test that unknown names still raise AttributeError """
+    import camoufox_captcha
+
+    with pytest.raises(AttributeError, match='does_not_exist'):
+        camoufox_captcha.does_not_exist
@@ -0,0 +1,190 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from playwright.async_api import Browser, BrowserContext, Page
+
+from camoufox_captcha import PagePool, SolverPool
+
+
+def make_page():
+    page = AsyncMock(spec=Page)
+    page.is_closed.return_value = False
+    page.evaluate.return_value = 1
+    return page
+
+
+def make_context():
+    context = AsyncMock(spec=BrowserContext)
+    context.new_page.side_effect = lambda: make_page()
+    return context
+
+
+@pytest.fixture
+def mock_browser():
+    browser = AsyncMock(spec=Browser)
+    browser.new_context.side_effect = lambda **kwargs: make_context()
+    return browser
+
+
+@pytest.mark.asyncio
+async def test_page_pool_warms_and_recycles_pages(mock_browser):
+    """ Test that warm pages are shared between contexts and handed out again after use """
+    pool = PagePool(mock_browser, max_pages=4, pages_per_context=2, warm_pages=3,
+                    context_kwargs={'locale': 'en-US'})
+    await pool.start()
+
+    assert mock_browser.new_context.call_count == 2
+    mock_browser.new_context.assert_called_with(locale='en-US')
+
+    page = await pool.acquire()
+    await pool.release(page)
+    stats = pool.stats()
+
+    assert stats.open_pages == 3 and stats.idle == 3 and stats.contexts == 2
+    assert stats.acquisitions == 1 and stats.warm_hits == 1 and stats.created == 3 and stats.recycled == 1
+    assert stats.warm_hit_rate == 1
+    page.evaluate.assert_called_once_with('1')  # health check on release
+    assert page in pool._idle
+
+
+@pytest.mark.asyncio
+async def test_page_pool_discards_unhealthy_and_worn_out_pages(mock_browser):
+    """ Test that pages failing the health check, crashed or used max_page_uses times are closed """
+    pool = PagePool(mock_browser, max_pages=2, max_page_uses=2)
+
+    page = await pool.acquire()
+    page.evaluate.side_effect = Exception('Target crashed')
+    await pool.release(page)
+
+    assert pool.stats().health_failures == 1
+    page.close.assert_called_once()
+
+    page = await pool.acquire()
+    await pool.release(page)
+    assert (await pool.acquire()) is page
+    await pool.release(page)
+    page.close.assert_called_once()  # second use
+
+    page = await pool.acquire()
+    crash_handler = page.on.call_args.args[1]
+    crash_handler(page)
+    await pool.release(page)
+    page.evaluate.assert_not_called()
+    page.close.assert_called_once()
+
+    assert pool.stats().discarded == 3
+
+
+@pytest.mark.asyncio
+async def test_page_pool_limits_pages_in_use(mock_browser):
+    """ Test that acquisitions wait while max_pages pages are in use and utilization is reported """
+    pool = PagePool(mock_browser, max_pages=2)
+    first = await pool.acquire()
+    await pool.acquire()
+
+    assert pool.stats().utilization == 1
+
+    waiting = asyncio.ensure_future(pool.acquire())
+    await asyncio.sleep(0)
+    assert not waiting.done()
+
+    await pool.release(first)
+    assert await waiting is first
+    assert pool.stats().busy_time > 0
+
+
+@pytest.mark.asyncio
+async def test_page_pool_retires_contexts(mock_browser):
+    """ Test that a context is closed with its last page once it served max_context_uses solves """
+    pool = PagePool(mock_browser, max_pages=2, max_context_uses=1)
+
+    page = await pool.acquire()
+    context = pool._page_contexts[page].context
+    await pool.release(page)
+
+    page.close.assert_called_once()
+    context.close.assert_called_once()
+    assert pool.stats().contexts == 0
+
+
+@pytest.mark.asyncio
+async def test_page_pool_replaces_discarded_warm_pages(mock_browser):
+    """ Test that discarded pages are replaced in the background to keep warm_pages open """
+    pool = PagePool(mock_browser, max_pages=2, warm_pages=1)
+    await pool.start()
+
+    page = await pool.acquire()
+    await pool.release(page, healthy=False)
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert pool.stats().open_pages == 1 and pool.stats().idle == 1
+
+
+@pytest.mark.asyncio
+async def test_page_pool_page_context_manager(mock_browser):
+    """ Test that a page borrowed with page() is discarded if the block raises """
+    pool = PagePool(mock_browser)
+
+    with pytest.raises(RuntimeError):
+        async with pool.page() as page:
+            raise RuntimeError('Navigation failed')
+
+    page.close.assert_called_once()
+    page.evaluate.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_page_pool_goto_and_solve(mock_browser):
+    """ Test that goto_and_solve runs the solver on a pooled page and recycles it """
+    solver = AsyncMock(return_value=True)
+    pool = PagePool(mock_browser)
+
+    assert await pool.goto_and_solve('https://example.com', solver=solver, expected_content_selector='#c') is True
+
+    page = solver.call_args.args[0]
+    solver.assert_called_once_with(page, 'https://example.com', expected_content_selector='#c')
+    assert page in pool._idle
+
+    with patch('camoufox_captcha.cloudflare.navigation.goto_and_solve', AsyncMock(return_value=False)) as default:
+        assert await pool.goto_and_solve('https://example.com') is False
+        default.assert_called_once_with(page, 'https://example.com')
+
+
+@pytest.mark.asyncio
+async def test_page_pool_close(mock_browser):
+    """ Test that close shuts idle pages and contexts and rejects new acquisitions """
+    pool = PagePool(mock_browser, warm_pages=2)
+    async with pool:
+        pages = list(pool._idle)
+
+    for page in pages:
+        page.close.assert_called_once()
+    assert pool.stats().contexts == 0
+
+    with pytest.raises(RuntimeError):
+        await pool.acquire()
+
+
+@pytest.mark.asyncio
+async def test_solver_pool_with_page_pool_opener(mock_browser):
+    """ Test that SolverPool borrows URL pages from a PagePool and recycles them """
+    page_pool = PagePool(mock_browser)
+    solver = AsyncMock(return_value=True)
+
+    results = [result async for result in SolverPool(page_pool, solver=solver).solve_many(['https://example.com'])]
+
+    assert results[0].success is True
+    assert results[0].page is None
+    page = solver.call_args.args[0]
+    page.goto.assert_called_once_with('https://example.com', wait_until='load')
+    assert page in page_pool._idle
+
+
+def test_page_pool_invalid_limits(mock_browser):
+    """ Test that invalid limits are rejected """
+    with pytest.raises(ValueError):
+        PagePool(mock_browser, max_pages=0)
+    with pytest.raises(ValueError):
+        PagePool(mock_browser, max_pages=2, warm_pages=3)
@@ -0,0 +1,161 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from playwright.async_api import Page, BrowserContext, ElementHandle, Frame
+
+from camoufox_captcha import SolverPool, solve_captcha_many
+
+
+def make_page(context):
+    page = AsyncMock(spec=Page)
+    page.context = context
+    return page
+
+
+@pytest.fixture
+def mock_context():
+    return AsyncMock(spec=BrowserContext)
+
+
+@pytest.mark.asyncio
+async def test_solve_many_respects_concurrency_limits(mock_context):
+    """ Test that no more than max_per_context items are solved at once within a context """
+    in_flight = 0
+    max_in_flight = 0
+
+    async def solver(queryable, **kwargs):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return True
+
+    pages = [make_page(mock_context) for _ in range(10)]
+    pool = SolverPool(max_concurrency=5, max_per_context=2, solver=solver)
+
+    results = [result async for result in pool.solve_many(pages)]
+
+    assert len(results) == 10
+    assert all(result.success for result in results)
+    assert sorted(result.index for result in results) == list(range(10))
+    assert max_in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_solve_many_yields_in_completion_order():
+    """ Test that results are yielded as soon as each item finishes """
+    pages = [make_page(AsyncMock(spec=BrowserContext)) for _ in range(3)]
+    finish_events = {0: asyncio.Event(), 2: asyncio.Event()}
+
+    async def solver(queryable, **kwargs):
+        index = pages.index(queryable)
+        if index in finish_events:
+            await finish_events[index].wait()
+        return True
+
+    iterator = SolverPool(solver=solver).solve_many(pages)
+
+    assert (await iterator.__anext__()).index == 1
+    finish_events[2].set()
+    assert (await iterator.__anext__()).index == 2
+    finish_events[0].set()
+    assert (await iterator.__anext__()).index == 0
+
+
+@pytest.mark.asyncio
+async def test_solve_many_applies_backpressure(mock_context):
+    """ Test that items are pulled from the input only when a slot frees up """
+    pulled = []
+
+    def items():
+        for i in range(6):
+            pulled.append(i)
+            yield make_page(mock_context)
+
+    solver = AsyncMock(return_value=True)
+    iterator = SolverPool(max_concurrency=2, solver=solver).solve_many(items())
+
+    await iterator.__anext__()
+
+    assert len(pulled) == 2
+    await iterator.aclose()
+
+
+@pytest.mark.asyncio
+async def test_solve_many_urls(mock_context):
+    """ Test that URL items are opened in the opener context and passed to the solver """
+    page = make_page(mock_context)
+    mock_context.new_page.return_value = page
+    solver = AsyncMock(return_value=True)
+
+    results = [result async for result in solve_captcha_many(['https://example.com'], opener=mock_context,
+                                                             close_pages=True, solver=solver,
+                                                             challenge_type='interstitial')]
+
+    assert results[0].success is True
+    assert results[0].page is page
+    page.goto.assert_called_once_with('https://example.com', wait_until='load')
+    page.close.assert_called_once()
+    solver.assert_called_once_with(page, challenge_type='interstitial')
+
+
+@pytest.mark.asyncio
+async def test_solve_many_closes_page_on_failed_navigation(mock_context):
+    """ Test that a page whose navigation failed is closed even without close_pages """
+    page = make_page(mock_context)
+    page.goto.side_effect = Exception('net::ERR_CONNECTION_REFUSED')
+    mock_context.new_page.return_value = page
+    solver = AsyncMock(return_value=True)
+
+    results = [result async for result in solve_captcha_many(['https://example.com'], opener=mock_context,
+                                                             solver=solver)]
+
+    assert results[0].success is False
+    assert 'ERR_CONNECTION_REFUSED' in str(results[0].error)
+    page.close.assert_called_once()
+    solver.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_solve_many_keeps_result_when_page_close_fails(mock_context):
+    """ Test that a page failing to close doesn't replace the result or stop the other items """
+    pages = [make_page(mock_context) for _ in range(2)]
+    pages[0].close.side_effect = Exception('Target page, context or browser has been closed')
+    mock_context.new_page.side_effect = pages
+    solver = AsyncMock(return_value=True)
+
+    results = [result async for result in solve_captcha_many(['https://a.example', 'https://b.example'],
+                                                             opener=mock_context, close_pages=True,
+                                                             solver=solver)]
+
+    assert sorted(result.index for result in results) == [0, 1]
+    assert all(result.success and result.error is None for result in results)
+    for page in pages:
+        page.close.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_solve_many_captures_errors():
+    """ Test that solver errors and missing opener are reported per item instead of raised """
+    element = AsyncMock(spec=ElementHandle)
+    frame = MagicMock(spec=Frame)
+    frame.page = make_page(AsyncMock(spec=BrowserContext))
+    element.owner_frame.return_value = frame
+
+    solver = AsyncMock(side_effect=Exception("Solve error"))
+
+    results = [result async for result in SolverPool(solver=solver).solve_many([element, 'https://example.com'])]
+    results.sort(key=lambda result: result.index)
+
+    assert results[0].success is False
+    assert str(results[0].error) == "Solve error"
+    assert results[1].success is False
+    assert "opener is required" in str(results[1].error)
+
+
+def test_solver_pool_invalid_limits():
+    """ Test that non-positive limits are rejected """
+    with pytest.raises(ValueError):
+        SolverPool(max_concurrency=0)
@@ -0,0 +1,141 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from playwright.async_api import Page
+
+from camoufox_captcha import solve_captcha
+from camoufox_captcha.cloudflare.utils.detection import CF_INTERSTITIAL_INDICATORS_SELECTORS, \
+    CF_TURNSTILE_INDICATORS_SELECTORS
+from camoufox_captcha.registry import SolverRegistry, SolverEntry, registry
+
+
+@pytest.fixture
+def mock_page():
+    page = AsyncMock(spec=Page)
+    return page
+
+
+@pytest.fixture
+def test_registry():
+    test_registry = SolverRegistry()
+    test_registry.register('cloudflare', 'interstitial', 'click', AsyncMock(return_value=True), ['#interstitial'])
+    test_registry.register('cloudflare', 'turnstile', 'click', AsyncMock(return_value=True), ['#turnstile'])
+    test_registry.register('hcaptcha', 'checkbox', 'click', AsyncMock(return_value=True), ['#hcaptcha'])
+    test_registry.register('hcaptcha', 'checkbox', 'image', AsyncMock(return_value=True), ['#hcaptcha'])
+    return test_registry
+
+
+def test_builtin_solvers_registered():
+    """ Test that the Cloudflare solvers are registered lazily with their detection probes """
+    entries = {(entry.challenge_type, entry.method): entry for entry in registry.entries('cloudflare')}
+
+    assert list(entries) == [('interstitial', 'click'), ('turnstile', 'click'), ('auto', 'click'),
+                             ('turnstile', 'click_all')]
+    assert entries[('interstitial', 'click')].probe_selectors == tuple(CF_INTERSTITIAL_INDICATORS_SELECTORS)
+    assert entries[('turnstile', 'click')].probe_selectors == tuple(CF_TURNSTILE_INDICATORS_SELECTORS)
+    assert entries[('auto', 'click')].solver == 'camoufox_captcha.cloudflare.solve_by_click:solve_cloudflare_by_click'
+    assert entries[('turnstile', 'click_all')].solver == \
+           'camoufox_captcha.cloudflare.solve_by_click:solve_cloudflare_widgets'
+
+
+def test_entry_load_import_path():
+    """ Test that import paths are resolved to the solver function """
+    from camoufox_captcha.cloudflare.solve_by_click import solve_cloudflare_by_click
+
+    entry = SolverEntry('cloudflare', 'interstitial', 'click',
+                        'camoufox_captcha.cloudflare.solve_by_click:solve_cloudflare_by_click')
+    assert entry.load() is solve_cloudflare_by_click
+
+
+def test_get_defaults(test_registry):
+    """ Test that the first registered challenge type and method are the defaults """
+    assert test_registry.get('cloudflare').challenge_type == 'interstitial'
+    assert test_registry.get('hcaptcha', 'checkbox').method == 'click'
+    assert test_registry.get('hcaptcha', 'checkbox', 'image').method == 'image'
+
+
+def test_get_unsupported(test_registry):
+    """ Test the errors for unregistered combinations """
+    with pytest.raises(ValueError, match="Unsupported captcha type: 'recaptcha'. "
+                                         "Currently only 'cloudflare' or 'hcaptcha' are supported."):
+        test_registry.get('recaptcha')
+
+    with pytest.raises(ValueError, match="Supported types are: 'interstitial' or 'turnstile'"):
+        test_registry.get('cloudflare', 'invalid')
+
+    with pytest.raises(ValueError, match="Unsupported method 'audio' for Hcaptcha captcha. "
+                                         "Currently only 'click' or 'image' methods are supported."):
+        test_registry.get('hcaptcha', 'checkbox', 'audio')
+
+
+@pytest.mark.asyncio
+async def test_solve_explicit_skips_probes(test_registry, mock_page):
+    """ Test that explicit captcha and challenge types are routed without any detection round trip """
+    assert await test_registry.solve(mock_page, 'hcaptcha', 'checkbox', 'image', timeout=5) is True
+
+    test_registry.get('hcaptcha', 'checkbox', 'image').solver.assert_called_once_with(
+        mock_page, challenge_type='checkbox', timeout=5)
+    mock_page.evaluate.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_detect_batches_all_probes(test_registry, mock_page):
+    """ Test that the probes of all challenges are checked in a single evaluation """
+    mock_page.evaluate.return_value = [False, True, True]
+
+    entry = await test_registry.detect(mock_page)
+
+    assert (entry.provider, entry.challenge_type, entry.method) == ('cloudflare', 'turnstile', 'click')
+    mock_page.evaluate.assert_called_once()
+    js, probes = mock_page.evaluate.call_args.args
+    assert probes == [['#interstitial'], ['#turnstile'], ['#hcaptcha']]
+    assert 'el.shadowRoot' in js  # open shadow roots are matched too
+
+
+@pytest.mark.asyncio
+async def test_solve_auto_routes_to_detected(test_registry, mock_page):
+    """ Test that the auto captcha type routes to the detected solver """
+    mock_page.evaluate.return_value = [False, False, True]
+
+    assert await test_registry.solve(mock_page, 'auto', timeout=None) is True
+
+    test_registry.get('hcaptcha', 'checkbox', 'click').solver.assert_called_once_with(
+        mock_page, challenge_type='checkbox', timeout=None)
+
+
+@pytest.mark.asyncio
+async def test_solve_auto_challenge_type_of_provider(test_registry, mock_page):
+    """ Test that an auto challenge type only probes the provider's challenges if it has no auto solver """
+    mock_page.evaluate.return_value = [False, True]
+
+    assert await test_registry.solve(mock_page, 'cloudflare', 'auto') is True
+
+    assert mock_page.evaluate.call_args.args[1] == [['#interstitial'], ['#turnstile']]
+    test_registry.get('cloudflare', 'turnstile').solver.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_solve_auto_nothing_detected(test_registry, mock_page):
+    """ Test that auto succeeds without solving when no registered challenge is present """
+    mock_page.evaluate.return_value = [False, False, False]
+
+    result = await test_registry.solve(mock_page, 'auto', return_result=True)
+
+    assert result.success is True
+    assert result.decided_by == 'no_challenge'
+    for entry in test_registry.entries():
+        entry.solver.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_solve_captcha_uses_default_registry(mock_page):
+    """ Test that solve_captcha dispatches through the default registry """
+    solver = AsyncMock(return_value=True)
+
+    with patch.dict(registry._entries):
+        registry.register('hcaptcha', 'checkbox', 'click', solver)
+
+        assert await solve_captcha(mock_page, captcha_type='hcaptcha', challenge_type='checkbox', foo=1) is True
+        solver.assert_called_once_with(mock_page, challenge_type='checkbox', timeout=None, foo=1)
+
+    assert not registry.entries('hcaptcha')
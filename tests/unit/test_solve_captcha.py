@@ -13,7 +13,7 @@ def mock_page():
 
 
 @pytest.mark.asyncio
-@patch('camoufox_captcha.solve_cloudflare_by_click', AsyncMock(return_value=True))
+@patch('camoufox_captcha.cloudflare.solve_by_click.solve_cloudflare_by_click', AsyncMock(return_value=True))
 async def test_solve_captcha_default_challenge_type(mock_page):
     """ Test solve_captcha when challenge_type is None or empty """
     result = await solve_captcha(mock_page, challenge_type=None)
@@ -23,6 +23,14 @@ async def test_solve_captcha_default_challenge_type(mock_page):
     assert result is True
 
 
+@pytest.mark.asyncio
+async def test_solve_captcha_auto_challenge_type(mock_page):
+    """ Test that solve_captcha passes the auto challenge type through to the solver """
+    with patch('camoufox_captcha.cloudflare.solve_by_click.solve_cloudflare_by_click', AsyncMock(return_value=True)) as solve_mock:
+        assert await solve_captcha(mock_page, challenge_type="auto") is True
+        assert solve_mock.call_args.kwargs['challenge_type'] == 'auto'
+
+
 @pytest.mark.asyncio
 async def test_solve_captcha_unsupported_challenge_type(mock_page):
     """ Test solve_captcha with unsupported challenge type """
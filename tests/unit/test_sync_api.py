@@ -0,0 +1,132 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from playwright._impl._frame import Frame as FrameImpl
+from playwright._impl._impl_to_api_mapping import API_ATTR
+from playwright.async_api import Frame as AsyncFrame, Page as AsyncPage
+from playwright.sync_api import Frame as SyncFrame, Page as SyncPage
+
+from camoufox_captcha import sync_api
+from camoufox_captcha.common.metrics import SolveResult
+
+
+def make_sync_page() -> MagicMock:
+    """ Sync page mock whose _sync runs the coroutine to completion, like Playwright's greenlet bridge """
+
+    page = MagicMock(spec=SyncPage)
+    page._sync.side_effect = lambda coro: asyncio.run(coro)
+    return page
+
+
+def make_frame_impl(dispatcher_fiber=None) -> FrameImpl:
+    """ Bare Frame impl object, as owned by a sync (with dispatcher fiber) or async connection """
+
+    frame = FrameImpl.__new__(FrameImpl)
+    frame._loop = MagicMock()
+    frame._dispatcher_fiber = dispatcher_fiber
+    return frame
+
+
+def test_solve_captcha_runs_async_pipeline_on_playwright_loop():
+    """ Test that the sync solve_captcha runs the async solve through the sync object's loop bridge """
+    page = make_sync_page()
+    async_page = MagicMock(spec=AsyncPage)
+
+    with patch('camoufox_captcha.sync_api._to_async', return_value=async_page) as to_async_mock, \
+            patch('camoufox_captcha.sync_api.async_solve_captcha', AsyncMock(return_value=True)) as solve_mock:
+        result = sync_api.solve_captcha(page, captcha_type='cloudflare', challenge_type='turnstile',
+                                        timeout=30, solve_attempts=2)
+
+        assert result is True
+        to_async_mock.assert_called_once_with(page)
+        page._sync.assert_called_once()
+        solve_mock.assert_called_once_with(async_page, captcha_type='cloudflare', challenge_type='turnstile',
+                                           method=None, timeout=30, solve_attempts=2)
+
+
+def test_solve_cloudflare_by_click_returns_result():
+    """ Test that the sync solve_cloudflare_by_click passes the SolveResult through """
+    page = make_sync_page()
+    solve_result = SolveResult(success=False, decided_by='max_attempts')
+
+    with patch('camoufox_captcha.sync_api._to_async', return_value=MagicMock(spec=AsyncPage)), \
+            patch('camoufox_captcha.sync_api.async_solve_cloudflare_by_click',
+                  AsyncMock(return_value=solve_result)):
+        assert sync_api.solve_cloudflare_by_click(page, return_result=True) is solve_result
+
+
+def test_to_async_rejects_async_objects():
+    """ Test that async API objects are rejected with a hint to use the async entry point """
+    with pytest.raises(TypeError, match="Expected a sync Page, Frame or ElementHandle"):
+        sync_api._to_async(MagicMock(spec=AsyncPage))
+
+
+def test_async_wrapper_keeps_sync_wrapper_of_sync_connection():
+    """ Test that wrapping an impl object of a sync connection doesn't replace its cached sync wrapper """
+    frame_impl = make_frame_impl(dispatcher_fiber=MagicMock())
+    sync_wrapper = object()
+    setattr(frame_impl, API_ATTR, sync_wrapper)
+
+    sync_frame = MagicMock(spec=SyncFrame)
+    sync_frame._impl_obj = frame_impl
+    with sync_api._async_mapping_of_sync_connections():
+        async_frame = sync_api._to_async(sync_frame)
+
+        assert isinstance(async_frame, AsyncFrame)
+        assert async_frame._impl_obj is frame_impl
+        assert getattr(frame_impl, API_ATTR) is sync_wrapper
+        # the async wrapper is cached as well
+        assert sync_api.async_mapping.from_impl(frame_impl) is async_frame
+
+
+def test_async_wrapper_of_async_connection_unchanged():
+    """ Test that impl objects of async connections keep Playwright's own wrapper cache """
+    frame_impl = make_frame_impl()
+
+    with sync_api._async_mapping_of_sync_connections():
+        async_frame = sync_api.async_mapping.from_impl(frame_impl)
+
+    assert getattr(frame_impl, API_ATTR) is async_frame
+
+
+def test_async_mapping_restored_after_solve():
+    """ Test that Playwright's own async mapping is only replaced while sync solves run """
+    page = make_sync_page()
+    mappings = []
+
+    async def solve(queryable, **kwargs):
+        mappings.append(sync_api.async_mapping.from_maybe_impl)
+        raise ValueError('solve failed')
+
+    assert 'from_maybe_impl' not in vars(sync_api.async_mapping)
+
+    with patch('camoufox_captcha.sync_api._to_async', return_value=MagicMock(spec=AsyncPage)), \
+            patch('camoufox_captcha.sync_api.async_solve_cloudflare_by_click', AsyncMock(side_effect=solve)):
+        with sync_api._async_mapping_of_sync_connections():
+            # a solve of another worker thread keeps the mapping replaced
+            with pytest.raises(ValueError, match='solve failed'):
+                sync_api.solve_cloudflare_by_click(page)
+            assert 'from_maybe_impl' in vars(sync_api.async_mapping)
+
+    assert mappings[0].__name__ == 'from_maybe_impl_of_sync_connection'
+    assert 'from_maybe_impl' not in vars(sync_api.async_mapping)
+
+
+def test_unsupported_playwright_version():
+    """ Test that missing Playwright internals fail with a clear error instead of breaking the wrappers """
+    page = make_sync_page()
+
+    with patch.object(sync_api.async_mapping, '_mapping', None), \
+            patch('camoufox_captcha.sync_api.async_solve_captcha', AsyncMock()) as solve_mock:
+        with pytest.raises(RuntimeError, match=r"isn't supported by the installed Playwright version "
+                                               r"\(missing: ImplToApiMapping._mapping\)"):
+            sync_api.solve_captcha(page)
+
+    solve_mock.assert_not_called()
+    page._sync.assert_not_called()
+
+    sync_frame = MagicMock(spec=SyncFrame)
+    sync_frame._impl_obj = object()
+    with pytest.raises(RuntimeError, match="can't reach the browser object behind"):
+        sync_api._to_async(sync_frame)